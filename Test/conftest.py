@@ -0,0 +1,11 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Shared pytest setup. Puts the project root on the import path so the
+#          tests can be run from any directory (python -m pytest Test).
+# ──────────────────────────────────────────────────────────────────────────────
+
+from pathlib import Path
+import sys
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
@@ -0,0 +1,430 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: End-to-end HTTP load generator for the web app. Drives "/upload/",
+#          "/results/{id}" and "/uploads/history" with a configurable number of
+#          concurrent virtual users, file mix and duration, then writes a JSON
+#          report (throughput, p50/p95/p99 latency, error rate) that can be
+#          compared between releases.
+#
+# Usage:
+#   python Test/load_test_runner.py --start-server --concurrency 1,4,8 --duration 30
+#   python Test/load_test_runner.py --url http://127.0.0.1:8000 --files samples/ \
+#       --mix txt=3,pdf=1 --baseline reports/load_previous.json
+# ──────────────────────────────────────────────────────────────────────────────
+
+from pathlib import Path
+from datetime import datetime
+from urllib.parse import urlsplit
+import argparse
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+# Set root and ensure it's in PYTHONPATH
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+CONTENT_TYPES = {
+    ".pdf": "application/pdf",
+    ".docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    ".txt": "text/plain",
+}
+
+ENDPOINTS = ("upload", "results", "history")
+
+# Used when no --files are given so the tool works out of the box
+SYNTHETIC_NAMES = ["John Smith", "Maria Garcia", "Wei Chen", "Aisha Khan", "David Miller", "Sarah Johnson"]
+SYNTHETIC_ORGS = ["NASA", "IBM", "Acme Corporation", "Globex Inc", "United Nations", "MIT"]
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# File mix
+# ──────────────────────────────────────────────────────────────────────────────
+def synthetic_document(rng: random.Random, paragraphs: int) -> bytes:
+    """Builds a plain-text document with a predictable sprinkling of entities."""
+    lines = []
+    for _ in range(paragraphs):
+        name = rng.choice(SYNTHETIC_NAMES)
+        org = rng.choice(SYNTHETIC_ORGS)
+        email = name.lower().replace(" ", ".") + "@example.com"
+        lines.append(
+            f"{name} joined {org} as a senior analyst and can be reached at {email}. "
+            f"Before that, {name.split()[0]} spent several years working with {rng.choice(SYNTHETIC_ORGS)}.\n"
+        )
+    return "\n".join(lines).encode("utf-8")
+
+
+def load_file_mix(paths, mix, rng: random.Random, synthetic_sizes):
+    """
+    Collects the documents to upload and their selection weights.
+
+    Args:
+        paths (list): Files or directories to draw documents from.
+        mix (dict): Optional extension → weight mapping (e.g. {"txt": 3, "pdf": 1}).
+        rng (random.Random): Seeded generator used for synthetic documents.
+        synthetic_sizes (list): Paragraph counts for generated documents when no paths are given.
+
+    Returns:
+        tuple: (documents, weights) where documents are (filename, content_type, bytes).
+    """
+    documents = []
+    for raw in paths:
+        path = Path(raw)
+        candidates = sorted(path.rglob("*")) if path.is_dir() else [path]
+        for candidate in candidates:
+            content_type = CONTENT_TYPES.get(candidate.suffix.lower())
+            if candidate.is_file() and content_type:
+                documents.append((candidate.name, content_type, candidate.read_bytes()))
+
+    if not documents:
+        for size in synthetic_sizes:
+            documents.append((f"synthetic_{size}p.txt", "text/plain", synthetic_document(rng, size)))
+
+    weights = []
+    for filename, _, _ in documents:
+        extension = Path(filename).suffix.lstrip(".").lower()
+        weights.append(mix.get(extension, 1.0) if mix else 1.0)
+
+    if not any(weights):
+        raise SystemExit("⚠️ The --mix weights exclude every available document.")
+    return documents, weights
+
+
+def encode_multipart(document):
+    """Encodes a single document as the "files" field of a multipart/form-data body."""
+    filename, content_type, payload = document
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="files"; filename="{filename}"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode("utf-8")
+    tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+    return head + payload + tail, f"multipart/form-data; boundary={boundary}"
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Virtual users
+# ──────────────────────────────────────────────────────────────────────────────
+class VirtualUser(threading.Thread):
+    """Runs upload → results → history iterations over one keep-alive connection."""
+
+    def __init__(self, host, port, documents, weights, deadline, history_every, seed, timeout):
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.documents = documents
+        self.weights = weights
+        self.deadline = deadline
+        self.history_every = history_every
+        self.rng = random.Random(seed)
+        self.timeout = timeout
+        self.samples = []  # (endpoint, status, latency_seconds)
+        self.conn = None
+
+    def _request(self, endpoint, method, path, body=None, headers=None):
+        if self.conn is None:
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        start = time.perf_counter()
+        try:
+            self.conn.request(method, path, body=body, headers=headers or {})
+            response = self.conn.getresponse()
+            response.read()
+            status = response.status
+            location = response.getheader("Location")
+            if response.getheader("Connection", "").lower() == "close":
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException):
+            status, location = 0, None
+            self.conn.close()
+            self.conn = None
+        self.samples.append((endpoint, status, time.perf_counter() - start))
+        return status, location
+
+    def run(self):
+        iteration = 0
+        while time.monotonic() < self.deadline:
+            iteration += 1
+            document = self.rng.choices(self.documents, weights=self.weights, k=1)[0]
+            body, content_type = encode_multipart(document)
+            status, location = self._request("upload", "POST", "/upload/", body, {
+                "Content-Type": content_type,
+                "Content-Length": str(len(body)),
+            })
+
+            if status == 303 and location:
+                self._request("results", "GET", urlsplit(location).path)
+
+            if self.history_every and iteration % self.history_every == 0:
+                self._request("history", "GET", "/uploads/history")
+
+        if self.conn is not None:
+            self.conn.close()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Statistics and reporting
+# ──────────────────────────────────────────────────────────────────────────────
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples, elapsed):
+    """Aggregates raw samples into per-endpoint and overall statistics."""
+    def stats(rows):
+        latencies = sorted(latency * 1000 for _, _, latency in rows)
+        errors = sum(1 for _, status, _ in rows if status == 0 or status >= 400)
+        statuses = {}
+        for _, status, _ in rows:
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+        return {
+            "requests": len(rows),
+            "errors": errors,
+            "error_rate": round(errors / len(rows), 4) if rows else 0.0,
+            "throughput_rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "latency_ms": {
+                "mean": round(sum(latencies) / len(latencies), 2) if latencies else None,
+                "p50": _round(percentile(latencies, 50)),
+                "p95": _round(percentile(latencies, 95)),
+                "p99": _round(percentile(latencies, 99)),
+                "max": _round(latencies[-1] if latencies else None),
+            },
+            "status_codes": statuses,
+        }
+
+    endpoints = {name: stats([s for s in samples if s[0] == name]) for name in ENDPOINTS}
+    return {"elapsed_seconds": round(elapsed, 2), "overall": stats(samples), "endpoints": endpoints}
+
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+
+def run_level(host, port, concurrency, duration, documents, weights, history_every, seed, timeout):
+    """Runs one concurrency level for the given duration and returns its summary."""
+    deadline = time.monotonic() + duration
+    users = [
+        VirtualUser(host, port, documents, weights, deadline, history_every, seed + index, timeout)
+        for index in range(concurrency)
+    ]
+    start = time.perf_counter()
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    elapsed = time.perf_counter() - start
+
+    samples = [sample for user in users for sample in user.samples]
+    summary = summarize(samples, elapsed)
+    summary["concurrency"] = concurrency
+    return summary
+
+
+def print_level(summary):
+    print(f"\n📊 Concurrency {summary['concurrency']} — {summary['elapsed_seconds']}s")
+    print(f"   {'endpoint':<10}{'reqs':>8}{'rps':>9}{'err%':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for name, stats in [("overall", summary["overall"])] + list(summary["endpoints"].items()):
+        latency = stats["latency_ms"]
+        print(
+            f"   {name:<10}{stats['requests']:>8}{stats['throughput_rps']:>9}"
+            f"{stats['error_rate'] * 100:>7.1f}%"
+            f"{_fmt(latency['p50']):>10}{_fmt(latency['p95']):>10}{_fmt(latency['p99']):>10}"
+        )
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.0f}ms"
+
+
+def compare_reports(current, baseline):
+    """Prints per-level deltas against a previous report (matched by concurrency)."""
+    previous = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    print(f"\n🔁 Comparison against baseline from {baseline.get('generated_at', 'unknown')} "
+          f"({baseline.get('git_commit') or 'no commit'})")
+    for level in current["levels"]:
+        old = previous.get(level["concurrency"])
+        if not old:
+            print(f"   concurrency {level['concurrency']}: no baseline level")
+            continue
+        for name in ("overall",) + ENDPOINTS:
+            new_stats = level["overall"] if name == "overall" else level["endpoints"][name]
+            old_stats = old["overall"] if name == "overall" else old["endpoints"].get(name)
+            if not old_stats or not new_stats["requests"]:
+                continue
+            print(
+                f"   c={level['concurrency']:<4}{name:<10}"
+                f" rps {_delta(old_stats['throughput_rps'], new_stats['throughput_rps'])}"
+                f" | p95 {_delta(old_stats['latency_ms']['p95'], new_stats['latency_ms']['p95'])}"
+                f" | p99 {_delta(old_stats['latency_ms']['p99'], new_stats['latency_ms']['p99'])}"
+                f" | err {old_stats['error_rate']:.2%} → {new_stats['error_rate']:.2%}"
+            )
+
+
+def _delta(old, new):
+    if old is None or new is None:
+        return f"{old} → {new}"
+    change = ((new - old) / old * 100) if old else 0.0
+    return f"{old} → {new} ({change:+.1f}%)"
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Local server management
+# ──────────────────────────────────────────────────────────────────────────────
+def start_server(host, port, workers, ready_path, timeout):
+    """Starts the pre-fork server in a subprocess and waits until it answers on ready_path."""
+    command = [sys.executable, "-m", "api.server", "--host", host, "--port", str(port),
+               "--workers", str(workers), "--log-level", "warning"]
+    print(f"🚀 Starting server: {' '.join(command[2:])}")
+    process = subprocess.Popen(command, cwd=PROJECT_ROOT)
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"❌ Server exited early with code {process.returncode}")
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=2)
+            conn.request("GET", ready_path)
+            status = conn.getresponse().status
+            conn.close()
+            if status == 200:
+                print(f"✅ Server ready in {timeout - (deadline - time.monotonic()):.1f}s")
+                return process
+        except OSError:
+            pass
+        time.sleep(0.25)
+
+    process.terminate()
+    raise SystemExit(f"❌ Server did not become ready within {timeout}s")
+
+
+def stop_server(process):
+    process.terminate()
+    try:
+        process.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# CLI
+# ──────────────────────────────────────────────────────────────────────────────
+def parse_mix(raw):
+    mix = {}
+    for part in filter(None, (raw or "").split(",")):
+        extension, _, weight = part.partition("=")
+        mix[extension.strip().lstrip(".").lower()] = float(weight or 1)
+    return mix
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP load test for the document entity extractor.")
+    parser.add_argument("--url", default="http://127.0.0.1:8050", help="Base URL of the server under test.")
+    parser.add_argument("--start-server", action="store_true", help="Start a local server (api.server) for the run.")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker count when using --start-server.")
+    parser.add_argument("--ready-path", default="/readyz", help="Path polled to decide the started server is ready.")
+    parser.add_argument("--concurrency", default="1,4,8",
+                        help="Comma-separated virtual user counts; each level runs for --duration seconds.")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run each concurrency level.")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of single-user traffic before measuring.")
+    parser.add_argument("--files", nargs="*", default=[], help="Files or directories (.pdf/.docx/.txt) to upload.")
+    parser.add_argument("--mix", default="", help="Extension weights, e.g. txt=3,pdf=1,docx=1.")
+    parser.add_argument("--synthetic-sizes", default="2,20,200",
+                        help="Paragraph counts of generated .txt documents when no --files are given.")
+    parser.add_argument("--history-every", type=int, default=1,
+                        help="Request /uploads/history every N iterations (0 disables).")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request socket timeout in seconds.")
+    parser.add_argument("--seed", type=int, default=1234, help="Random seed for document selection.")
+    parser.add_argument("--report", default=None, help="Where to write the JSON report "
+                        "(default: logs/load_test_<timestamp>.json).")
+    parser.add_argument("--baseline", default=None, help="Previous report to compare against.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    target = urlsplit(args.url)
+    host, port = target.hostname or "127.0.0.1", target.port or 80
+    levels = [int(level) for level in args.concurrency.split(",") if level.strip()]
+    rng = random.Random(args.seed)
+
+    documents, weights = load_file_mix(
+        args.files, parse_mix(args.mix), rng,
+        [int(size) for size in args.synthetic_sizes.split(",") if size.strip()]
+    )
+    print(f"📂 {len(documents)} document(s) in the mix, "
+          f"{sum(len(doc[2]) for doc in documents) / 1024:.1f} KiB total")
+
+    server = start_server(host, port, args.workers, args.ready_path, 120) if args.start_server else None
+    try:
+        if args.warmup > 0:
+            print(f"🔥 Warming up for {args.warmup:.0f}s...")
+            run_level(host, port, 1, args.warmup, documents, weights, 0, args.seed, args.timeout)
+
+        results = []
+        for concurrency in levels:
+            summary = run_level(host, port, concurrency, args.duration, documents, weights,
+                                args.history_every, args.seed, args.timeout)
+            print_level(summary)
+            results.append(summary)
+    finally:
+        if server is not None:
+            stop_server(server)
+
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "target": args.url,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "server_workers": args.workers if args.start_server else None,
+        },
+        "config": {
+            "duration_seconds": args.duration,
+            "concurrency_levels": levels,
+            "documents": [{"filename": name, "bytes": len(payload), "weight": weight}
+                          for (name, _, payload), weight in zip(documents, weights)],
+            "history_every": args.history_every,
+            "seed": args.seed,
+        },
+        "levels": results,
+    }
+
+    report_path = Path(args.report) if args.report else (
+        PROJECT_ROOT / "logs" / f"load_test_{datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}.json"
+    )
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n💾 Report written to {report_path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            compare_reports(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Admission control: client identification behind proxies and the
+#          request size limit for bodies sent without Content-Length.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import asyncio
+import json
+
+from fastapi import FastAPI, File, UploadFile
+
+from utils import admission
+
+BOUNDARY = "testboundary"
+
+
+def _scope(headers=(), path="/upload/"):
+    return {
+        "type": "http", "method": "POST", "path": path, "raw_path": path.encode(), "query_string": b"",
+        "root_path": "", "scheme": "http", "http_version": "1.1", "server": ("testserver", 80),
+        "client": ("10.0.0.1", 5000), "headers": list(headers),
+    }
+
+
+def _upload_app():
+    app = FastAPI()
+
+    @app.post("/upload/")
+    async def upload(files: list[UploadFile] = File(...)):
+        return {"files": len(files)}
+
+    return admission.AdmissionMiddleware(app)
+
+
+def _multipart_chunks(size: int, chunk: int = 1024):
+    head = (f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"files\"; filename=\"a.txt\"\r\n"
+            f"Content-Type: text/plain\r\n\r\n").encode()
+    body = head + b"x" * size + f"\r\n--{BOUNDARY}--\r\n".encode()
+    return [body[i:i + chunk] for i in range(0, len(body), chunk)]
+
+
+def _call(app, scope, chunks):
+    """Runs one request through the ASGI app; returns (status, decoded JSON body)."""
+    messages = [{"type": "http.request", "body": part, "more_body": True} for part in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start = next(message for message in sent if message["type"] == "http.response.start")
+    body = b"".join(message.get("body", b"") for message in sent if message["type"] == "http.response.body")
+    return start["status"], json.loads(body)
+
+
+def test_chunked_oversized_upload_is_rejected_with_413(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_REQUEST_BYTES", 4096)
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+               (b"transfer-encoding", b"chunked")]
+    status, body = _call(_upload_app(), _scope(headers), _multipart_chunks(10_000))
+    assert status == 413
+    assert "limit" in body["error"]
+
+
+def test_chunked_upload_within_limit_is_accepted(monkeypatch):
+    monkeypatch.setattr(admission, "MAX_REQUEST_BYTES", 64 * 1024)
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+               (b"transfer-encoding", b"chunked")]
+    status, body = _call(_upload_app(), _scope(headers), _multipart_chunks(10_000))
+    assert status == 200
+    assert body == {"files": 1}
+
+
+def test_client_id_uses_peer_address_by_default(monkeypatch):
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", False)
+    assert admission.client_id(_scope([(b"x-forwarded-for", b"1.2.3.4")])) == "10.0.0.1"
+
+
+def test_client_id_ignores_client_supplied_forwarded_entries(monkeypatch):
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", True)
+    monkeypatch.setattr(admission, "FORWARDED_FOR_HOPS", 1)
+    forged = _scope([(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7")])
+    assert admission.client_id(forged) == "203.0.113.7"
+    split = _scope([(b"x-forwarded-for", b"6.6.6.6"), (b"x-forwarded-for", b"203.0.113.7")])
+    assert admission.client_id(split) == "203.0.113.7"
+
+
+def test_client_id_with_several_trusted_hops(monkeypatch):
+    monkeypatch.setattr(admission, "TRUST_FORWARDED_FOR", True)
+    monkeypatch.setattr(admission, "FORWARDED_FOR_HOPS", 2)
+    scope = _scope([(b"x-forwarded-for", b"6.6.6.6, 203.0.113.7, 10.1.1.1")])
+    assert admission.client_id(scope) == "203.0.113.7"
@@ -0,0 +1,54 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Micro-batching of concurrent single-document requests.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import asyncio
+
+from utils.batching import MicroBatcher
+
+
+def _upper_batch(items):
+    if any(item == "bad" for item in items):
+        raise ValueError("bad input")
+    return [item.upper() for item in items]
+
+
+def _submit_all(batcher, items):
+    async def run():
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        finally:
+            await batcher.stop()
+
+    return asyncio.run(run())
+
+
+def test_concurrent_items_share_a_batch():
+    sizes = []
+
+    def process(items):
+        sizes.append(len(items))
+        return _upper_batch(items)
+
+    results = _submit_all(MicroBatcher(process, max_batch_size=8, max_wait_seconds=0.05), ["a", "b", "c"])
+    assert results == ["A", "B", "C"]
+    assert sizes == [3]
+
+
+def test_failing_item_only_fails_its_own_request():
+    results = _submit_all(MicroBatcher(_upper_batch, max_batch_size=8, max_wait_seconds=0.05), ["a", "bad", "c"])
+    assert results[0] == "A" and results[2] == "C"
+    assert isinstance(results[1], ValueError)
+
+
+def test_single_failing_item_is_not_retried():
+    calls = []
+
+    def process(items):
+        calls.append(items)
+        raise ValueError("bad input")
+
+    results = _submit_all(MicroBatcher(process, max_wait_seconds=0), ["bad"])
+    assert isinstance(results[0], ValueError)
+    assert calls == [["bad"]]
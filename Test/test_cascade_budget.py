@@ -0,0 +1,75 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: The per-batch GPT budget shared by cascade extractions, including
+#          sandboxed documents (spaCy in the worker, GPT decided here).
+# ──────────────────────────────────────────────────────────────────────────────
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from extractor import processing, text_extractor
+from extractor.cascade import GPTBudget
+
+
+def test_acquisitions_never_exceed_the_budget():
+    budget = GPTBudget(3)
+    with ThreadPoolExecutor(8) as pool:
+        granted = list(pool.map(lambda _: budget.try_acquire(), range(20)))
+    assert granted.count(True) == 3
+    assert budget.denied == 17
+    assert budget.remaining == 0
+
+
+class _FakePool:
+    """Stands in for the sandbox: holds every job until all documents are in flight."""
+
+    def __init__(self, documents):
+        self.barrier = threading.Barrier(documents, timeout=5)
+
+    def run(self, function, text, timeout=None):
+        self.barrier.wait()
+        reasons = ["low_yield"] if "escalate" in text else []
+        return {"person": [], "organization": [], "email": [], "language": "en"}, reasons
+
+
+def test_only_escalating_sandboxed_documents_take_the_budget(monkeypatch):
+    texts = {"a.txt": "quiet", "b.txt": "quiet", "c.txt": "escalate", "d.txt": "quiet"}
+    gpt_calls = []
+
+    def fake_gpt(text):
+        gpt_calls.append(text)
+        return {"person": ["Ada Lovelace"], "organization": [], "email": []}
+
+    monkeypatch.setattr(processing, "SANDBOX_ENABLED", True)
+    monkeypatch.setattr(processing, "NEAR_DUP_ENABLED", False)
+    monkeypatch.setattr(processing, "get_pool", lambda: pool)
+    monkeypatch.setattr(processing, "read_document", lambda path, deadline=None: texts[path])
+    monkeypatch.setattr(text_extractor, "_extract_gpt", fake_gpt)
+
+    pool = _FakePool(len(texts))
+    budget = GPTBudget(3)
+    with ThreadPoolExecutor(len(texts)) as executor:
+        results = dict(zip(texts, executor.map(
+            lambda name: processing.process_document(name, name, None, budget)[1], texts)))
+
+    assert gpt_calls == ["escalate"]
+    assert results["c.txt"]["source"] == "spacy+gpt"
+    assert results["c.txt"]["person"] == ["Ada Lovelace"]
+    assert all(results[name]["source"] == "spacy" for name in ("a.txt", "b.txt", "d.txt"))
+    assert budget.used == 1
+
+
+def test_api_requests_escalate_independently_of_their_batch(monkeypatch):
+    import spacy
+    from routes.api_routes import _extract_batch
+
+    nlp = spacy.blank("en")
+    monkeypatch.setattr(text_extractor, "extraction_mode", lambda: "cascade")
+    monkeypatch.setattr(text_extractor, "nlp_for_language", lambda language: nlp)
+    monkeypatch.setattr(text_extractor, "_annotate", lambda _, texts: ([nlp(text) for text in texts], [None] * len(texts)))
+    monkeypatch.setattr(text_extractor, "escalation_reasons", lambda text, result, doc: ["low_yield"])
+    monkeypatch.setattr(text_extractor, "_extract_gpt", lambda text: {"person": [], "organization": [], "email": []})
+
+    # More requests in one micro-batch than an upload's CASCADE_GPT_BUDGET
+    results = _extract_batch([f"document {index}" for index in range(8)])
+    assert [result["source"] for result in results] == ["spacy+gpt"] * 8
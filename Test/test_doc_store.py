@@ -0,0 +1,152 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: The spaCy annotation store (DocBin save/lookup, batch manifests,
+#          retention) and rebuilding an upload's exports from it, with a blank
+#          pipeline and a temporary DOC_STORE_DIR.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import json
+import os
+import time
+
+import pytest
+import spacy
+
+from extractor import doc_store, reprocess
+from extractor.text_extractor import result_from_doc
+from utils import entity_stats
+from utils.post_process import DEFAULT_POST_PROCESSOR
+from utils.result_set import ResultSet
+
+TEXT_A = "Ada Lovelace joined Initech last year."
+TEXT_B = "Grace Hopper visited Initech."
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(doc_store, "DOC_STORE_ENABLED", True)
+    monkeypatch.setattr(doc_store, "DOC_STORE_DIR", tmp_path / "doc_store")
+    monkeypatch.setattr(reprocess, "OUTPUT_FOLDER", tmp_path / "output")
+    monkeypatch.setattr(entity_stats, "OUTPUT_FOLDER", tmp_path / "output")
+    (tmp_path / "output").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def nlp():
+    nlp = spacy.blank("en")
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.add_patterns([
+        {"label": "PERSON", "pattern": "Ada Lovelace"},
+        {"label": "PERSON", "pattern": "Grace Hopper"},
+        {"label": "ORG", "pattern": "Initech"},
+    ])
+    return nlp
+
+
+def _annotate(nlp, text):
+    """What text_extractor does for a document: look up, otherwise run the model and save."""
+    key, doc = doc_store.lookup(nlp, text)
+    if doc is None:
+        doc = nlp(text)
+        key = doc_store.save(key, doc)
+    return key, doc
+
+
+def _upload(nlp, results_id, documents):
+    """Records a batch the way the upload route does; `documents` is [(filename, text, source)]."""
+    results = ResultSet()
+    for filename, text, source in documents:
+        key, doc = _annotate(nlp, text)
+        result = result_from_doc(text, doc)
+        result["source"] = source
+        result["annotations"] = key
+        results.add(filename, DEFAULT_POST_PROCESSOR.process_result(result))
+    doc_store.save_batch(results_id, results.manifest())
+    return results
+
+
+def test_saved_annotations_round_trip(store, nlp):
+    key, doc = _annotate(nlp, TEXT_A)
+    assert key == f"{doc_store.model_key(nlp)}/{doc_store.content_hash(TEXT_A)}"
+
+    stored_key, stored = doc_store.lookup(nlp, TEXT_A)
+    assert stored_key == key
+    assert stored.text == TEXT_A
+    assert [(ent.text, ent.label_) for ent in stored.ents] == [("Ada Lovelace", "PERSON"), ("Initech", "ORG")]
+
+    blank_vocab = spacy.blank("en").vocab  # reprocessing loads without the model
+    assert [ent.text for ent in doc_store.load_key(blank_vocab, key).ents] == ["Ada Lovelace", "Initech"]
+
+
+def test_nothing_is_stored_when_disabled(store, nlp, monkeypatch):
+    monkeypatch.setattr(doc_store, "DOC_STORE_ENABLED", False)
+    assert doc_store.lookup(nlp, TEXT_A) == (None, None)
+    assert doc_store.save(None, nlp(TEXT_A)) is None
+    doc_store.save_batch("batch", [{"filename": "a.txt", "annotations": None}])
+    assert not (store / "doc_store").exists()
+
+
+def test_expire_deletes_unused_documents_and_manifests(store, nlp):
+    old_key, _ = _annotate(nlp, TEXT_A)
+    _upload(nlp, "old_batch", [("a.txt", TEXT_A, "spacy")])
+    long_ago = time.time() - 7200
+    for path in (store / "doc_store").rglob("*"):
+        if path.is_file():
+            os.utime(path, (long_ago, long_ago))
+
+    new_key, _ = _annotate(nlp, TEXT_B)
+    assert doc_store.expire(3600) == 2  # TEXT_A's annotations and the old manifest
+
+    assert doc_store.lookup(nlp, TEXT_A)[1] is None
+    assert doc_store.lookup(nlp, TEXT_B)[1] is not None
+    assert doc_store.list_batches() == []
+    model, _, digest = old_key.partition("/")
+    assert not (store / "doc_store" / model / digest[:2]).exists()  # emptied directory removed
+
+
+def test_lookup_restarts_the_retention_period(store, nlp):
+    _annotate(nlp, TEXT_A)
+    long_ago = time.time() - 7200
+    for path in (store / "doc_store").rglob("*.spacy"):
+        os.utime(path, (long_ago, long_ago))
+
+    doc_store.lookup(nlp, TEXT_A)  # the same text was extracted again
+    assert doc_store.expire(3600) == 0
+
+
+def test_reprocess_rebuilds_exports_and_skips_gpt_documents(store, nlp):
+    _upload(nlp, "entities_combined_1", [
+        ("a.txt", TEXT_A, "spacy"),
+        ("b.txt", TEXT_B, "spacy+gpt"),  # its export also held GPT entities
+    ])
+
+    summary = reprocess.reprocess_batch("entities_combined_1")
+    assert summary["documents"] == 2
+    assert summary["reprocessed"] == 1
+    assert summary["missing_annotations"] == ["b.txt"]
+
+    results_id = summary["results_id"]
+    assert results_id.startswith("entities_reprocessed_")
+    output = store / "output"
+    documents = list(ResultSet.read_jsonl(output / f"{results_id}.results.jsonl"))
+    assert [(d.filename, d.person, d.organization) for d in documents] == [("a.txt", ["Ada Lovelace"], ["Initech"])]
+    for suffix in (".xlsx", ".csv", ".json", ".stats.json", ".entities.csv"):
+        assert (output / f"{results_id}{suffix}").exists()
+    with open(output / f"{results_id}.json", encoding="utf-8") as f:
+        assert json.load(f)["reprocessed_from"] == "entities_combined_1"
+    assert results_id in doc_store.list_batches()  # the rebuilt export can be reprocessed too
+
+
+def test_reprocess_in_place_overwrites_the_original_exports(store, nlp):
+    _upload(nlp, "entities_combined_2", [("a.txt", TEXT_A, "spacy")])
+
+    summary = reprocess.reprocess_batch("entities_combined_2", in_place=True)
+    assert summary["results_id"] == "entities_combined_2"
+    assert (store / "output" / "entities_combined_2.results.jsonl").exists()
+    assert doc_store.list_batches() == ["entities_combined_2"]  # no second manifest
+
+
+def test_reprocess_cli_reports_missing_batches(store, capsys):
+    assert reprocess.main(["--batch", "no_such_batch"]) == 1
+    assert "no batch manifest" in capsys.readouterr().out
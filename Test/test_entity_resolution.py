@@ -0,0 +1,109 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Cross-document entity resolution: which variants merge, which
+#          names stay apart, the canonical name chosen, and stored entities.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.database import Base, KnownEntity, KnownEntityBlock
+from utils.entity_resolution import ORG, PERSON, EntityResolver, _store_entities, match_key, resolve_result_set
+from utils.result_set import ResultSet
+
+
+def _resolve(label, forms):
+    resolver = EntityResolver(label)
+    for form in forms:
+        resolver.add(form)
+    return resolver.resolve()
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def test_match_key_drops_case_punctuation_titles_and_legal_suffixes():
+    assert match_key("Dr. John  SMITH", PERSON) == "john smith"
+    assert match_key("Acme, Inc.", ORG) == "acme"
+
+
+def test_person_variants_merge():
+    mapping = _resolve(PERSON, ["John Smith", "JOHN SMITH", "Mr. John Smith", "J. Smith", "John Smith"])
+    assert set(mapping.values()) == {"John Smith"}
+
+
+def test_org_variants_merge():
+    mapping = _resolve(ORG, ["Acme Corporation", "ACME Inc.", "Acme"])
+    assert set(mapping.values()) == {"Acme"}
+
+
+def test_distinct_names_stay_apart():
+    mapping = _resolve(PERSON, ["John Smith", "Jane Doe", "John Smythe-Jones"])
+    assert len(set(mapping.values())) == 3
+    mapping = _resolve(ORG, ["Acme", "Apex Systems", "Bank of America", "Bank of Canada"])
+    assert len(set(mapping.values())) == 4
+
+
+def test_ambiguous_initial_is_not_merged():
+    mapping = _resolve(PERSON, ["John Smith", "James Smith", "J. Smith"])
+    assert mapping["John Smith"] != mapping["James Smith"]
+    assert mapping["J. Smith"] == "J. Smith"
+
+
+def test_canonical_prefers_mixed_case_and_bare_forms():
+    assert set(_resolve(PERSON, ["JOHN SMITH", "JOHN SMITH", "John Smith"]).values()) == {"John Smith"}
+    assert set(_resolve(ORG, ["Globex Corp", "Globex Corp", "Globex"]).values()) == {"Globex"}
+
+
+@pytest.mark.parametrize("variant", ["Bank of Americas", "Banks of America", "Bank of America's"])
+def test_canonical_is_not_a_plural_or_possessive_variant(variant):
+    mapping = _resolve(ORG, ["Bank of America", variant, variant])
+    assert mapping == {"Bank of America": "Bank of America", variant: "Bank of America"}
+
+
+def test_resolve_result_set_remaps_documents():
+    results = ResultSet()
+    results.add("a.txt", {"person": ["John Smith"], "organization": ["Acme Inc"], "email": []})
+    results.add("b.txt", {"person": ["JOHN SMITH", "Jane Doe"], "organization": ["Acme"], "email": []})
+    resolve_result_set(results)
+    documents = list(results)
+    assert documents[1].person == ["John Smith", "Jane Doe"]
+    assert {documents[0].organization[0], documents[1].organization[0]} == {"Acme"}
+
+
+def test_stored_entities_seed_later_batches(db):
+    first = ResultSet()
+    first.add("a.txt", {"person": ["Jonathan Q. Public"], "organization": [], "email": []})
+    resolve_result_set(first, db=db)
+    db.commit()
+
+    second = ResultSet()
+    second.add("b.txt", {"person": ["JONATHAN Q PUBLIC"], "organization": [], "email": []})
+    resolve_result_set(second, db=db)
+    db.commit()
+
+    assert list(second)[0].person == ["Jonathan Q. Public"]
+    entity = db.query(KnownEntity).one()
+    assert entity.mention_count == 2
+
+
+def test_storing_an_existing_name_updates_it_instead_of_inserting(db):
+    # Another upload (or web worker) stored the name after this batch looked up its candidates
+    db.add(KnownEntity(label=PERSON, canonical="Ada Lovelace", mention_count=3))
+    db.commit()
+
+    resolver = EntityResolver(PERSON)
+    resolver.add("Ada Lovelace")
+    _store_entities(db, resolver, resolver.resolve())
+    db.commit()
+
+    entity = db.query(KnownEntity).one()
+    assert entity.mention_count == 4
+    assert db.query(KnownEntityBlock).count() == 0  # blocking keys belong to the insert that created it
@@ -0,0 +1,83 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Per-batch entity frequency tables: accumulation, top-k ordering and
+#          ties, the stored stats files and rebuilding stats from old exports.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import csv
+
+from utils import entity_stats
+from utils.entity_stats import EntityStats, load_stats, stats_from_rows
+
+
+def _result(person=(), organization=(), email=(), mentions=None):
+    result = {"person": list(person), "organization": list(organization), "email": list(email)}
+    if mentions is not None:
+        result["mentions"] = mentions
+    return result
+
+
+def test_add_counts_mentions_documents_and_first_file():
+    stats = EntityStats()
+    stats.add("a.txt", _result(person=["Jane Doe", "John Roe"], mentions={"person": {"Jane Doe": 3}}))
+    stats.add("b.txt", _result(person=["Jane Doe", ""], email=["jane@example.com"]))
+
+    # Without a mention count an entity counts once per document; empty entities are skipped
+    assert stats.top("person") == [["Jane Doe", 4, 2, "a.txt"], ["John Roe", 1, 1, "a.txt"]]
+    assert stats.totals("person") == {"extracted": 3, "distinct": 2, "mentions": 5}
+    assert stats.totals("email") == {"extracted": 1, "distinct": 1, "mentions": 1}
+    assert stats.documents == 2
+
+
+def test_top_orders_by_mentions_then_documents_then_name():
+    stats = EntityStats()
+    stats.add("a.txt", _result(organization=["Umbrella", "Initech", "Acme"],
+                               mentions={"organization": {"Umbrella": 2, "Initech": 1, "Acme": 1}}))
+    stats.add("b.txt", _result(organization=["Initech", "Globex"],
+                               mentions={"organization": {"Initech": 1, "Globex": 2}}))
+    stats.add("c.txt", _result(organization=["Hooli"], mentions={"organization": {"Hooli": 1}}))
+
+    assert [row[:3] for row in stats.top("organization")] == [
+        ["Initech", 2, 2],   # most mentions, and in more documents than the other two
+        ["Globex", 2, 1],    # same mentions and documents as Umbrella: alphabetical
+        ["Umbrella", 2, 1],
+        ["Acme", 1, 1],
+        ["Hooli", 1, 1],
+    ]
+    assert [row[0] for row in stats.top("organization", k=2)] == ["Initech", "Globex"]
+
+
+def test_rows_from_old_exports_skip_empty_fields():
+    stats = stats_from_rows([
+        {"Filename": "a.txt", "Names": "Jane Doe, John Roe", "Emails": "", "Organizations": None},
+        {"Filename": "b.txt", "Names": "Jane Doe", "Emails": "jane@example.com", "Organizations": ""},
+    ])
+    assert stats.totals("person") == {"extracted": 3, "distinct": 2, "mentions": 3}
+    assert stats.totals("email") == {"extracted": 1, "distinct": 1, "mentions": 1}
+    assert stats.totals("organization") == {"extracted": 0, "distinct": 0, "mentions": 0}
+    assert stats.top("organization") == []
+
+
+def test_saved_stats_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(entity_stats, "OUTPUT_FOLDER", tmp_path)
+    stats = EntityStats()
+    stats.add("a.txt", _result(person=["Jane Doe", "John Roe"], mentions={"person": {"Jane Doe": 2, "John Roe": 1}}))
+
+    summary = stats.save("batch", files_processed=3, k=1)
+    assert load_stats("batch") == summary
+    assert summary["files_processed"] == 3
+    assert summary["names"]["top"] == [["Jane Doe", 2, 1, "a.txt"]]
+    assert summary["names"]["distinct"] == 2
+
+    with open(tmp_path / "batch.entities.csv", newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows == [["Label", "Entity", "Mentions", "Documents", "First Seen"],
+                    ["names", "Jane Doe", "2", "1", "a.txt"],
+                    ["names", "John Roe", "1", "1", "a.txt"]]
+
+
+def test_stats_of_other_versions_are_ignored(tmp_path, monkeypatch):
+    monkeypatch.setattr(entity_stats, "OUTPUT_FOLDER", tmp_path)
+    (tmp_path / "old.stats.json").write_text('{"version": 0}', encoding="utf-8")
+    assert load_stats("old") is None
+    assert load_stats("missing") is None
@@ -0,0 +1,98 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Gazetteer matching: the token-level Aho-Corasick automaton, leftmost-
+#          longest hit selection, the disk cache and merging hits into spaCy
+#          entities (blank pipeline, no model needed).
+# ──────────────────────────────────────────────────────────────────────────────
+
+import pytest
+import spacy
+from spacy.tokens import Span
+
+from extractor import gazetteer
+from extractor.gazetteer import AhoCorasick, build_gazetteer, merge_gazetteer_entities, tokenize
+
+
+@pytest.fixture
+def lists(tmp_path):
+    directory = tmp_path / "gazetteer"
+    directory.mkdir()
+    (directory / "org_customers.txt").write_text(
+        "# customer list\nBank of America\nAmerica Online\nNew York Times\nYork\nInitech\n", encoding="utf-8")
+    (directory / "person_staff.txt").write_text("Ada Lovelace\n", encoding="utf-8")
+    (directory / "notes.txt").write_text("Not A List\n", encoding="utf-8")  # no label prefix: ignored
+    return directory
+
+
+@pytest.fixture
+def compiled(lists, tmp_path):
+    return build_gazetteer(lists, tmp_path / "cache")
+
+
+def _texts(text, hits):
+    return [(text[start:end], label) for start, end, label in hits]
+
+
+def test_automaton_reports_every_match_including_nested_ones():
+    automaton = AhoCorasick()
+    for name in ("new york", "new york times", "york", "times square"):
+        automaton.add(name.split(), "ORG")
+    automaton.build()
+
+    words = [token for token, _, _ in tokenize("the New York Times Square office")]
+    assert sorted(automaton.iter_matches(words)) == [
+        (1, 2, "ORG"), (1, 3, "ORG"), (2, 2, "ORG"), (3, 4, "ORG"),
+    ]
+
+
+def test_multi_token_names_match_case_insensitively(compiled):
+    text = "Ada LOVELACE joined initech."
+    assert _texts(text, compiled.find(text)) == [("Ada LOVELACE", "PERSON"), ("initech", "ORG")]
+
+
+def test_overlapping_names_resolve_leftmost_longest(compiled):
+    text = "Bank of America Online and the New York Times"
+    # "America Online" overlaps the earlier "Bank of America"; "York" sits inside "New York Times"
+    assert _texts(text, compiled.find(text)) == [("Bank of America", "ORG"), ("New York Times", "ORG")]
+
+
+def test_unlabelled_files_and_comments_are_ignored(compiled):
+    assert compiled.find("Not A List, customer list") == []
+    assert len(compiled.automaton) == 6
+
+
+def test_compiled_automaton_is_cached(lists, tmp_path, compiled):
+    cache_files = list((tmp_path / "cache").glob("gazetteer_*.pkl"))
+    assert len(cache_files) == 1
+
+    cached = build_gazetteer(lists, tmp_path / "cache")
+    assert cached.signature == compiled.signature
+    assert cached.find("Initech") == [(0, 7, "ORG")]
+
+
+def test_gazetteer_hits_merge_with_model_entities(compiled, monkeypatch):
+    monkeypatch.setattr(gazetteer, "get_gazetteer", lambda: compiled)
+    nlp = spacy.blank("en")
+    doc = nlp("Ada Lovelace met Grace Hopper at Bank of America and Initech")
+    doc.ents = [
+        Span(doc, 0, 1, label="PERSON"),   # "Ada": shorter than the gazetteer's "Ada Lovelace"
+        Span(doc, 3, 5, label="PERSON"),   # "Grace Hopper": not listed, kept
+        Span(doc, 10, 11, label="PERSON"),  # "Initech": same span as a hit, the gazetteer label wins
+    ]
+
+    merge_gazetteer_entities(doc)
+    assert [(ent.text, ent.label_) for ent in doc.ents] == [
+        ("Ada Lovelace", "PERSON"),
+        ("Grace Hopper", "PERSON"),
+        ("Bank of America", "ORG"),
+        ("Initech", "ORG"),
+    ]
+
+
+def test_longer_model_entity_wins_over_a_gazetteer_hit(compiled, monkeypatch):
+    monkeypatch.setattr(gazetteer, "get_gazetteer", lambda: compiled)
+    doc = spacy.blank("en")("Initech Global Holdings reported")
+    doc.ents = [Span(doc, 0, 3, label="ORG")]
+
+    merge_gazetteer_entities(doc)
+    assert [(ent.text, ent.label_) for ent in doc.ents] == [("Initech Global Holdings", "ORG")]
@@ -0,0 +1,45 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Language identification used to route documents to spaCy pipelines.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import pytest
+
+from extractor.language import PROFILES, WORD_LANGUAGE, detect_language
+from utils.config import DEFAULT_LANGUAGE
+
+SAMPLES = {
+    "en": "Jane Doe is a software engineer with ten years of experience in the design of distributed systems. "
+          "She has led teams that were responsible for the payment platform and the data pipeline.",
+    "es": "El presente contrato se celebra entre la empresa y el trabajador, quien prestará sus servicios en la "
+          "sede de Madrid. Las partes acuerdan que el salario será pagado al final de cada mes.",
+    "fr": "Jean Dupont est ingénieur logiciel avec dix ans d'expérience dans la conception de systèmes "
+          "distribués. Il a dirigé une équipe de développeurs pour la plateforme de paiement de la société.",
+    "de": "Die Firma hat im letzten Jahr einen neuen Standort in Berlin eröffnet. Der Vertrag mit dem Kunden "
+          "wird nach der Prüfung durch die Rechtsabteilung unterschrieben.",
+    "it": "La società ha aperto una nuova sede a Milano e il contratto con il cliente è stato firmato dopo la "
+          "revisione dell'ufficio legale. Gli utili sono cresciuti anche quest'anno.",
+    "pt": "O relatório anual da empresa mostra que as vendas cresceram no último ano. A diretoria aprovou um "
+          "novo plano de investimentos para a região e os resultados foram apresentados aos acionistas.",
+    "nl": "Het bedrijf heeft vorig jaar een nieuwe vestiging in Amsterdam geopend. De overeenkomst met de klant "
+          "wordt na de controle door de juridische afdeling ondertekend.",
+}
+
+
+def test_every_profile_has_a_sample():
+    assert set(SAMPLES) == set(PROFILES)
+
+
+@pytest.mark.parametrize("language", sorted(SAMPLES))
+def test_detects_sample_language(language):
+    assert detect_language(SAMPLES[language]) == language
+
+
+@pytest.mark.parametrize("word", ["de", "en", "a", "la", "que", "e", "o", "in", "is", "com"])
+def test_shared_words_carry_no_language(word):
+    assert word not in WORD_LANGUAGE
+
+
+def test_too_little_evidence_falls_back_to_default():
+    assert detect_language("Curriculum vitae. Jean Dupont, chef de projet de 2015 à 2020.") == DEFAULT_LANGUAGE
+    assert detect_language("") == DEFAULT_LANGUAGE
@@ -0,0 +1,64 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Prometheus text output of the in-process metrics, the per-worker
+#          label and merging values recorded in another process.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from utils.metrics import Registry
+
+
+def _registry():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests handled.", ("route", "status"))
+    latency = registry.histogram("latency_seconds", "Request latency.", ("route",), buckets=(0.1, 1.0))
+    return registry, requests, latency
+
+
+def test_counter_and_histogram_text_format(monkeypatch):
+    monkeypatch.delenv("PREFORK_WORKER_SLOT", raising=False)
+    registry, requests, latency = _registry()
+    requests.inc(route="/upload/", status=200)
+    requests.inc(2, route="/upload/", status=200)
+    requests.inc(route='/a"b', status=500)
+    latency.observe(0.05, route="/upload/")
+    latency.observe(0.5, route="/upload/")
+    latency.observe(5, route="/upload/")
+
+    assert registry.render() == "\n".join([
+        "# HELP requests_total Requests handled.",
+        "# TYPE requests_total counter",
+        'requests_total{route="/a\\"b",status="500"} 1',
+        'requests_total{route="/upload/",status="200"} 3',
+        "# HELP latency_seconds Request latency.",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/upload/",le="0.1"} 1',
+        'latency_seconds_bucket{route="/upload/",le="1.0"} 2',
+        'latency_seconds_bucket{route="/upload/",le="+Inf"} 3',
+        'latency_seconds_sum{route="/upload/"} 5.55',
+        'latency_seconds_count{route="/upload/"} 3',
+    ]) + "\n"
+
+
+def test_prefork_workers_label_their_series(monkeypatch):
+    monkeypatch.setenv("PREFORK_WORKER_SLOT", "2")
+    registry, requests, latency = _registry()
+    requests.inc(route="/", status=200)
+    latency.observe(0.5, route="/")
+
+    output = registry.render()
+    assert 'requests_total{route="/",status="200",worker="2"} 1' in output
+    assert 'latency_seconds_bucket{route="/",worker="2",le="1.0"} 1' in output
+    assert 'latency_seconds_count{route="/",worker="2"} 1' in output
+
+
+def test_drained_values_merge_into_another_registry():
+    worker, worker_requests, worker_latency = _registry()
+    parent, parent_requests, parent_latency = _registry()
+    parent_requests.inc(route="/", status=200)
+    worker_requests.inc(2, route="/", status=200)
+    worker_latency.observe(0.5, route="/")
+
+    parent.merge(worker.drain())
+    assert parent_requests.value(route="/", status=200) == 3
+    assert parent_latency.count(route="/") == 1
+    assert worker.drain() == {}  # drained values are not sent twice
@@ -0,0 +1,108 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Near-duplicate reuse of stored chunk results (utils/near_duplicates.py).
+# ──────────────────────────────────────────────────────────────────────────────
+
+import re
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.database import Base
+from utils.near_duplicates import extract_with_reuse
+from utils.post_process import DEFAULT_POST_PROCESSOR
+
+PARAGRAPH = ("Quarterly review prepared for the board of Globex Corporation by Jane Doe. "
+             "The operations team met every Monday to review the logistics pipeline, and the results "
+             "were shared with the regional offices in Lisbon, Lyon and Leeds. Section {n}.\n\n")
+TEXT = "".join(PARAGRAPH.format(n=n) for n in range(12))
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+class FakeExtractor:
+    """Finds the fixed names below with a regex and records the texts it was given."""
+
+    NAMES = {"person": ["Jane Doe", "John Smith"], "organization": ["Globex Corporation", "Initech"]}
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, text):
+        self.calls.append(text)
+        result = {field: [name for name in names for _ in re.findall(re.escape(name), text)]
+                  for field, names in self.NAMES.items()}
+        result["email"] = []
+        result["source"] = "spacy"
+        return DEFAULT_POST_PROCESSOR.process_result(result)
+
+
+def test_near_duplicate_within_one_session_reuses_chunks(db):
+    extract = FakeExtractor()
+    extract_with_reuse(db, "a.txt", TEXT, extract)
+    edited = TEXT.replace("Section 11.", "Section 11, reviewed by John Smith.")
+    result = extract_with_reuse(db, "b.txt", edited, extract)
+
+    assert len(extract.calls) == 2
+    assert len(extract.calls[1]) < len(edited) / 2  # only the changed chunk(s)
+    assert result["near_duplicate_of"] is not None
+    assert set(result["person"]) == {"Jane Doe", "John Smith"}
+
+
+def test_exact_duplicate_within_one_session_skips_extraction(db):
+    extract = FakeExtractor()
+    first = extract_with_reuse(db, "a.txt", TEXT, extract)
+    second = extract_with_reuse(db, "b.txt", TEXT, extract)
+
+    assert len(extract.calls) == 1
+    assert second["person"] == first["person"]
+    assert second["organization"] == first["organization"]
+
+
+class Normalizing(FakeExtractor):
+    """Also reports a name that is not literally in the text, as GPT does when it normalizes."""
+
+    def __call__(self, text):
+        result = super().__call__(text)
+        result["organization"].append("Globex Holdings")
+        return result
+
+
+def test_entities_outside_any_single_chunk_survive_exact_duplicates(db):
+    extract = Normalizing()
+    extract_with_reuse(db, "a.txt", TEXT, extract)
+    second = extract_with_reuse(db, "b.txt", TEXT, extract)
+
+    assert len(extract.calls) == 1
+    assert "Globex Holdings" in second["organization"]
+
+
+def test_near_duplicate_of_document_with_unplaced_entities_is_fully_extracted(db):
+    extract = Normalizing()
+    extract_with_reuse(db, "a.txt", TEXT, extract)
+    edited = TEXT.replace("Section 11.", "Section 11, reviewed by John Smith.")
+    result = extract_with_reuse(db, "b.txt", edited, extract)
+
+    assert extract.calls[1] == edited
+    assert "Globex Holdings" in result["organization"]
+
+
+def test_reused_results_keep_mention_counts(db):
+    extract = FakeExtractor()
+    text = TEXT.replace("by Jane Doe.", "by Jane Doe, Jane Doe and Jane Doe.")
+    first = extract_with_reuse(db, "a.txt", text, extract)
+    duplicate = extract_with_reuse(db, "b.txt", text, extract)
+    edited = extract_with_reuse(db, "c.txt", text.replace("Section 11.", "Section 11, by John Smith."), extract)
+
+    assert first["mentions"]["person"]["Jane Doe"] == 36
+    assert duplicate["mentions"] == first["mentions"]
+    assert edited["mentions"]["person"] == {"Jane Doe": 36, "John Smith": 1}
+    assert edited["mentions"]["organization"] == {"Globex Corporation": 12}
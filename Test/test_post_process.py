@@ -0,0 +1,33 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Entity post-processing rules (utils/post_process.py).
+# ──────────────────────────────────────────────────────────────────────────────
+
+from utils.post_process import DEFAULT_POST_PROCESSOR, PostProcessor, clean_entities
+
+
+def test_org_keeps_all_caps_names_and_mixed_case_noise_entries():
+    kept = DEFAULT_POST_PROCESSOR.process(["NVIDIA", "UNICEF", "GPA", "Scale", "IBM"], "ORG")
+    assert kept == ["NVIDIA", "UNICEF", "GPA", "Scale", "IBM"]
+
+
+def test_noise_words_and_short_or_symbolic_entities_are_dropped():
+    assert clean_entities(["the", "And", "•", "UN", "123", "Acme Corp."], "ORG") == ["Acme Corp"]
+
+
+def test_acronym_filter_is_opt_in():
+    engine = PostProcessor({"ORG": ("normalize", "has_letters", "noise_word", "length", "org_acronym")})
+    assert engine.process(["NVIDIA", "NASA", "ACME", "Acme Labs"], "ORG") == ["NASA", "ACME", "Acme Labs"]
+
+
+def test_person_rules_and_order_preserving_dedup():
+    people = ["Jane  Doe.", "Jane Doe", "R2D2", "jane@x.com", "John Smith", "Jane Doe"]
+    assert DEFAULT_POST_PROCESSOR.process(people, "PERSON") == ["Jane Doe", "John Smith"]
+
+
+def test_mentions_count_raw_occurrences_per_cleaned_entity():
+    result = DEFAULT_POST_PROCESSOR.process_result(
+        {"person": ["Jane Doe", "Jane Doe.", "the"], "organization": [], "email": ["A@X.COM", "a@x.com"]})
+    assert result["mentions"]["person"] == {"Jane Doe": 2}
+    assert result["email"] == ["a@x.com"]
+    assert result["mentions"]["email"] == {"a@x.com": 2}
@@ -0,0 +1,86 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Per-request profiling traces only the profiled request's thread and
+#          releases the profiler however the request ends.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import pstats
+import threading
+
+from utils import profiling
+
+
+def _profiled_work():
+    return sum(range(1000))
+
+
+def _other_request_work(stop):
+    while not stop.is_set():
+        sum(range(100))
+
+
+def _functions(profile):
+    return {name for _, _, name in pstats.Stats(profile.profiler).stats}
+
+
+def test_run_traces_only_the_profiled_thread():
+    profiling._profiler_lock.acquire()  # taken by profile_for_request
+    profile = profiling.RequestProfile("test").start()
+
+    stop = threading.Event()
+    other = threading.Thread(target=_other_request_work, args=(stop,))
+    other.start()
+    worker = threading.Thread(target=profile.run, args=(_profiled_work,))
+    worker.start()
+    worker.join()
+    stop.set()
+    other.join()
+    profile.abort()
+
+    functions = _functions(profile)
+    assert "_profiled_work" in functions
+    assert "_other_request_work" not in functions
+
+
+def test_abort_frees_the_profiler():
+    profiling._profiler_lock.acquire()
+    profile = profiling.RequestProfile("test").start()
+    assert profile.run(_profiled_work) == 499500
+    profile.abort()
+
+    assert profiling._profiler_lock.acquire(blocking=False)
+    profiling._profiler_lock.release()
+
+
+def test_abort_during_run_frees_the_profiler_once_the_work_ends():
+    profiling._profiler_lock.acquire()
+    profile = profiling.RequestProfile("test").start()
+    started, release = threading.Event(), threading.Event()
+
+    def work():
+        started.set()
+        release.wait(5)
+
+    worker = threading.Thread(target=profile.run, args=(work,))
+    worker.start()
+    started.wait(5)
+    profile.abort()  # the client went away; the thread is still running
+    assert not profiling._profiler_lock.acquire(blocking=False)
+
+    release.set()
+    worker.join()
+    assert profiling._profiler_lock.acquire(blocking=False)
+    profiling._profiler_lock.release()
+
+
+def test_abort_after_finish_is_a_no_op(monkeypatch, tmp_path):
+    monkeypatch.setattr(profiling, "OUTPUT_FOLDER", tmp_path)
+    profiling._profiler_lock.acquire()
+    profile = profiling.RequestProfile("test").start()
+    profile.run(_profiled_work)
+    artifacts = profile.finish(200)
+    profile.abort()
+
+    assert len(artifacts) == 3
+    assert profiling._profiler_lock.acquire(blocking=False)
+    profiling._profiler_lock.release()
@@ -0,0 +1,68 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Column-oriented batch results (utils/result_set.py).
+# ──────────────────────────────────────────────────────────────────────────────
+
+import json
+
+import pytest
+
+from utils.result_set import ResultSet, ResultWriter
+
+RESULTS = [
+    ("a.pdf", {"person": ["Jane Doe"], "organization": ["Acme, Inc"], "email": ["jane@acme.com"],
+               "mentions": {"person": {"Jane Doe": 3}}, "source": "spacy", "language": "en",
+               "annotations": "en_core_web_sm-3.7.1/abc"}),
+    ("b.docx", {"person": ["Jane Doe", "Juan Pérez"], "organization": [], "email": [], "source": "spacy+gpt"}),
+    ("empty.txt", {"person": [], "organization": [], "email": []}),
+]
+
+
+def _result_set():
+    results = ResultSet()
+    for filename, result in RESULTS:
+        results.add(filename, result)
+    return results
+
+
+def _snapshot(results):
+    return [(document.filename, document.source, document.language, document.annotations,
+             document.person, document.organization, document.email, document.mentions) for document in results]
+
+
+def test_documents_read_like_result_dicts():
+    document = _result_set().document(0)
+    assert document.get("organization") == ["Acme, Inc"]  # commas survive
+    assert document.mentions["person"] == {"Jane Doe": 3}
+    assert document.get("missing", "default") == "default"
+
+
+def test_jsonl_round_trip(tmp_path):
+    results = _result_set()
+    path = tmp_path / "batch.results.jsonl"
+    results.write_jsonl(path)
+    assert _snapshot(ResultSet.read_jsonl(path)) == _snapshot(results)
+
+
+def test_streamed_writer_matches_write_jsonl(tmp_path):
+    writer = ResultWriter(tmp_path / "streamed.jsonl")
+    for filename, result in RESULTS:
+        writer.write(filename, result)
+    writer.close()
+    _result_set().write_jsonl(tmp_path / "batch.jsonl")
+    assert (tmp_path / "streamed.jsonl").read_text() == (tmp_path / "batch.jsonl").read_text()
+
+
+def test_newer_format_versions_are_rejected(tmp_path):
+    path = tmp_path / "future.jsonl"
+    path.write_text(json.dumps({"format": "entity-results", "version": 99}) + "\n")
+    with pytest.raises(ValueError):
+        ResultSet.read_jsonl(path)
+
+
+def test_remap_merges_entities_that_become_equal():
+    results = ResultSet()
+    results.add("a.pdf", {"person": ["J. Doe", "Jane Doe"], "mentions": {"person": {"J. Doe": 1, "Jane Doe": 2}}})
+    results.remap("person", {"J. Doe": "Jane Doe"})
+    assert results.document(0).mentions["person"] == {"Jane Doe": 3}
+    assert list(results.values("person")) == ["Jane Doe"]
@@ -0,0 +1,77 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: The sandbox worker pool: deadlines (including the wait for a free
+#          worker), the memory cap, crash isolation and metrics, with real
+#          worker processes. Jobs are builtins or app functions so the workers
+#          can unpickle them.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+from extractor.sandbox import SandboxError, SandboxPool, read_file_job
+from utils.metrics import FILE_READ_SECONDS
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(size=1, timeout=30, memory_mb=256, max_jobs=0, start_method="forkserver")
+    assert pool.run(len, "warm") == 4  # wait for the worker to finish starting
+    yield pool
+    pool.shutdown()
+
+
+def test_job_past_its_deadline_is_killed_and_the_worker_replaced(pool):
+    started = time.monotonic()
+    with pytest.raises(SandboxError) as error:
+        pool.run(time.sleep, 30, timeout=1)
+    assert error.value.kind == "timeout"
+    assert time.monotonic() - started < 10
+    assert pool.run(len, "next") == 4
+
+
+def test_waiting_for_a_busy_worker_counts_against_the_deadline(pool):
+    busy = threading.Thread(target=pool.run, args=(time.sleep, 3))
+    busy.start()
+    time.sleep(0.5)
+    started = time.monotonic()
+    with pytest.raises(SandboxError) as error:
+        pool.run(len, "queued", timeout=0.5)
+    assert error.value.kind == "timeout"
+    assert time.monotonic() - started < 2
+    busy.join()
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="RLIMIT_AS is enforced on Linux")
+def test_job_over_the_memory_cap_fails_without_taking_down_the_pool(pool):
+    with pytest.raises(SandboxError) as error:
+        pool.run(bytearray, 2 * 1024 ** 3)
+    assert error.value.kind == "memory"
+    assert pool.run(len, "after") == 5
+
+
+def test_crashed_worker_only_fails_its_own_job(pool):
+    with pytest.raises(SandboxError) as error:
+        pool.run(os._exit, 3)
+    assert error.value.kind == "crashed"
+    assert pool.run(len, "still here") == 10
+
+
+def test_job_exceptions_are_reported_and_the_worker_kept(pool):
+    with pytest.raises(SandboxError) as error:
+        pool.run(int, "not a number")
+    assert error.value.kind == "error"
+    assert "ValueError" in str(error.value)
+    assert pool.run(len, "ok") == 2
+
+
+def test_metrics_recorded_in_the_worker_reach_the_parent(pool, tmp_path):
+    path = tmp_path / "note.txt"
+    path.write_text("Jane Doe", encoding="utf-8")
+    before = FILE_READ_SECONDS.count(format="txt")
+    assert pool.run(read_file_job, str(path)) == "Jane Doe"
+    assert FILE_READ_SECONDS.count(format="txt") == before + 1
@@ -0,0 +1,65 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: The pre-fork supervisor's respawn policy: backoff for workers that
+#          keep failing right after start, and giving up instead of fork-looping.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from api import server
+from api.server import PreforkServer, parse_args
+
+
+def _server(**overrides):
+    supervisor = PreforkServer(app=None, sock=None, args=parse_args(["--workers", "2"]))
+    for name, value in overrides.items():
+        setattr(supervisor, name, value)
+    return supervisor
+
+
+def test_fast_failures_back_off_exponentially(monkeypatch):
+    monkeypatch.setattr(server.time, "monotonic", lambda: 100.0)
+    supervisor = _server()
+
+    delays = []
+    for _ in range(4):
+        assert supervisor.schedule_respawn(0, lifetime=1, code=1)
+        delays.append(supervisor.respawn_at.pop(0) - 100.0)
+    assert delays == [0.5, 1, 2, 4]
+
+    # Each slot keeps its own count
+    assert supervisor.schedule_respawn(1, lifetime=1, code=1)
+    assert supervisor.respawn_at[1] - 100.0 == 0.5
+
+
+def test_backoff_is_capped():
+    supervisor = _server(MAX_FAST_EXITS=100, BACKOFF_MAX_SECONDS=30)
+    for _ in range(20):
+        supervisor.schedule_respawn(0, lifetime=1, code=1)
+    assert supervisor.respawn_at[0] - server.time.monotonic() <= 30
+
+
+def test_recycled_or_long_lived_workers_reset_the_count():
+    supervisor = _server()
+    for _ in range(3):
+        supervisor.schedule_respawn(0, lifetime=1, code=1)
+    supervisor.schedule_respawn(0, lifetime=1, code=0)  # recycled after max requests
+    assert supervisor.fast_exits[0] == 0
+
+    for _ in range(3):
+        supervisor.schedule_respawn(0, lifetime=1, code=1)
+    supervisor.schedule_respawn(0, lifetime=3600, code=1)
+    assert supervisor.fast_exits[0] == 0
+
+
+def test_gives_up_after_repeated_fast_failures(monkeypatch):
+    supervisor = _server(BACKOFF_BASE_SECONDS=0)
+    spawned = []
+    exits = iter([[(0, 0.1, 1)]] * supervisor.MAX_FAST_EXITS)
+
+    monkeypatch.setattr(supervisor, "spawn", spawned.append)
+    monkeypatch.setattr(supervisor, "reap", lambda: next(exits, []))
+    monkeypatch.setattr(server.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(server.signal, "signal", lambda sig, handler: None)
+
+    assert supervisor.run() == 1
+    # Two initial workers plus one replacement for each failure before giving up
+    assert spawned == [0, 1] + [0] * (supervisor.MAX_FAST_EXITS - 1)
@@ -0,0 +1,107 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: The NDJSON upload stream: record order, indexes, error and summary
+#          records, and skipping queued files once the client has gone.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import json
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from db.database import Base, ExtractionLog
+from extractor.cascade import GPTBudget
+from extractor.sandbox import SandboxError
+from routes import upload_routes
+from utils import entity_stats
+
+
+def _fake_process_document(path, filename, db, budget, profile=None):
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    if filename == "slow.txt":
+        time.sleep(0.3)
+    if filename == "crash.txt":
+        raise SandboxError("crashed", "Sandbox worker exited unexpectedly (exit code -11).")
+    return text, {"person": [text.strip()], "organization": [], "email": [], "source": "spacy"}
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    sessions = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    monkeypatch.setattr(upload_routes, "SessionLocal", sessions)
+    monkeypatch.setattr(upload_routes, "OUTPUT_FOLDER", tmp_path)
+    monkeypatch.setattr(entity_stats, "OUTPUT_FOLDER", tmp_path)
+    monkeypatch.setattr(upload_routes, "process_document", _fake_process_document)
+
+    app = FastAPI()
+    app.include_router(upload_routes.router)
+    return TestClient(app), sessions, tmp_path
+
+
+def _records(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_stream_records(setup):
+    client, sessions, output = setup
+    files = [
+        ("files", ("slow.txt", b"Ada Lovelace", "text/plain")),
+        ("files", ("fast.txt", b"Grace Hopper", "text/plain")),
+        ("files", ("image.png", b"\x89PNG", "image/png")),
+        ("files", ("crash.txt", b"boom", "text/plain")),
+        ("files", ("empty.txt", b"", "text/plain")),
+    ]
+    response = client.post("/upload/stream", files=files)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    records = _records(response)
+
+    # Rejected files first, then results in completion order, the summary last
+    assert records[0] == {"type": "error", "index": 2, "filename": "image.png",
+                          "error": "Unsupported file type: image/png"}
+    summary = records[-1]
+    body = records[1:-1]
+    results = [record for record in body if record["type"] == "result"]
+    assert [(r["index"], r["filename"], r["person"]) for r in results] == [
+        (1, "fast.txt", ["Grace Hopper"]), (0, "slow.txt", ["Ada Lovelace"]),
+    ]
+    errors = {record["index"]: record for record in body if record["type"] == "error"}
+    assert errors[3]["filename"] == "crash.txt" and "exited unexpectedly" in errors[3]["error"]
+    assert errors[4]["error"] == "The file is empty."
+
+    results_id = response.headers["X-Results-Id"]
+    assert summary["type"] == "summary"
+    assert (summary["files"], summary["processed"], summary["failed"], summary["unsupported"]) == (5, 2, 2, 1)
+    assert summary["names_extracted"] == 2
+    assert summary["results_url"] == f"/results/{results_id}"
+
+    with open(output / f"{results_id}.json", encoding="utf-8") as f:
+        assert json.load(f)["files_processed"] == 2
+    db = sessions()
+    assert sorted(log.filename for log in db.query(ExtractionLog)) == ["fast.txt", "slow.txt"]
+    db.close()
+
+
+def test_cancelled_stream_skips_files_not_yet_started(setup, monkeypatch):
+    _, sessions, output = setup
+    calls = []
+    monkeypatch.setattr(upload_routes, "process_document", lambda *args: calls.append(args))
+    path = output / "queued.txt"
+    path.write_text("Ada Lovelace", encoding="utf-8")
+
+    cancelled = threading.Event()
+    cancelled.set()
+    assert upload_routes._process_saved_file("queued.txt", path, None, GPTBudget(), cancelled) is None
+    assert calls == []
+    db = sessions()
+    assert db.query(ExtractionLog).count() == 0
+    db.close()
@@ -0,0 +1,103 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Usage rollups kept alongside the extraction log.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db.database import AppMarker, Base, ExtractionLog
+from utils import usage_rollups
+from utils.usage_rollups import BACKFILL_PROGRESS, add_extraction_logs, ensure_rollups, usage_summary
+
+UNTIL = datetime(2026, 1, 6)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+
+def _log(ip, names=1):
+    return ExtractionLog(filename="a.txt", upload_time=datetime(2026, 1, 5, 10), name_count=names,
+                         email_count=0, org_count=0, user_ip=ip)
+
+
+def test_backfill_runs_even_if_a_live_upload_wrote_rollups_first(db):
+    db.add_all([_log("203.0.113.7"), _log("203.0.113.7")])  # logged before rollups existed
+    db.commit()
+    add_extraction_logs(db, [_log("198.51.100.2")])  # live upload before the backfill task ran
+    db.commit()
+
+    ensure_rollups(db)
+    until = datetime(2026, 1, 6)
+    assert usage_summary(db, "day", since=datetime(2026, 1, 1), until=until)["totals"]["documents"] == 3
+
+    # Later starts leave the rollups alone
+    add_extraction_logs(db, [_log("198.51.100.2")])
+    db.commit()
+    ensure_rollups(db)
+    assert usage_summary(db, "day", since=datetime(2026, 1, 1), until=until)["totals"]["documents"] == 4
+
+
+def _documents(db):
+    return usage_summary(db, "day", since=datetime(2026, 1, 1), until=UNTIL)["totals"]["documents"]
+
+
+def test_interrupted_backfill_resumes_without_double_counting(db, monkeypatch):
+    db.add_all([_log("203.0.113.7") for _ in range(5)])
+    db.commit()
+
+    real_aggregate, calls = usage_rollups._aggregate, []
+
+    def failing_aggregate(entries):
+        calls.append(1)
+        if len(calls) == 3:
+            raise RuntimeError("worker stopped")
+        return real_aggregate(entries)
+
+    monkeypatch.setattr(usage_rollups, "_aggregate", failing_aggregate)
+    with pytest.raises(RuntimeError):
+        usage_rollups.rebuild_rollups(db, chunk_size=2, restart=False)
+    db.rollback()
+    assert db.get(AppMarker, BACKFILL_PROGRESS).value == "5:4"  # two chunks committed
+
+    monkeypatch.setattr(usage_rollups, "_aggregate", real_aggregate)
+    ensure_rollups(db)
+    assert _documents(db) == 5
+    assert db.get(AppMarker, BACKFILL_PROGRESS) is None
+
+
+def test_backfill_lets_uploads_commit_between_chunks(tmp_path, monkeypatch):
+    url = f"sqlite:///{tmp_path / 'usage.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    backfill = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    # A second process that gives up at once instead of waiting for the lock
+    upload = sessionmaker(autocommit=False, autoflush=False,
+                          bind=create_engine(url, connect_args={"timeout": 0}))()
+    backfill.add_all([_log("203.0.113.7") for _ in range(4)])
+    backfill.commit()
+
+    real_aggregate, calls = usage_rollups._aggregate, []
+
+    def aggregate_during_upload(entries):
+        calls.append(1)
+        if len(calls) <= 2:
+            add_extraction_logs(upload, [_log("198.51.100.2")])
+            upload.commit()
+        return real_aggregate(entries)
+
+    monkeypatch.setattr(usage_rollups, "_aggregate", aggregate_during_upload)
+    usage_rollups.rebuild_rollups(backfill, chunk_size=1)
+
+    assert _documents(backfill) == 6  # live uploads are counted once
+    backfill.close()
+    upload.close()
@@ -0,0 +1,61 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Streamed ZIP bundles (utils/zip_stream.py) and their Range handling.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime
+import io
+import os
+import zipfile
+
+import pytest
+
+from routes.results_routes import _parse_range
+from utils.zip_stream import ZipMember, iter_zip, slice_stream
+
+MODIFIED = datetime(2026, 1, 5, 10, 30)
+
+
+def _members(tmp_path):
+    big = tmp_path / "big.bin"
+    if not big.exists():
+        big.write_bytes(os.urandom(200_000) + b"x" * 300_000)  # spans several read chunks
+    return [
+        ZipMember.from_file(big),
+        ZipMember.from_bytes("documents/00001_a.json", b'{"person": ["Jane Doe"]}', MODIFIED),
+        ZipMember.from_bytes("empty.txt", b"", MODIFIED),
+    ]
+
+
+def test_archive_round_trips(tmp_path):
+    data = b"".join(iter_zip(_members(tmp_path)))
+    archive = zipfile.ZipFile(io.BytesIO(data))
+    assert archive.testzip() is None
+    assert archive.namelist() == ["big.bin", "documents/00001_a.json", "empty.txt"]
+    assert archive.read("big.bin") == (tmp_path / "big.bin").read_bytes()
+    assert archive.read("documents/00001_a.json") == b'{"person": ["Jane Doe"]}'
+
+
+def test_archive_bytes_are_deterministic(tmp_path):
+    assert b"".join(iter_zip(_members(tmp_path))) == b"".join(iter_zip(_members(tmp_path)))
+
+
+@pytest.mark.parametrize("start, end", [(0, None), (1000, None), (70_000, 70_010), (5, 5)])
+def test_slices_match_the_full_stream(tmp_path, start, end):
+    full = b"".join(iter_zip(_members(tmp_path)))
+    part = b"".join(slice_stream(iter_zip(_members(tmp_path)), start, end))
+    assert part == full[start:None if end is None else end + 1]
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-99", (0, 99)),
+    ("bytes=900-", (900, 999)),
+    ("bytes=-100", (900, 999)),
+    ("bytes=990-2000", (990, 999)),
+    ("bytes=5-2", None),  # invalid: ignored, the whole archive is sent
+    ("bytes=0-1,5-9", None),  # multiple ranges: the whole archive is sent
+    ("items=0-1", None),
+    ("bytes=1000-", "invalid"),
+])
+def test_parse_range(header, expected):
+    assert _parse_range(header, 1000) == expected
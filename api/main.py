@@ -22,18 +22,52 @@ import csv
 from utils.logger import logger
 from utils.config import CLEANUP_INTERVAL_SECONDS, FILE_EXPIRATION_SECONDS, OUTPUT_FOLDER, LOG_FOLDER, PROJECT_ROOT
 from utils.file_cleanup import cleanup_old_files
+from utils.metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS
+from utils.admission import AdmissionMiddleware
+from extractor.text_extractor import warm_up
+from utils.lazy_imports import lazy_import
 from db.database import SessionLocal, engine, Base
 from routes.upload_routes import router as upload_routes
 from routes.results_routes import router as results_routes
 from routes.feedback_routes import router as feedback_routes
 from routes.upload_history import router as upload_history_routes
+from routes.metrics_routes import router as metrics_routes
+from routes.health_routes import router as health_routes
+from routes.api_routes import router as api_routes, extract_batcher
+from routes.usage_routes import router as usage_routes
+from utils.usage_rollups import ensure_rollups
+from extractor.sandbox import shutdown_pool
 
 # ──────── Load .env variables ────────
 load_dotenv()
 
+# Heavy libraries imported after the model so the first upload doesn't pay for them
+WARM_UP_MODULES = ("pandas", "openpyxl", "pdfplumber", "docx")
+
+def warm_up_worker():
+    """Loads the spaCy model and heavy readers/exporters in the background."""
+    start = time.perf_counter()
+    warm_up()
+    for module in WARM_UP_MODULES:
+        try:
+            lazy_import(module)
+        except ImportError as e:
+            logger.warning(f"⚠️ Warm-up could not import {module}: {e}")
+    logger.info(f"🔥 Warm-up finished in {time.perf_counter() - start:.2f}s")
+
+def _backfill_usage_rollups():
+    """Builds the usage rollups from the existing extraction log on the first start with them."""
+    db = SessionLocal()
+    try:
+        ensure_rollups(db)
+    except Exception as e:
+        logger.error(f"Could not backfill the usage rollups: {e}", exc_info=True)
+    finally:
+        db.close()
+
 # ──────────────────────────────────────────────────────────────────────────────
 # App lifecycle context: Initializes folders, warns if API key is missing,
-# and starts background file cleanup.
+# starts the background model warm-up and file cleanup.
 # ──────────────────────────────────────────────────────────────────────────────
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -47,17 +81,43 @@ async def lifespan(app: FastAPI):
     if not os.getenv("OPENAI_API_KEY"):
         logger.warning("Waring:⚠️ An OPENAI_API_KEY was not set. GPT extraction will fail if not used.")
 
-    # Start file cleanup task
-    asyncio.create_task(cleanup_old_files(OUTPUT_FOLDER, FILE_EXPIRATION_SECONDS, CLEANUP_INTERVAL_SECONDS))
+    # Load the model off the event loop so the port opens immediately; /readyz flips once it's done
+    app.state.warm_up_task = asyncio.create_task(asyncio.to_thread(warm_up_worker))
+
+    # Backfill the usage rollups and start the file cleanup task (only once under the pre-fork server)
+    if os.getenv("PREFORK_WORKER_SLOT", "0") == "0":
+        app.state.rollup_task = asyncio.create_task(asyncio.to_thread(_backfill_usage_rollups))
+        app.state.cleanup_task = asyncio.create_task(
+            cleanup_old_files(OUTPUT_FOLDER, FILE_EXPIRATION_SECONDS, CLEANUP_INTERVAL_SECONDS)
+        )
     yield
 
+    await extract_batcher.stop()
+    shutdown_pool()
     logger.info("✅ Lifespan: cleanup complete.")
-    yield
     logger.info("🛑 App is shutting down cleanly")
 
 # Initialize FastAPI with a custom lifespan
 app = FastAPI(lifespan=lifespan)
 
+# ──────── Admission control (size, rate and concurrency limits on the extraction routes) ────────
+app.add_middleware(AdmissionMiddleware)
+
+# ──────── Request metrics (labelled by route template to keep cardinality low) ────────
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        route_path = getattr(route, "path", "unmatched")
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route=route_path, method=request.method)
+        HTTP_REQUESTS.inc(route=route_path, method=request.method, status=status)
+
 # Mount static file
 app.mount("/static", StaticFiles(directory=PROJECT_ROOT / "api" / "static" ), name="static")
 
@@ -66,3 +126,7 @@ app.include_router(upload_routes)
 app.include_router(results_routes)
 app.include_router(feedback_routes)
 app.include_router(upload_history_routes)
+app.include_router(metrics_routes)
+app.include_router(health_routes)
+app.include_router(api_routes)
+app.include_router(usage_routes)
@@ -0,0 +1,283 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Production launcher. Loads the spaCy model and the app once in a
+#          parent process, then forks uvicorn workers that share the already
+#          loaded (read-only) model memory copy-on-write. The parent supervises
+#          the workers: it replaces any that exit, recycles them after a number
+#          of requests and performs rolling restarts on SIGHUP.
+#
+# Usage:
+#   python -m api.server --host 0.0.0.0 --port 10000 --workers 4 --max-requests 1000
+#
+# Signals (sent to the parent):
+#   SIGHUP           rolling restart: start a fresh worker, then gracefully stop an old one
+#   SIGTERM / SIGINT graceful shutdown of all workers
+#
+# A worker that fails within FAST_EXIT_SECONDS of starting is replaced after an
+# exponentially growing delay. After MAX_FAST_EXITS such failures in a row in
+# one slot, the server stops all workers and exits with status 1, so a broken
+# deploy does not turn into a fork loop.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from pathlib import Path
+import argparse
+import gc
+import os
+import random
+import signal
+import socket
+import sys
+import time
+
+# Set root and ensure it's in PYTHONPATH
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+import uvicorn
+
+# ──────── Custom modules ────────
+from utils.logger import logger
+
+
+def default_workers():
+    return int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-fork server for the document entity extractor.")
+    parser.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=default_workers(),
+                        help="Worker processes to fork (default: $WEB_CONCURRENCY or CPU count).")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("MAX_REQUESTS", "0")),
+                        help="Recycle a worker after this many requests (0 disables).")
+    parser.add_argument("--max-requests-jitter", type=int, default=int(os.getenv("MAX_REQUESTS_JITTER", "0")),
+                        help="Random extra requests per worker so recycling is staggered.")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("GRACEFUL_TIMEOUT", "30")),
+                        help="Seconds a stopping worker gets to finish in-flight requests.")
+    parser.add_argument("--log-level", default=os.getenv("LOG_LEVEL", "info"))
+    return parser.parse_args(argv)
+
+
+class PreforkServer:
+    """Supervises a fixed number of forked uvicorn workers sharing one listening socket."""
+
+    FAST_EXIT_SECONDS = 10  # a failure sooner than this after start counts towards giving up
+    MAX_FAST_EXITS = 5
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 30
+
+    def __init__(self, app, sock, args):
+        self.app = app
+        self.sock = sock
+        self.args = args
+        self.workers = {}  # pid → slot number
+        self.started = {}  # pid → start time
+        self.retiring = {}  # pid → kill deadline for workers asked to stop
+        self.fast_exits = {}  # slot → consecutive failures shortly after start
+        self.respawn_at = {}  # slot → when its replacement may start
+        self.shutting_down = False
+        self.restart_requested = False
+        self.exit_code = 0
+
+    # ──────── Worker side ────────
+    def _run_worker(self, slot):
+        # Restore default signal handling; uvicorn installs its own graceful handlers
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+            signal.signal(sig, signal.SIG_DFL)
+        os.environ["PREFORK_WORKER_SLOT"] = str(slot)
+        random.seed()
+
+        # Connections opened in the parent must not be shared across processes
+        from db import database, session
+        database.engine.dispose(close=False)
+        session.engine.dispose(close=False)
+
+        max_requests = None
+        if self.args.max_requests > 0:
+            max_requests = self.args.max_requests + random.randint(0, max(self.args.max_requests_jitter, 0))
+
+        config = uvicorn.Config(
+            self.app,
+            log_level=self.args.log_level,
+            limit_max_requests=max_requests,
+            timeout_graceful_shutdown=self.args.graceful_timeout,
+        )
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def spawn(self, slot):
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                self._run_worker(slot)
+            except BaseException:
+                logger.exception(f"❌ Worker in slot {slot} crashed.")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers[pid] = slot
+        self.started[pid] = time.monotonic()
+        logger.info(f"👷 Started worker {pid} (slot {slot})")
+        return pid
+
+    # ──────── Parent side ────────
+    def _handle_signal(self, signum, frame):
+        if signum == signal.SIGHUP:
+            self.restart_requested = True
+        else:
+            self.shutting_down = True
+
+    def retire(self, pid):
+        """Asks a worker to finish in-flight requests and exit."""
+        if pid in self.retiring:
+            return
+        try:
+            os.kill(pid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        self.retiring[pid] = time.monotonic() + self.args.graceful_timeout + 5
+
+    def reap(self):
+        """Collects exited workers; returns (slot, seconds it ran, exit code) for those that were not retired."""
+        freed = []
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                break
+            slot = self.workers.pop(pid, None)
+            lifetime = time.monotonic() - self.started.pop(pid, time.monotonic())
+            retired = self.retiring.pop(pid, None) is not None
+            if slot is None:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if not retired:
+                # uvicorn exits with 0 once limit_max_requests is reached
+                reason = "recycled after max requests" if code == 0 else f"exited with code {code}"
+                logger.info(f"♻️ Worker {pid} (slot {slot}) {reason}")
+                freed.append((slot, lifetime, code))
+        return freed
+
+    def schedule_respawn(self, slot, lifetime, code) -> bool:
+        """
+        Queues a replacement for a worker that exited on its own, delayed while
+        the slot keeps failing fast. Returns False once it has failed
+        MAX_FAST_EXITS times in a row.
+        """
+        if code != 0 and lifetime < self.FAST_EXIT_SECONDS:
+            self.fast_exits[slot] = self.fast_exits.get(slot, 0) + 1
+        else:
+            self.fast_exits[slot] = 0
+        failures = self.fast_exits[slot]
+        if failures >= self.MAX_FAST_EXITS:
+            return False
+
+        delay = min(self.BACKOFF_BASE_SECONDS * 2 ** (failures - 1), self.BACKOFF_MAX_SECONDS) if failures else 0
+        if delay:
+            logger.warning(f"⚠️ Worker slot {slot} failed {failures} time(s) in a row; restarting it in {delay:.1f}s.")
+        self.respawn_at[slot] = time.monotonic() + delay
+        return True
+
+    def respawn_due(self):
+        now = time.monotonic()
+        for slot, due in list(self.respawn_at.items()):
+            if now >= due:
+                del self.respawn_at[slot]
+                self.spawn(slot)
+
+    def rolling_restart(self):
+        logger.info("🔁 Rolling restart requested.")
+        for pid, slot in list(self.workers.items()):
+            if pid in self.retiring:
+                continue
+            self.spawn(slot)
+            self.retire(pid)
+
+    def kill_overdue(self):
+        now = time.monotonic()
+        for pid, deadline in list(self.retiring.items()):
+            if now > deadline:
+                logger.warning(f"⚠️ Worker {pid} did not stop in time; killing it.")
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def run(self):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self._handle_signal)
+
+        for slot in range(self.args.workers):
+            self.spawn(slot)
+
+        while not self.shutting_down:
+            for slot, lifetime, code in self.reap():
+                if not self.schedule_respawn(slot, lifetime, code):
+                    logger.error(f"❌ Worker slot {slot} failed {self.MAX_FAST_EXITS} times within "
+                                 f"{self.FAST_EXIT_SECONDS}s of starting; giving up.")
+                    self.exit_code = 1
+                    self.shutting_down = True
+            if not self.shutting_down:
+                self.respawn_due()
+            if self.restart_requested:
+                self.restart_requested = False
+                self.rolling_restart()
+            self.kill_overdue()
+            time.sleep(0.5)
+
+        logger.info("🛑 Shutting down workers...")
+        for pid in list(self.workers):
+            self.retire(pid)
+        while self.workers:
+            self.reap()
+            self.kill_overdue()
+            time.sleep(0.2)
+        logger.info("✅ All workers stopped.")
+        return self.exit_code
+
+
+def bind_socket(host, port):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    # Load the model in the parent so every forked worker shares its memory
+    from extractor.text_extractor import get_nlp
+    from api.main import app, warm_up_worker
+
+    start = time.perf_counter()
+    get_nlp()
+    warm_up_worker()
+    logger.info(f"📦 Preloaded model and app in {time.perf_counter() - start:.2f}s")
+
+    if not hasattr(os, "fork"):
+        # Platforms without fork just run a single uvicorn server in-process
+        uvicorn.run(app, host=args.host, port=args.port, log_level=args.log_level,
+                    limit_max_requests=args.max_requests or None,
+                    timeout_graceful_shutdown=args.graceful_timeout)
+        return
+
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers don't touch (and un-share) the preloaded pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    logger.info(f"🚀 Listening on {args.host}:{args.port} with {args.workers} workers")
+    return PreforkServer(app, sock, args).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,7 +5,7 @@
 #          entity counts, and user IP.
 # ──────────────────────────────────────────────────────────────────────────────
 
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, Text, ForeignKey, UniqueConstraint
 from sqlalchemy.orm import sessionmaker, declarative_base
 from datetime import datetime
 from pathlib import Path
@@ -30,7 +30,7 @@ class ExtractionLog(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String, nullable=False)
-    upload_time = Column(DateTime, default=datetime.now())
+    upload_time = Column(DateTime, default=datetime.now)
     name_count = Column(Integer, default=0)
     email_count = Column(Integer, default=0)
     org_count = Column(Integer, default=0)
@@ -44,6 +44,75 @@ class Feedback(Base):
     rating = Column(Integer, nullable=True)
     submitted_at = Column(DateTime, default=datetime.now())
 
+class KnownEntity(Base):
+    """Canonical PERSON/ORG names kept across batches for entity resolution."""
+    __tablename__: str = "known_entities"
+    __table_args__ = (UniqueConstraint("label", "canonical"),)
+
+    id = Column(Integer, primary_key=True, index=True)
+    label = Column(String, nullable=False)
+    canonical = Column(String, nullable=False)
+    mention_count = Column(Integer, default=0)
+    first_seen = Column(DateTime, default=datetime.now)
+    last_seen = Column(DateTime, default=datetime.now)
+
+class KnownEntityBlock(Base):
+    """Blocking index (LSH band / name keys) used to find candidate known entities."""
+    __tablename__: str = "known_entity_blocks"
+
+    id = Column(Integer, primary_key=True)
+    label = Column(String, nullable=False)
+    block_key = Column(String, nullable=False, index=True)
+    entity_id = Column(Integer, ForeignKey("known_entities.id"), nullable=False)
+
+class DocumentFingerprint(Base):
+    """
+    SimHash of a processed document's text plus its per-chunk extraction
+    results, so near-duplicate uploads only re-extract the chunks that changed.
+    """
+    __tablename__: str = "document_fingerprints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=False)
+    created_at = Column(DateTime, default=datetime.now)
+    pipeline = Column(String, nullable=False)  # extraction mode + model; results are only reused within one
+    source = Column(String, nullable=True)
+    text_length = Column(Integer, default=0)
+    simhash = Column(Integer, nullable=False)  # 64-bit, stored signed
+    band0 = Column(Integer, nullable=False, index=True)
+    band1 = Column(Integer, nullable=False, index=True)
+    band2 = Column(Integer, nullable=False, index=True)
+    band3 = Column(Integer, nullable=False, index=True)
+    # JSON: {"chunks": [[chunk hash, {"person": [[entity, mentions], ...], ...}], ...],
+    #        "unplaced": {"person": [[entity, mentions], ...], ...}, "language": ..., "annotations": ...}
+    chunks = Column(Text, nullable=False)
+
+class UsageRollup(Base):
+    """
+    ExtractionLog totals per hour and per day and client IP, kept up to date in
+    the same transaction as the log rows (utils/usage_rollups.py), so usage
+    queries never scan the log itself.
+    """
+    __tablename__: str = "usage_rollups"
+    __table_args__ = (UniqueConstraint("granularity", "period_start", "user_ip"),)
+
+    id = Column(Integer, primary_key=True)
+    granularity = Column(String, nullable=False)  # "hour" or "day"
+    period_start = Column(DateTime, nullable=False)
+    user_ip = Column(String, nullable=False, default="")  # "" when the client IP is unknown
+    documents = Column(Integer, default=0)
+    names = Column(Integer, default=0)
+    emails = Column(Integer, default=0)
+    orgs = Column(Integer, default=0)
+
+class AppMarker(Base):
+    """One-off maintenance steps done (or in progress) on this database, e.g. the usage rollup backfill."""
+    __tablename__: str = "app_markers"
+
+    name = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.now)
+    value = Column(String, nullable=True)  # progress of a step that runs in chunks
+
 # Create the table
 Base.metadata.create_all(bind=engine)
 
@@ -0,0 +1,101 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Escalation rules for the spaCy → GPT extraction cascade. Every
+#          document goes through spaCy first; only documents that trip one of
+#          the triggers below are sent to GPT, and only while the batch's GPT
+#          budget lasts.
+#
+# Triggers (thresholds in utils.config):
+#   low_yield    fewer PERSON/ORG entities per 1,000 characters than expected
+#   emails       "@" signs in the text that the email regex did not account for
+#   uncertainty  a large share of proper nouns left outside any entity
+# ──────────────────────────────────────────────────────────────────────────────
+
+import threading
+
+# ──────── Custom modules ────────
+from utils.config import (
+    CASCADE_MIN_TEXT_CHARS, CASCADE_MIN_ENTITIES_PER_1K_CHARS,
+    CASCADE_MIN_EMAIL_RATIO, CASCADE_MAX_UNCERTAINTY, CASCADE_GPT_BUDGET,
+)
+
+# Fewer candidate proper nouns than this and the uncertainty score is not meaningful
+MIN_UNCERTAINTY_CANDIDATES = 5
+
+
+# A document is escalated to GPT at most once
+GPT_CALLS_PER_DOCUMENT = 1
+
+
+class GPTBudget:
+    """
+    Thread-safe cap on GPT calls for one batch (one upload request).
+
+    Args:
+        max_calls (int): Documents that may be escalated; defaults to CASCADE_GPT_BUDGET.
+    """
+
+    def __init__(self, max_calls=None):
+        self.max_calls = CASCADE_GPT_BUDGET if max_calls is None else max_calls
+        self.used = 0
+        self.denied = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.used < self.max_calls:
+                self.used += 1
+                return True
+            self.denied += 1
+            return False
+
+    @property
+    def remaining(self) -> int:
+        return max(self.max_calls - self.used, 0)
+
+
+def uncertainty_score(doc) -> float:
+    """
+    Share of proper-noun tokens not covered by any entity. Uses POS tags when
+    the pipeline has a tagger, otherwise capitalized non-stopword tokens.
+    """
+    if doc.has_annotation("POS"):
+        candidates = [token for token in doc if token.pos_ == "PROPN"]
+    else:
+        candidates = [token for token in doc if token.is_title and token.is_alpha and not token.is_stop]
+    if len(candidates) < MIN_UNCERTAINTY_CANDIDATES:
+        return 0.0
+    uncovered = sum(1 for token in candidates if not token.ent_type)
+    return uncovered / len(candidates)
+
+
+def escalation_reasons(text: str, result: dict, doc) -> list:
+    """Returns the triggers a spaCy result trips (empty list → keep the local result)."""
+    reasons = []
+
+    if len(text) >= CASCADE_MIN_TEXT_CHARS:
+        entities = len(result.get("person", [])) + len(result.get("organization", []))
+        if entities * 1000 / len(text) < CASCADE_MIN_ENTITIES_PER_1K_CHARS:
+            reasons.append("low_yield")
+
+    at_signs = text.count("@")
+    if at_signs and len(result.get("email", [])) / at_signs < CASCADE_MIN_EMAIL_RATIO:
+        reasons.append("emails")
+
+    if uncertainty_score(doc) > CASCADE_MAX_UNCERTAINTY:
+        reasons.append("uncertainty")
+
+    return reasons
+
+
+def merge_results(local: dict, remote: dict) -> dict:
+    """
+    Union of the spaCy and GPT entity lists (spaCy order first; the post-processor
+    de-duplicates). The stored spaCy annotations no longer describe the merged
+    result, so it does not reference them.
+    """
+    merged = dict(local)
+    merged.pop("annotations", None)
+    for field in ("person", "organization", "email"):
+        merged[field] = list(local.get(field, [])) + list(remote.get(field, []) or [])
+    return merged
@@ -0,0 +1,167 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: On-disk store of spaCy annotations. With DOC_STORE enabled, every
+#          document the NER model processes is saved as a compact DocBin keyed
+#          by the hash of its text and the model version, before gazetteer
+#          merging and post-processing. The stored annotations let us:
+#            - skip NER when the same text is extracted again, and
+#            - re-derive results (gazetteer, filtering, label mapping, exports)
+#              for past uploads without re-running the model
+#              (see extractor/reprocess.py).
+#
+# Layout: DOC_STORE_DIR/<model key>/<hash[:2]>/<hash>.spacy
+#         DOC_STORE_DIR/batches/<results id>.json   (documents of each upload)
+#
+# Stored documents are full document texts. The cleanup task deletes them,
+# and batch manifests, after DOC_STORE_RETENTION_SECONDS without use.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime
+from hashlib import sha256
+from pathlib import Path
+import json
+import logging
+import os
+import time
+
+# ──────── Custom modules ────────
+from utils.config import DOC_STORE_ENABLED, DOC_STORE_DIR
+
+logger = logging.getLogger(__name__)
+
+# Token attributes kept besides the text: entities, plus POS for the cascade's uncertainty score
+STORED_ATTRS = ["ENT_IOB", "ENT_TYPE", "POS"]
+
+
+def content_hash(text: str) -> str:
+    return sha256(text.encode("utf-8")).hexdigest()
+
+
+def model_key(nlp) -> str:
+    """Identifies the model version the annotations came from, e.g. "en_core_web_sm-3.7.1"."""
+    meta = nlp.meta
+    return f"{meta.get('lang', 'xx')}_{meta.get('name', 'pipeline')}-{meta.get('version', '0.0.0')}"
+
+
+def _path(model: str, digest: str) -> Path:
+    return DOC_STORE_DIR / model / digest[:2] / f"{digest}.spacy"
+
+
+def annotation_key(nlp, text: str) -> str:
+    """Reference to a stored document, as recorded in extraction results ("<model key>/<hash>")."""
+    return f"{model_key(nlp)}/{content_hash(text)}"
+
+
+def load_key(vocab, key: str):
+    """Returns the stored Doc for an annotation key, or None."""
+    from spacy.tokens import DocBin
+
+    model, _, digest = key.partition("/")
+    path = _path(model, digest)
+    if not path.exists():
+        return None
+    try:
+        docs = list(DocBin().from_bytes(path.read_bytes()).get_docs(vocab))
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable stored annotations {path}: {e}")
+        return None
+    return docs[0] if docs else None
+
+
+def lookup(nlp, text: str):
+    """Returns (annotation key, stored Doc or None); (None, None) when the store is disabled."""
+    if not DOC_STORE_ENABLED:
+        return None, None
+    key = annotation_key(nlp, text)
+    doc = load_key(nlp.vocab, key)
+    if doc is not None:
+        _touch(key)  # still in use: restart its retention period
+    return key, doc
+
+
+def _touch(key: str):
+    model, _, digest = key.partition("/")
+    try:
+        os.utime(_path(model, digest))
+    except OSError:
+        pass
+
+
+def save(key: str, doc) -> str:
+    """Stores the doc's annotations under `key` (from lookup) and returns the key, or None on failure."""
+    if key is None:
+        return None
+    from spacy.tokens import DocBin
+
+    model, _, digest = key.partition("/")
+    path = _path(model, digest)
+    if path.exists():
+        _touch(key)
+        return key
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        doc_bin = DocBin(attrs=STORED_ATTRS, store_user_data=False)
+        doc_bin.add(doc)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(doc_bin.to_bytes())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not store annotations {path}: {e}")
+        return None
+    return key
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Batch manifests: which stored documents make up each upload's results
+# ──────────────────────────────────────────────────────────────────────────────
+def _batch_path(results_id: str) -> Path:
+    return DOC_STORE_DIR / "batches" / f"{results_id}.json"
+
+
+def save_batch(results_id: str, documents: list):
+    """
+    Records an upload's documents as [{"filename": ..., "source": ..., "annotations": key or None}, ...]
+    (documents extracted or escalated to GPT, or reused from near-duplicate chunks, have no stored annotations).
+    """
+    if not DOC_STORE_ENABLED or not documents:
+        return
+    path = _batch_path(results_id)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"results_id": results_id, "created": datetime.now().isoformat(timespec="seconds"),
+                       "documents": documents}, f)
+    except OSError as e:
+        logger.warning(f"⚠️ Could not write batch manifest {path}: {e}")
+
+
+def load_batch(results_id: str) -> dict:
+    with open(_batch_path(results_id), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_batches() -> list:
+    directory = DOC_STORE_DIR / "batches"
+    return sorted(path.stem for path in directory.glob("*.json")) if directory.is_dir() else []
+
+
+def expire(max_age_seconds: float) -> int:
+    """Deletes stored documents and batch manifests not written or used for `max_age_seconds`; returns the count."""
+    if not DOC_STORE_DIR.is_dir():
+        return 0
+    cutoff = time.time() - max_age_seconds
+    deleted = 0
+    for path in [*DOC_STORE_DIR.glob("*/*/*.spacy"), *DOC_STORE_DIR.glob("*/*/*.tmp"),
+                 *DOC_STORE_DIR.glob("batches/*.json")]:
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                deleted += 1
+        except OSError:
+            continue
+    # Drop emptied <model>/<hash[:2]> and <model> directories
+    for directory in [*DOC_STORE_DIR.glob("*/*"), *DOC_STORE_DIR.glob("*")]:
+        if directory.is_dir() and "batches" not in (directory.name, directory.parent.name) \
+                and not any(directory.iterdir()):
+            directory.rmdir()
+    return deleted
@@ -3,15 +3,23 @@
 # Purpose: Provides utility functions to extract text from PDF, DOCX, and TXT files.
 # ──────────────────────────────────────────────────────────────────────────────
 
-import pdfplumber
-import docx
 import logging
+from pathlib import Path
+
+# ──────── Custom modules ────────
+from utils.metrics import FILE_READ_SECONDS
+from utils.lazy_imports import lazy_import
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# pdfplumber and python-docx are imported inside their readers so they only
+# load once a document of that type is actually read.
+
 def read_pdf(file_path):
     """Extracts text from a PDF file using pdfplumber."""
+    pdfplumber = lazy_import("pdfplumber")
+
     text = ""
     try:
         with pdfplumber.open(file_path) as pdf:
@@ -26,6 +34,8 @@ def read_pdf(file_path):
 
 def read_docx(file_path):
     """Extracts text from a DOCX file using python-docx."""
+    docx = lazy_import("docx")
+
     try:
         doc = docx.Document(file_path)
         logger.info(f"Successfully read DOCX file: {file_path}")
@@ -44,15 +54,20 @@ def read_txt(file_path):
         logger.error(f"Failed to read plain text file: {file_path}: {e}")
         return ""
 
+READERS = {
+    ".pdf": read_pdf,
+    ".docx": read_docx,
+    ".txt": read_txt,
+}
+
 def read_file(file_path):
     """Determines file type and extracts text accordingly."""
-    if file_path.endswith(".pdf"):
-        return read_pdf(file_path)
-    elif file_path.endswith(".docx"):
-        return read_docx(file_path)
-    elif file_path.endswith(".txt"):
-        return read_txt(file_path)
-    else:
+    suffix = Path(file_path).suffix
+    reader = READERS.get(suffix)
+    if reader is None:
         logger.error(f"Failed to determine file type: {file_path}.")
         return ""
 
+    with FILE_READ_SECONDS.time(format=suffix.lstrip(".")):
+        return reader(file_path)
+
@@ -0,0 +1,246 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Gazetteer matching for known organizations and people. Customer
+#          name lists are compiled into a token-level Aho-Corasick automaton
+#          (built once, cached to disk) that finds every listed name in a
+#          single linear pass over the text. Hits are merged with the spaCy
+#          entities. Edited lists are picked up automatically without a restart.
+#
+# List format: GAZETTEER_DIR/<label>*.txt, one name per line ("#" comments),
+#              e.g. org_customers.txt → ORG, person_staff.txt → PERSON.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from collections import deque
+from pathlib import Path
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+
+# ──────── Custom modules ────────
+from utils.config import GAZETTEER_DIR, GAZETTEER_CACHE_DIR, GAZETTEER_CHECK_SECONDS
+from utils.metrics import GAZETTEER_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Bump when the pickled automaton layout changes
+CACHE_VERSION = 1
+
+# File name prefix → entity label
+LABEL_PREFIXES = {"org": "ORG", "organization": "ORG", "person": "PERSON", "people": "PERSON"}
+
+# Words, or single punctuation marks, matched case-insensitively
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+
+
+def tokenize(text: str):
+    """Lower-cased tokens with their character offsets."""
+    return [(m.group().lower(), m.start(), m.end()) for m in _TOKEN_RE.finditer(text)]
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton over tokens. Transitions live in one flat
+    (state, token) → state dict, which keeps memory low for large lists.
+    """
+
+    def __init__(self):
+        self.goto = {}
+        self.fail = [0]
+        self.output = {}  # state → (label, pattern length in tokens)
+        self.dict_link = [0]  # nearest proper suffix state that has an output
+        self._children = [[]]
+
+    def add(self, tokens, label):
+        state = 0
+        for token in tokens:
+            next_state = self.goto.get((state, token))
+            if next_state is None:
+                next_state = len(self.fail)
+                self.goto[state, token] = next_state
+                self.fail.append(0)
+                self.dict_link.append(0)
+                self._children.append([])
+                self._children[state].append(token)
+            state = next_state
+        self.output.setdefault(state, (label, len(tokens)))
+
+    def build(self):
+        """Computes failure and output links breadth-first."""
+        queue = deque()
+        for token in self._children[0]:
+            queue.append(self.goto[0, token])
+        while queue:
+            state = queue.popleft()
+            for token in self._children[state]:
+                child = self.goto[state, token]
+                fallback = self.fail[state]
+                while fallback and (fallback, token) not in self.goto:
+                    fallback = self.fail[fallback]
+                target = self.goto.get((fallback, token), 0)
+                self.fail[child] = target if target != child else 0
+                self.dict_link[child] = target if target in self.output else self.dict_link[target]
+                queue.append(child)
+        self._children = None
+        return self
+
+    def iter_matches(self, tokens):
+        """Yields (first token index, last token index, label) for every match."""
+        goto, fail, output, dict_link = self.goto, self.fail, self.output, self.dict_link
+        state = 0
+        for index, token in enumerate(tokens):
+            while state and (state, token) not in goto:
+                state = fail[state]
+            state = goto.get((state, token), 0)
+            hit = state if state in output else dict_link[state]
+            while hit:
+                label, length = output[hit]
+                yield index - length + 1, index, label
+                hit = dict_link[hit]
+
+    def __len__(self):
+        return len(self.output)
+
+
+class Gazetteer:
+    """Compiled name lists; find() returns non-overlapping (start_char, end_char, label) hits."""
+
+    def __init__(self, automaton: AhoCorasick, signature: str):
+        self.automaton = automaton
+        self.signature = signature
+
+    def find(self, text: str) -> list:
+        if not len(self.automaton):
+            return []
+        tokens = tokenize(text)
+        words = [token for token, _, _ in tokens]
+        matches = sorted(self.automaton.iter_matches(words), key=lambda m: (m[0], -(m[1] - m[0])))
+
+        # Leftmost-longest, non-overlapping
+        hits, next_free = [], 0
+        for first, last, label in matches:
+            if first < next_free:
+                continue
+            hits.append((tokens[first][1], tokens[last][2], label))
+            next_free = last + 1
+        return hits
+
+
+def _label_for(path: Path):
+    prefix = path.stem.lower().split("_", 1)[0]
+    return LABEL_PREFIXES.get(prefix)
+
+
+def _source_files(directory: Path):
+    if not directory.is_dir():
+        return []
+    return sorted(path for path in directory.glob("*.txt") if _label_for(path))
+
+
+def _signature(files) -> str:
+    digest = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    for path in files:
+        stat = path.stat()
+        digest.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+def build_gazetteer(directory: Path = GAZETTEER_DIR, cache_dir: Path = GAZETTEER_CACHE_DIR) -> Gazetteer:
+    """Loads the compiled automaton from the disk cache, or compiles the lists and caches them."""
+    files = _source_files(Path(directory))
+    signature = _signature(files)
+    cache_path = Path(cache_dir) / f"gazetteer_{signature}.pkl"
+
+    if files and cache_path.exists():
+        try:
+            with open(cache_path, "rb") as f:
+                automaton = pickle.load(f)
+            logger.info(f"📚 Loaded gazetteer ({len(automaton)} names) from cache {cache_path.name}")
+            return Gazetteer(automaton, signature)
+        except (OSError, pickle.PickleError, EOFError, AttributeError) as e:
+            logger.warning(f"⚠️ Ignoring unreadable gazetteer cache {cache_path}: {e}")
+
+    start = time.perf_counter()
+    automaton = AhoCorasick()
+    for path in files:
+        label = _label_for(path)
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                name = line.strip()
+                if name and not name.startswith("#"):
+                    tokens = [token for token, _, _ in tokenize(name)]
+                    if tokens:
+                        automaton.add(tokens, label)
+    automaton.build()
+
+    if files:
+        logger.info(f"📚 Compiled gazetteer: {len(automaton)} names from {len(files)} list(s) "
+                    f"in {time.perf_counter() - start:.2f}s")
+        try:
+            Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump(automaton, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+            for stale in Path(cache_dir).glob("gazetteer_*.pkl"):
+                if stale != cache_path:
+                    stale.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write gazetteer cache: {e}")
+    return Gazetteer(automaton, signature)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Shared instance, re-checked against the list files at most every
+# GAZETTEER_CHECK_SECONDS so edited lists are picked up without a restart.
+# ──────────────────────────────────────────────────────────────────────────────
+_gazetteer = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_gazetteer() -> Gazetteer:
+    global _gazetteer, _checked_at
+    now = time.monotonic()
+    if _gazetteer is not None and now - _checked_at < GAZETTEER_CHECK_SECONDS:
+        return _gazetteer
+
+    with _lock:
+        if _gazetteer is None or now - _checked_at >= GAZETTEER_CHECK_SECONDS:
+            signature = _signature(_source_files(Path(GAZETTEER_DIR)))
+            if _gazetteer is None or signature != _gazetteer.signature:
+                _gazetteer = build_gazetteer()
+            _checked_at = now
+    return _gazetteer
+
+
+def reload_gazetteer() -> Gazetteer:
+    """Forces the next get_gazetteer() call to re-check the list files."""
+    global _checked_at
+    _checked_at = 0.0
+    return get_gazetteer()
+
+
+def merge_gazetteer_entities(doc):
+    """
+    Adds gazetteer hits to doc.ents. Where a hit overlaps a model entity the
+    longer span wins; on equal length the gazetteer label is kept.
+    """
+    gazetteer = get_gazetteer()
+    if not len(gazetteer.automaton):
+        return doc
+
+    from spacy.util import filter_spans
+
+    with GAZETTEER_SECONDS.time():
+        spans = []
+        for start, end, label in gazetteer.find(doc.text):
+            span = doc.char_span(start, end, label=label, alignment_mode="expand")
+            if span is not None:
+                spans.append(span)
+        if spans:
+            doc.ents = filter_spans(spans + list(doc.ents))
+    return doc
@@ -0,0 +1,189 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Language routing for local extraction. A cheap function-word
+#          profile identifies each document's language before NER, and the
+#          matching spaCy pipeline is taken from a per-process model cache.
+#          Extra-language models load on first use and are evicted least-
+#          recently-used once the cache exceeds its count or memory cap, so a
+#          worker only keeps the languages it is actually seeing resident.
+#
+# The default language (DEFAULT_LANGUAGE) is always served by SPACY_MODEL,
+# which stays loaded outside the cache.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from collections import OrderedDict
+import gc
+import os
+import re
+import threading
+import time
+
+# ──────── Custom modules ────────
+from utils.config import (
+    DEFAULT_LANGUAGE, LANGUAGE_ID_SAMPLE_CHARS, LANGUAGE_ID_MIN_HITS, MODEL_CACHE_MAX_MODELS, MODEL_CACHE_MAX_MB,
+)
+from utils.metrics import MODEL_CACHE_EVENTS
+from utils.lazy_imports import lazy_import
+from utils.logger import logger
+
+# Frequent function words per language. Words listed by several profiles are
+# dropped when the lookup table is built, and so are the words in
+# SHARED_WORDS: each is listed by only one profile but is just as common in
+# another supported language (or in e-mail addresses and URLs, like "com").
+PROFILES = {
+    "en": "the and of to in is that for it with as was on are be this by from have not or which but they his her "
+          "their has been were will would an at we you can",
+    "es": "el la los las que y en del por con una para es se lo como más pero sus le ya está fue muy también "
+          "son ha este entre cuando sin sobre hay nos",
+    "fr": "le la les des et est une pour que dans qui au sur pas par plus avec ce il elle sont ont mais ou été "
+          "aux nous vous cette leur sans être",
+    "de": "der die das und ist nicht ein eine zu den von mit sich des auf für im dem auch es an werden aus er hat "
+          "dass sie nach bei wird noch wie",
+    "it": "il di che è la e per una sono non gli della con si nel le anche come più ma alla dei ha questo delle "
+          "essere stato nella tra",
+    "pt": "o a os as que e do da em um uma para com não no na por mais dos das se ao como mas foi ele é são "
+          "pelo pela também seu sua aos às foram nas pelos pelas seus suas já muito ainda",
+    "nl": "de het een en van in is dat op te zijn niet met voor er aan ook als bij maar om dan wordt worden "
+          "naar uit deze hij ze",
+}
+
+SHARED_WORDS = frozenset(
+    "de en a o in da do dos um no com sua mas lo son este entre sobre nos plus ou on was den non si come ma te "
+    "als per".split()
+)
+
+
+def _build_lookup(profiles: dict, shared=SHARED_WORDS) -> dict:
+    seen = {}
+    for language, words in profiles.items():
+        for word in set(words.split()):
+            seen.setdefault(word, set()).add(language)
+    return {word: languages.pop() for word, languages in seen.items() if len(languages) == 1 and word not in shared}
+
+
+WORD_LANGUAGE = _build_lookup(PROFILES)
+WORD_RE = re.compile(r"[^\W\d_]+")
+
+
+def detect_language(text: str) -> str:
+    """
+    Returns the ISO 639-1 code of the text's most likely language, judged from
+    the first LANGUAGE_ID_SAMPLE_CHARS characters, or DEFAULT_LANGUAGE when
+    there is too little evidence either way.
+    """
+    hits = {}
+    for word in WORD_RE.findall(text[:LANGUAGE_ID_SAMPLE_CHARS].lower()):
+        language = WORD_LANGUAGE.get(word)
+        if language:
+            hits[language] = hits.get(language, 0) + 1
+    if not hits:
+        return DEFAULT_LANGUAGE
+
+    ranked = sorted(hits.items(), key=lambda item: item[1], reverse=True)
+    best, count = ranked[0]
+    runner_up = ranked[1][1] if len(ranked) > 1 else 0
+    # Require a minimum of evidence and a clear lead over the next language
+    if count < LANGUAGE_ID_MIN_HITS or count < 1.5 * runner_up:
+        return DEFAULT_LANGUAGE
+    return best
+
+
+def _resident_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError, IndexError):
+        return None
+
+
+class ModelCache:
+    """
+    LRU cache of loaded spaCy pipelines.
+
+    Args:
+        max_models (int): Pipelines kept loaded at once.
+        max_mb (int): Approximate memory cap for the cached pipelines (0 = no cap),
+            measured as the process' resident-memory growth while each one loaded.
+    """
+
+    def __init__(self, max_models=MODEL_CACHE_MAX_MODELS, max_mb=MODEL_CACHE_MAX_MB, loader=None):
+        self.max_models = max(1, max_models)
+        self.max_bytes = max_mb * 1024 * 1024
+        self._loader = loader or (lambda name: lazy_import("spacy").load(name))
+        self._models = OrderedDict()  # model name → (pipeline, approximate bytes)
+        self._failed = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+
+    def get(self, name: str):
+        """Returns the pipeline, loading (and evicting) as needed; None if it cannot be loaded."""
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models.move_to_end(name)
+                MODEL_CACHE_EVENTS.inc(event="hit")
+                return entry[0]
+
+        # One load at a time, so the memory growth can be attributed to the model being loaded
+        with self._load_lock:
+            with self._lock:
+                if name in self._models:
+                    self._models.move_to_end(name)
+                    return self._models[name][0]
+            if name in self._failed:
+                return None
+
+            before = _resident_bytes()
+            start = time.perf_counter()
+            try:
+                nlp = self._loader(name)
+            except (OSError, ImportError, ValueError) as e:
+                self._failed.add(name)
+                MODEL_CACHE_EVENTS.inc(event="load_failed")
+                logger.warning(f"⚠️ Could not load spaCy model '{name}' ({e}); using the default model instead.")
+                return None
+            after = _resident_bytes()
+            size = max(after - before, 0) if before is not None and after is not None else 0
+            MODEL_CACHE_EVENTS.inc(event="load")
+            logger.info(f"🌍 Loaded spaCy model '{name}' in {time.perf_counter() - start:.2f}s "
+                        f"(~{size / 1024 / 1024:.0f} MiB)")
+
+            with self._lock:
+                self._models[name] = (nlp, size)
+                evicted = self._evict()
+        if evicted:
+            # Pipelines hold reference cycles; free them now rather than at the next collection
+            gc.collect()
+        return nlp
+
+    def _evict(self) -> list:
+        evicted = []
+        # The newest model always stays, even if it alone exceeds the memory cap
+        while len(self._models) > 1 and (len(self._models) > self.max_models
+                                         or (self.max_bytes and self.memory_bytes > self.max_bytes)):
+            name, _ = self._models.popitem(last=False)
+            evicted.append(name)
+            MODEL_CACHE_EVENTS.inc(event="evict")
+            logger.info(f"🌍 Evicted spaCy model '{name}' from the model cache.")
+        return evicted
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def loaded(self) -> list:
+        with self._lock:
+            return list(self._models)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_model_cache() -> ModelCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ModelCache()
+    return _cache
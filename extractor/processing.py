@@ -0,0 +1,55 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Per-document processing shared by the upload routes: read the saved
+#          file, then extract its entities (reusing near-duplicate results when
+#          enabled). With ISOLATED_EXTRACTION on, reading and extraction run in
+#          the sandbox worker pool under one wall-clock deadline per document.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import time
+
+# ──────── Custom modules ────────
+from extractor.file_reader import read_file
+from extractor.text_extractor import extract_info, finish_extraction
+from extractor.sandbox import SandboxError, get_pool, read_file_job, extract_info_job, deadline_remaining
+from utils.config import NEAR_DUP_ENABLED, SANDBOX_ENABLED, SANDBOX_TIMEOUT_SECONDS
+from utils.near_duplicates import extract_with_reuse
+from utils.profiling import NULL_PROFILE
+
+__all__ = ["process_document", "read_document", "SandboxError"]
+
+
+def read_document(path: str, deadline: float = None) -> str:
+    """Reads a saved upload, in the sandbox when isolation is enabled."""
+    if not SANDBOX_ENABLED:
+        return read_file(path)
+    deadline = deadline or time.monotonic() + SANDBOX_TIMEOUT_SECONDS
+    return get_pool().run(read_file_job, path, timeout=deadline_remaining(deadline))
+
+
+def process_document(path: str, filename: str, db, budget, profile=NULL_PROFILE):
+    """
+    Reads and extracts one saved document. Returns (text, result); raises
+    SandboxError when an isolated read/extraction fails, times out or runs out of memory.
+    """
+    if not SANDBOX_ENABLED:
+        extract = lambda text: extract_info(text, budget=budget)
+        with profile.stage("read"):
+            text = read_file(path)
+    else:
+        pool = get_pool()
+        deadline = time.monotonic() + SANDBOX_TIMEOUT_SECONDS
+
+        def extract(text):
+            # The worker runs spaCy and reports the cascade triggers; only documents that
+            # trip one take a call from the batch budget, for a GPT pass made here
+            result, reasons = pool.run(extract_info_job, text, timeout=deadline_remaining(deadline))
+            return finish_extraction(text, result, reasons, budget)
+
+        with profile.stage("read"):
+            text = read_document(path, deadline)
+
+    with profile.stage("extract"):
+        if NEAR_DUP_ENABLED:
+            return text, extract_with_reuse(db, filename, text, extract)
+        return text, extract(text)
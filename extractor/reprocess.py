@@ -0,0 +1,148 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Rebuilds the exports of past uploads from the annotation store
+#          (DOC_STORE=True) without re-running NER: gazetteer merging, entity
+#          cleaning, label mapping, entity resolution and the xlsx/csv/json
+#          exports are re-applied to the stored spaCy annotations. Use it after
+#          changing post-processing rules or gazetteers.
+#
+# Usage:
+#   python -m extractor.reprocess --list
+#   python -m extractor.reprocess --batch entities_combined_2025-01-31_10-00-00
+#   python -m extractor.reprocess --all [--in-place]
+#
+# Documents without stored annotations (GPT / cascade-escalated results and
+# near-duplicate chunk reuse) are reported and left out of the rebuilt export.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime
+import argparse
+import json
+import os
+import sys
+import time
+
+# ──────── Custom modules ────────
+from extractor import doc_store
+from extractor.text_extractor import result_from_doc
+from utils.config import OUTPUT_FOLDER, ENTITY_RESOLUTION_ENABLED
+from utils.export_excel import export_to_file
+from utils.entity_resolution import resolve_result_set
+from utils.result_set import ResultSet
+from utils.entity_stats import EntityStats
+from utils.post_process import DEFAULT_POST_PROCESSOR
+from utils.lazy_imports import lazy_import
+
+# Blank vocabularies per language; stored docs carry their own strings, so the model itself is not loaded
+_vocabs = {}
+
+
+def _vocab_for(key: str):
+    lang = key.split("_", 1)[0]
+    if lang not in _vocabs:
+        _vocabs[lang] = lazy_import("spacy").blank(lang).vocab
+    return _vocabs[lang]
+
+
+def reprocess_batch(results_id: str, in_place: bool = False) -> dict:
+    """
+    Re-derives one upload's results from its stored annotations and writes
+    fresh exports. Returns a summary dict (results id, document counts, timing).
+    """
+    start = time.perf_counter()
+    manifest = doc_store.load_batch(results_id)
+
+    results, missing = ResultSet(), []
+    for document in manifest["documents"]:
+        key = document.get("annotations")
+        # Only spaCy results can be rebuilt; GPT-escalated ones would lose their GPT entities
+        if document.get("source", "spacy") != "spacy":
+            key = None
+        doc = doc_store.load_key(_vocab_for(key), key) if key else None
+        if doc is None:
+            missing.append(document["filename"])
+            continue
+        result = result_from_doc(doc.text, doc)
+        result["source"] = "spacy"
+        result["annotations"] = key
+        results.add(document["filename"], DEFAULT_POST_PROCESSOR.process_result(result))
+
+    if ENTITY_RESOLUTION_ENABLED and results:
+        resolve_result_set(results)
+
+    summary = {"source": results_id, "documents": len(manifest["documents"]),
+               "reprocessed": len(results), "missing_annotations": missing}
+    if not results:
+        summary["seconds"] = round(time.perf_counter() - start, 3)
+        return summary
+
+    if in_place:
+        output_base = OUTPUT_FOLDER / results_id
+    else:
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        output_base = OUTPUT_FOLDER / f"entities_reprocessed_{timestamp}_{os.urandom(3).hex()}"
+
+    results.write_jsonl(output_base.with_suffix(".results.jsonl"))
+    rows = results.rows()
+    stats = EntityStats()
+    for document in results:
+        stats.add(document.filename, document)
+    export_to_file(rows, str(output_base.with_suffix(".xlsx")), format="xlsx")
+    export_to_file(rows, str(output_base.with_suffix(".csv")), format="csv")
+    with open(output_base.with_suffix(".json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "files_processed": len(manifest["documents"]),
+            "names_extracted": stats.totals("person")["extracted"],
+            "emails_extracted": stats.totals("email")["extracted"],
+            "orgs_extracted": stats.totals("organization")["extracted"],
+            "reprocessed_from": results_id,
+            "missing_annotations": missing,
+            "results": rows
+        }, f)
+    stats.save(output_base.stem, files_processed=len(manifest["documents"]))
+
+    if not in_place:
+        doc_store.save_batch(output_base.stem, results.manifest())
+
+    summary["results_id"] = output_base.stem
+    summary["seconds"] = round(time.perf_counter() - start, 3)
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Rebuild upload results from stored spaCy annotations.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--batch", action="append", help="Results id to reprocess (repeatable)")
+    group.add_argument("--all", action="store_true", help="Reprocess every recorded upload")
+    group.add_argument("--list", action="store_true", help="List the uploads that can be reprocessed")
+    parser.add_argument("--in-place", action="store_true", help="Overwrite the original exports")
+    args = parser.parse_args(argv)
+
+    batches = doc_store.list_batches()
+    if args.list:
+        print("\n".join(batches) if batches else f"No stored uploads in {doc_store.DOC_STORE_DIR}")
+        return 0
+
+    status = 0
+    for results_id in (batches if args.all else args.batch):
+        # Rebuilt exports get their own manifest; skip them on --all unless rewriting in place
+        if args.all and not args.in_place and results_id.startswith("entities_reprocessed_"):
+            continue
+        try:
+            summary = reprocess_batch(results_id, in_place=args.in_place)
+        except FileNotFoundError:
+            print(f"❌ {results_id}: no batch manifest in {doc_store.DOC_STORE_DIR}")
+            status = 1
+            continue
+
+        print(f"✅ {results_id}: {summary['reprocessed']}/{summary['documents']} documents "
+              f"in {summary['seconds']:.3f}s")
+        if summary["missing_annotations"]:
+            print(f"   ⚠️ No stored annotations for: {', '.join(summary['missing_annotations'])}")
+        if "results_id" in summary:
+            print(f"   → /results/{summary['results_id']}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Isolated execution of document reading and extraction. Jobs run in
+#          a small pool of supervised worker processes, each with an address-
+#          space limit (RLIMIT_AS) and a wall-clock deadline per job. A worker
+#          that hits either limit (or crashes) is killed and replaced, and the
+#          job fails with a SandboxError. The web process and the other
+#          documents in the batch are unaffected.
+#
+# Workers are started through "forkserver" (or "spawn") rather than forked from
+# the multi-threaded server, and load the spaCy model once at startup.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+
+# ──────── Custom modules ────────
+from utils.config import (
+    SANDBOX_WORKERS, SANDBOX_TIMEOUT_SECONDS, SANDBOX_MEMORY_MB, SANDBOX_MAX_JOBS, SANDBOX_START_METHOD,
+)
+from utils.metrics import REGISTRY, SANDBOX_JOBS, SANDBOX_RESTARTS
+from utils.logger import logger
+
+
+class SandboxError(Exception):
+    """A sandboxed job failed. `kind` is one of: timeout, memory, crashed, error."""
+
+    def __init__(self, kind: str, message: str):
+        super().__init__(message)
+        self.kind = kind
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Jobs (run inside the worker process; must be importable module-level functions)
+# ──────────────────────────────────────────────────────────────────────────────
+def read_file_job(path: str) -> str:
+    from extractor.file_reader import read_file
+    return read_file(path)
+
+
+def extract_info_job(text: str):
+    """
+    Returns (result, escalation reasons) from extract_local(): the GPT decision
+    is left to the caller, which holds the batch budget.
+    """
+    from extractor.text_extractor import extract_local
+    return extract_local(text)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Worker process
+# ──────────────────────────────────────────────────────────────────────────────
+def _address_space_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _apply_memory_limit(memory_mb: int):
+    """Caps the address space at the loaded baseline plus `memory_mb`."""
+    try:
+        import resource
+    except ImportError:
+        return
+    baseline = _address_space_bytes()
+    if baseline is None or memory_mb <= 0:
+        return
+    limit = baseline + memory_mb * 1024 * 1024
+    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _worker_main(conn, memory_mb: int):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the parent decides when workers stop
+
+    from extractor.text_extractor import warm_up
+    from utils.lazy_imports import lazy_import
+
+    # Load everything a job may need before the limit is measured and applied
+    warm_up()
+    for module in ("pdfplumber", "docx"):
+        try:
+            lazy_import(module)
+        except ImportError:
+            pass
+    _apply_memory_limit(memory_mb)
+    REGISTRY.drain()  # the web worker recorded its own warm-up
+    conn.send(("ready", os.getpid()))
+
+    # Each reply carries the metrics the job recorded, for the web worker's /metrics
+    while True:
+        try:
+            function, args = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        try:
+            conn.send(("ok", function(*args), REGISTRY.drain()))
+        except MemoryError:
+            conn.send(("memory", f"Exceeded the {memory_mb} MiB memory limit.", REGISTRY.drain()))
+            break
+        except Exception as e:
+            conn.send(("error", f"{type(e).__name__}: {e}", REGISTRY.drain()))
+
+
+class _Worker:
+    def __init__(self, context, memory_mb):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.ready = False
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    Pool of isolated worker processes.
+
+    Args:
+        size (int): Worker processes.
+        timeout (float): Default wall-clock seconds per job.
+        memory_mb (int): Address space each worker may use beyond its loaded baseline.
+        max_jobs (int): Jobs before a worker is recycled (0 = never).
+    """
+
+    STARTUP_TIMEOUT = 120
+
+    def __init__(self, size=SANDBOX_WORKERS, timeout=SANDBOX_TIMEOUT_SECONDS, memory_mb=SANDBOX_MEMORY_MB,
+                 max_jobs=SANDBOX_MAX_JOBS, start_method=SANDBOX_START_METHOD):
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.memory_mb = memory_mb
+        self.max_jobs = max_jobs
+        self.start_method = start_method
+        self._idle = queue.Queue()
+        self._workers = set()
+        self._lock = threading.Lock()
+        self._context = None
+
+    def _start(self):
+        with self._lock:
+            if self._context is None:
+                methods = multiprocessing.get_all_start_methods()
+                method = self.start_method if self.start_method in methods else "spawn"
+                self._context = multiprocessing.get_context(method)
+                for _ in range(self.size):
+                    self._spawn()
+                logger.info(f"🧪 Started {self.size} sandbox worker(s) ({method}, "
+                            f"{self.timeout:.0f}s / {self.memory_mb} MiB per job)")
+
+    def _spawn(self):
+        worker = _Worker(self._context, self.memory_mb)
+        self._workers.add(worker)
+        self._idle.put(worker)
+
+    def _replace(self, worker, reason):
+        worker.kill()
+        with self._lock:
+            self._workers.discard(worker)
+            if self._context is not None:
+                SANDBOX_RESTARTS.inc(reason=reason)
+                self._spawn()
+
+    def run(self, function, *args, timeout=None):
+        """
+        Runs `function(*args)` in a worker and returns its result, or raises
+        SandboxError. `timeout` covers waiting for a free worker and the job itself.
+        """
+        if self._context is None:
+            self._start()
+        timeout = self.timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        try:
+            worker = self._idle.get(timeout=max(timeout, 0))
+        except queue.Empty:
+            SANDBOX_JOBS.inc(outcome="timeout")
+            raise SandboxError("timeout", f"No sandbox worker became free within {timeout:.0f}s.")
+        try:
+            # A freshly started worker's model load does not count against the job
+            remaining = max(deadline - time.monotonic(), 0)
+            if not worker.ready:
+                self._wait_ready(worker)
+            worker.conn.send((function, args))
+            if not worker.conn.poll(remaining):
+                self._fail(worker, "timeout", f"Timed out after {timeout:.0f}s.")
+            try:
+                status, payload, recorded = worker.conn.recv()
+                REGISTRY.merge(recorded)
+            except (EOFError, OSError):
+                worker.process.join(timeout=1)
+                code = worker.process.exitcode
+                kind = "memory" if code == -signal.SIGKILL else "crashed"
+                self._fail(worker, kind, f"Sandbox worker exited unexpectedly (exit code {code}).")
+            if status == "memory":
+                self._fail(worker, "memory", payload)
+        except SandboxError:
+            raise
+        except BaseException:
+            self._replace(worker, "crashed")
+            raise
+
+        worker.jobs += 1
+        if status == "error":
+            SANDBOX_JOBS.inc(outcome="error")
+            self._release(worker)
+            raise SandboxError("error", payload)
+        SANDBOX_JOBS.inc(outcome="ok")
+        self._release(worker)
+        return payload
+
+    def _wait_ready(self, worker):
+        try:
+            started = worker.conn.poll(self.STARTUP_TIMEOUT) and worker.conn.recv()
+        except (EOFError, OSError):
+            started = False
+        if not started:
+            self._fail(worker, "crashed", "Sandbox worker failed to start.")
+        worker.ready = True
+
+    def _fail(self, worker, kind, message):
+        SANDBOX_JOBS.inc(outcome=kind)
+        logger.warning(f"🧪 Sandbox worker {worker.process.pid} {kind}: {message} Replacing it.")
+        self._replace(worker, kind)
+        raise SandboxError(kind, message)
+
+    def _release(self, worker):
+        if self.max_jobs and worker.jobs >= self.max_jobs:
+            self._replace(worker, "recycled")
+        else:
+            self._idle.put(worker)
+
+    def shutdown(self):
+        with self._lock:
+            context, self._context = self._context, None
+            workers, self._workers = list(self._workers), set()
+        if context is None:
+            return
+        for worker in workers:
+            worker.kill()
+        logger.info("🧪 Sandbox workers stopped.")
+
+
+# Shared per web worker process; started on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> SandboxPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = SandboxPool()
+    return _pool
+
+
+def shutdown_pool():
+    if _pool is not None:
+        _pool.shutdown()
+
+
+def deadline_remaining(deadline: float) -> float:
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise SandboxError("timeout", f"Timed out after {SANDBOX_TIMEOUT_SECONDS:.0f}s.")
+    return remaining
@@ -6,13 +6,21 @@
 import os
 import re
 import logging
-import spacy
+import threading
+import time
 from dotenv import load_dotenv
 from pathlib import Path
 import random
-from utils.config import use_gpt_extraction
-from utils.post_process import clean_entities
-from gpt_integration.gpt_extractor import extract_entities_with_gpt
+from utils.config import (
+    extraction_mode, SPACY_MODEL_NAME, LANGUAGE_ROUTING_ENABLED, DEFAULT_LANGUAGE, LANGUAGE_MODELS,
+)
+from utils.post_process import DEFAULT_POST_PROCESSOR
+from utils.metrics import NER_SECONDS, CASCADE_DOCUMENTS, CASCADE_TRIGGERS, LANGUAGE_DOCUMENTS
+from utils.lazy_imports import lazy_import
+from extractor.gazetteer import get_gazetteer, merge_gazetteer_entities
+from extractor.cascade import escalation_reasons, merge_results
+from extractor import doc_store
+from extractor.language import detect_language, get_model_cache
 
 # Load .env variables
 load_dotenv()
@@ -30,16 +38,101 @@ file_handler = logging.FileHandler(log_file, encoding="utf-8")
 file_handler.setFormatter(logging.Formatter('%(asctime)s [%(levelname)s]: %(message)s'))
 logger.addHandler(file_handler)
 
+# Emails are found with a regex rather than the NER model
+EMAIL_RE = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}\b')
+
 # ─────── Load spaCy model ───────
 # MODEL_PATH = PROJECT_ROOT / os.getenv("MODEL_PATH", "training/custom_ner_model")
 
-try:
-    nlp = spacy.load("en_core_web_sm")
-    logger.info("✅ Successfully loaded spaCy default model")
-except BaseException as e:
-    logger.exception("⚠️ Failed to default model. Falling back Custom spaCy model.")
-    nlp = spacy.load("en_core_web_sm")
-    logger.info("🔁 Loaded spaCy default model.")
+# spaCy and the model are loaded on first use (or by warm_up() at startup) so
+# importing this module, and therefore the app, stays fast.
+_nlp = None
+_nlp_lock = threading.Lock()
+_model_error = None
+
+
+def get_nlp():
+    """Returns the shared spaCy pipeline, loading it on the first call."""
+    global _nlp, _model_error
+    if _nlp is not None:
+        return _nlp
+
+    with _nlp_lock:
+        if _nlp is None:
+            spacy = lazy_import("spacy")
+
+            start = time.perf_counter()
+            try:
+                _nlp = spacy.load(SPACY_MODEL_NAME)
+                logger.info("✅ Successfully loaded spaCy model '%s' in %.2fs",
+                            SPACY_MODEL_NAME, time.perf_counter() - start)
+            except BaseException as e:
+                _model_error = f"{type(e).__name__}: {e}"
+                logger.exception("⚠️ Failed to load spaCy model '%s'.", SPACY_MODEL_NAME)
+                raise
+            _model_error = None
+    return _nlp
+
+
+def is_model_loaded() -> bool:
+    return _nlp is not None
+
+
+def model_load_error():
+    """Returns the last model load failure message, if any."""
+    return _model_error
+
+
+def warm_up():
+    """Loads the model ahead of the first request (run in a background thread at startup)."""
+    try:
+        nlp = get_nlp()
+        nlp("Warm-up run.")
+        get_gazetteer()
+    except BaseException:
+        # Already logged by get_nlp(); readiness keeps reporting not-ready.
+        pass
+
+
+def text_language(text: str) -> str:
+    """The document's language when language routing is on, otherwise DEFAULT_LANGUAGE."""
+    language = detect_language(text) if LANGUAGE_ROUTING_ENABLED else DEFAULT_LANGUAGE
+    LANGUAGE_DOCUMENTS.inc(language=language)
+    return language
+
+
+def nlp_for_language(language: str):
+    """
+    Pipeline for a language: SPACY_MODEL for the default language, languages
+    without a configured (or loadable) model fall back to it as well.
+    """
+    model = LANGUAGE_MODELS.get(language)
+    if language == DEFAULT_LANGUAGE or not model or model == SPACY_MODEL_NAME:
+        return get_nlp()
+    return get_model_cache().get(model) or get_nlp()
+
+
+def _annotate(nlp, texts: list):
+    """
+    Runs the texts through one nlp.pipe() pass, loading stored annotations
+    instead where available. Returns (docs, annotation keys).
+    """
+    stored = [doc_store.lookup(nlp, text) for text in texts]
+    keys = [key for key, _ in stored]
+    docs = [doc for _, doc in stored]
+
+    # Only texts without stored annotations go through the model
+    missing = [index for index, doc in enumerate(docs) if doc is None]
+    if len(missing) == 1:
+        index = missing[0]
+        with NER_SECONDS.time():
+            docs[index] = nlp(texts[index])
+        keys[index] = doc_store.save(keys[index], docs[index])
+    elif missing:
+        for index, doc in zip(missing, nlp.pipe([texts[index] for index in missing], batch_size=len(missing))):
+            docs[index] = doc
+            keys[index] = doc_store.save(keys[index], doc)
+    return docs, keys
 
 
 def extract_info_spacy(text: str) -> dict:
@@ -47,13 +140,31 @@ def extract_info_spacy(text: str) -> dict:
     Extract entities using spaCy and return detailed result with confidence.
     Returns: Dict with keys: names, emails, orgs, and per-entity confidences
     """
+    return _spacy_pass(text)[0]
+
+def _spacy_pass(text: str):
+    """Runs spaCy (plus the email regex and gazetteer) and returns (result, doc)."""
     logger.info("📝 Starting entity extraction from text.")
 
+    language = text_language(text)
+    (doc,), (key,) = _annotate(nlp_for_language(language), [text])
+    result = result_from_doc(text, doc)
+    result["language"] = language
+    if key:
+        result["annotations"] = key
+    return result, doc
+
+def result_from_doc(text: str, doc) -> dict:
+    """
+    Builds the result dict from an annotated doc: merges gazetteer hits,
+    maps entity labels to fields and adds regex emails (no post-processing).
+    """
     # Emails via regex
-    emails = re.findall(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,7}\b', text)
+    emails = EMAIL_RE.findall(text)
     logger.info("📧 Found %d email(s).", len(emails))
 
-    doc = nlp(text)
+    # Known organizations and people from the gazetteer lists
+    merge_gazetteer_entities(doc)
 
     names, orgs = [], []
     confidences = []
@@ -62,7 +173,8 @@ def extract_info_spacy(text: str) -> dict:
         conf = round(random.uniform(0.85, 0.99), 2)  # Simulate realistic confidence
         logger.debug(f"Span: '{ent.text}' | Label: '{ent.label_}' | Start: {ent.start_char} | End: {ent.end_char} | Confidence: {conf}")
 
-        if ent.label_ == "PERSON":
+        # English pipelines label people PERSON; the other spaCy languages use PER
+        if ent.label_ in ("PERSON", "PER"):
             names.append(ent.text)
         elif ent.label_ == "ORG":
             orgs.append(ent.text)
@@ -82,27 +194,121 @@ def extract_info_spacy(text: str) -> dict:
         "confidence_scores": confidences  # Optional: can be used in analysis
     }
 
-def extract_info(text: str) -> dict:
+def _extract_gpt(text: str):
+    """GPT extraction; returns the raw entity lists, or None if the call failed."""
+    try:
+        extract_entities_with_gpt = lazy_import("gpt_integration.gpt_extractor").extract_entities_with_gpt
+
+        result = extract_entities_with_gpt(text)
+        if isinstance(result, dict):
+            return {
+                "person": result.get("person", []),
+                "organization": result.get("organization", []),
+                "email": result.get("email", []),
+            }
+        logger.warning("⚠️ GPT result is not a dictionary. Got: %s", type(result))
+    except Exception:
+        logger.exception("❌ Error during GPT extraction.")
+    return None
+
+def _extract_cascade(text: str, budget) -> dict:
+    """spaCy first; escalates to GPT when a trigger fires and the batch budget allows it."""
+    result, doc = _spacy_pass(text)
+    return _escalate(text, result, escalation_reasons(text, result, doc), budget)
+
+def _escalate(text: str, result: dict, reasons: list, budget) -> dict:
+    """Cascade decision for one spaCy result and its triggers: keep it, or merge in a GPT pass."""
+    result["source"] = "spacy"
+
+    for reason in reasons:
+        CASCADE_TRIGGERS.inc(reason=reason)
+    if not reasons:
+        CASCADE_DOCUMENTS.inc(outcome="local")
+        return result
+
+    if budget is not None and not budget.try_acquire():
+        logger.info("🪜 Cascade: %s tripped but the batch GPT budget is spent.", ", ".join(reasons))
+        CASCADE_DOCUMENTS.inc(outcome="budget_exhausted")
+        return result
+
+    logger.info("🪜 Cascade: escalating to GPT (%s).", ", ".join(reasons))
+    CASCADE_DOCUMENTS.inc(outcome="escalated")
+    gpt_result = _extract_gpt(text)
+    if gpt_result is None:
+        return result
+    merged = merge_results(result, gpt_result)
+    merged["source"] = "spacy+gpt"
+    return merged
+
+def extract_info(text: str, budget=None) -> dict:
     """
-    Main entry point for extracting PERSON, EMAIL, ORG using spaCy or GPT.
+    Main entry point for extracting PERSON, EMAIL, ORG using spaCy, GPT or the
+    spaCy → GPT cascade (see extraction_mode()). In cascade mode, `budget` is
+    the batch's GPTBudget; without one escalations are not capped.
+    The entity lists are cleaned and de-duplicated by the post-processing engine.
     """
-    if use_gpt_extraction():
+    mode = extraction_mode()
+    if mode == "gpt":
         logger.info("🧠 Using GPT for extraction.")
-        try:
-            result = extract_entities_with_gpt(text)
-            if isinstance(result, dict):
-                return {
-                    "person": result.get("person", []),
-                    "organization": result.get("organization", []),
-                    "email": result.get("email", []),
-                    "source": "gpt"
-                }
-            else:
-                logger.warning("⚠️ GPT result is not a dictionary. Got: %s", type(result))
-        except Exception:
-            logger.exception("❌ Error during GPT extraction.")
-        return {"person": [], "organization": [], "email": [], "source": "gpt"}
+        result = _extract_gpt(text)
+        if result is None:
+            return {"person": [], "organization": [], "email": [], "source": "gpt"}
+        result["source"] = "gpt"
+        return DEFAULT_POST_PROCESSOR.process_result(result)
+    elif mode == "cascade":
+        return DEFAULT_POST_PROCESSOR.process_result(_extract_cascade(text, budget))
     else:
         result = extract_info_spacy(text)
         result["source"] = "spacy"
+        return DEFAULT_POST_PROCESSOR.process_result(result)
+
+def extract_local(text: str):
+    """
+    The local half of extract_info(), for running somewhere the batch budget is
+    not (a sandbox worker). In cascade mode returns the spaCy result, not yet
+    post-processed, and the triggers it trips; in the other modes the finished
+    result and None. Complete it with finish_extraction().
+    """
+    if extraction_mode() != "cascade":
+        return extract_info(text), None
+    result, doc = _spacy_pass(text)
+    return result, escalation_reasons(text, result, doc)
+
+def finish_extraction(text: str, result: dict, reasons, budget=None) -> dict:
+    """Completes an extract_local() result: the GPT pass (if a trigger fired and `budget` allows) and post-processing."""
+    if reasons is None:
         return result
+    return DEFAULT_POST_PROCESSOR.process_result(_escalate(text, result, reasons, budget))
+
+def extract_info_batch(texts: list, budget=None, budgets=None) -> list:
+    """
+    Same as extract_info() for many texts at once. The spaCy and cascade modes
+    run the texts through one nlp.pipe() call per language; GPT mode goes one by one.
+    `budgets` gives each text its own GPTBudget instead of the shared `budget`.
+    """
+    budgets = budgets if budgets is not None else [budget] * len(texts)
+    mode = extraction_mode()
+    if mode == "gpt" or not texts:
+        return [extract_info(text, budget=text_budget) for text, text_budget in zip(texts, budgets)]
+
+    # One nlp.pipe() pass per language in the batch
+    languages = [text_language(text) for text in texts]
+    docs, keys = [None] * len(texts), [None] * len(texts)
+    for language in dict.fromkeys(languages):
+        indexes = [index for index, text_lang in enumerate(languages) if text_lang == language]
+        group_docs, group_keys = _annotate(nlp_for_language(language), [texts[index] for index in indexes])
+        for index, doc, key in zip(indexes, group_docs, group_keys):
+            docs[index], keys[index] = doc, key
+
+    results = []
+    for text, doc, key, language, text_budget in zip(texts, docs, keys, languages, budgets):
+        result = result_from_doc(text, doc)
+        result["language"] = language
+        if key:
+            result["annotations"] = key
+        if mode == "cascade":
+            result = _escalate(text, result, escalation_reasons(text, result, doc), text_budget)
+        else:
+            result["source"] = "spacy"
+        results.append(DEFAULT_POST_PROCESSOR.process_result(result))
+    return results
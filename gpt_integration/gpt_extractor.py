@@ -1,7 +1,13 @@
 import os
 import json
+import threading
+import time
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, RateLimitError, InternalServerError
+
+# ──────── Custom modules ────────
+from utils.config import GPT_MAX_RETRIES
+from utils.metrics import GPT_CALL_SECONDS, GPT_RETRIES
 
 # ───────────────────────────────────────────────────────────────────────
 # Author: Paul-Michael Smith
@@ -11,7 +17,47 @@ from openai import OpenAI
 
 # Load API key from .env
 load_dotenv()
-client = OpenAI(api_key=os.getenv("OPEN_AI_API_KEY"))
+
+# The client is created on first use so GPT-off deployments never construct it.
+# Retries are handled below (instead of inside the client) so each one can be counted.
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = OpenAI(api_key=os.getenv("OPEN_AI_API_KEY"), max_retries=0)
+    return _client
+
+# Errors worth retrying: network failures/timeouts, rate limiting and 5xx responses
+TRANSIENT_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+def _create_completion(messages):
+    """Calls the chat completion API, retrying transient errors with exponential backoff."""
+    attempt = 0
+    while True:
+        start = time.perf_counter()
+        try:
+            response = get_client().chat.completions.create(
+                model="gpt-3.5-turbo", # Change model for better accuracy
+                messages=messages,
+                temperature=0.2,
+                max_tokens=500
+            )
+            GPT_CALL_SECONDS.observe(time.perf_counter() - start, outcome="success")
+            return response
+        except TRANSIENT_ERRORS:
+            GPT_CALL_SECONDS.observe(time.perf_counter() - start, outcome="retryable_error")
+            if attempt >= GPT_MAX_RETRIES:
+                raise
+            attempt += 1
+            GPT_RETRIES.inc()
+            time.sleep(0.5 * 2 ** (attempt - 1))
+        except Exception:
+            GPT_CALL_SECONDS.observe(time.perf_counter() - start, outcome="error")
+            raise
 
 def extract_entities_with_gpt(text):
     prompt = f"""
@@ -28,15 +74,10 @@ Document:
 {text}
 """
     try:
-        response = client.chat.completions.create(
-            model="gpt-3.5-turbo", # Change model for better accuracy
-            messages=[
-                {"role": "system", "content": "You extract structured data from unstructured text."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=500
-        )
+        response = _create_completion([
+            {"role": "system", "content": "You extract structured data from unstructured text."},
+            {"role": "user", "content": prompt}
+        ])
         content = response.choices[0].message.content.strip()
         return json.loads(content)
     except Exception as e:
@@ -0,0 +1,109 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: JSON extraction API for other services. Each request carries one
+#          document (raw text as JSON, or a single uploaded file) and gets its
+#          entities back as JSON. Concurrent requests are micro-batched so
+#          they share one spaCy nlp.pipe() call.
+#
+# Usage:
+#   curl -X POST /api/extract -H "Content-Type: application/json" -d '{"text": "..."}'
+#   curl -X POST /api/extract -F "file=@resume.pdf"
+# ──────────────────────────────────────────────────────────────────────────────
+
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+from pathlib import Path
+import asyncio
+import os
+import shutil
+import tempfile
+
+# ──────── Custom modules ────────
+from extractor.text_extractor import extract_info_batch
+from extractor.file_reader import READERS
+from extractor.processing import read_document, SandboxError
+from extractor.cascade import GPTBudget, GPT_CALLS_PER_DOCUMENT
+from utils.batching import MicroBatcher
+from utils.admission import check_upload_files
+from utils.config import OUTPUT_FOLDER, API_BATCH_MAX_SIZE, API_BATCH_MAX_WAIT_MS
+from utils.logger import logger
+
+# Create router
+router = APIRouter()
+
+
+def _extract_batch(texts):
+    # In cascade mode each request may escalate on its own (GPT_CALLS_PER_DOCUMENT), whatever it
+    # was batched with; overall GPT use is bounded by the admission layer's per-client rate limit
+    return extract_info_batch(texts, budgets=[GPTBudget(GPT_CALLS_PER_DOCUMENT) for _ in texts])
+
+
+# Shared per worker process; started on first use and stopped by the app lifespan
+extract_batcher = MicroBatcher(_extract_batch, API_BATCH_MAX_SIZE, API_BATCH_MAX_WAIT_MS / 1000)
+
+
+def _error(message, status_code):
+    return JSONResponse({"error": message}, status_code=status_code)
+
+
+async def _read_upload(upload):
+    """Saves an uploaded file to a temporary path and returns its text."""
+    suffix = Path(upload.filename or "").suffix.lower()
+    if suffix not in READERS:
+        return None
+    OUTPUT_FOLDER.mkdir(exist_ok=True)
+    with tempfile.NamedTemporaryFile(prefix="api_", suffix=suffix, dir=OUTPUT_FOLDER, delete=False) as buffer:
+        shutil.copyfileobj(upload.file, buffer)
+        temp_path = buffer.name
+    try:
+        return await asyncio.to_thread(read_document, temp_path)
+    finally:
+        os.remove(temp_path)
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: POST "/api/extract" — Extracts entities from one document, as JSON
+# ──────────────────────────────────────────────────────────────────────────────
+@router.post("/api/extract")
+async def api_extract(request: Request):
+    content_type = request.headers.get("content-type", "")
+
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or not hasattr(upload, "filename"):
+            return _error("Expected a 'file' field.", 400)
+        check_upload_files([upload])
+        filename = upload.filename
+        try:
+            text = await _read_upload(upload)
+        except SandboxError as e:
+            return _error(f"Could not read {filename}: {e}", 422)
+        if text is None:
+            return _error(f"Unsupported file type. Supported: {', '.join(sorted(READERS))}", 415)
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            return _error("Expected a JSON body like {\"text\": \"...\"} or a multipart 'file' upload.", 400)
+        if not isinstance(payload, dict) or not isinstance(payload.get("text"), str):
+            return _error("Expected a JSON body like {\"text\": \"...\"}.", 400)
+        filename = payload.get("filename")
+        text = payload["text"]
+
+    if not text.strip():
+        return _error("The document contains no extractable text.", 422)
+
+    try:
+        result = await extract_batcher.submit(text)
+    except Exception as e:
+        logger.error(f"API extraction error: {str(e)}", exc_info=True)
+        return _error("Extraction failed.", 500)
+
+    return {
+        "filename": filename,
+        "characters": len(text),
+        "person": result.get("person", []),
+        "organization": result.get("organization", []),
+        "email": result.get("email", []),
+        "source": result.get("source"),
+    }
@@ -8,6 +8,7 @@ from datetime import datetime
 # ──────── Custom modules ────────
 from utils.logger import logger
 from utils.config import TEMPLATES_DIR
+from utils.metrics import DB_COMMIT_SECONDS
 from db.session import get_db
 from db.database import Feedback
 
@@ -30,7 +31,8 @@ async def submit_feedback(
     try:
         feedback = Feedback(message=message, rating=rating, submitted_at=datetime.now())
         db.add(feedback)
-        db.commit()
+        with DB_COMMIT_SECONDS.time(operation="feedback"):
+            db.commit()
         logger.info(f"📝 New feedback submitted.")
         return RedirectResponse(url="/feedback/thanks", status_code=303)
     except Exception as e:
@@ -0,0 +1,36 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Liveness and readiness probes. "/healthz" answers as soon as the
+#          process is serving; "/readyz" only reports ready once the spaCy
+#          model has been loaded by the startup warm-up.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+# ──────── Custom modules ────────
+from extractor.text_extractor import is_model_loaded, model_load_error
+from utils.config import SPACY_MODEL_NAME
+
+# Create router
+router = APIRouter()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: GET "/healthz" — Liveness probe
+# ──────────────────────────────────────────────────────────────────────────────
+@router.get("/healthz", include_in_schema=False)
+async def healthz():
+    return {"status": "ok"}
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: GET "/readyz" — Readiness probe (model loaded)
+# ──────────────────────────────────────────────────────────────────────────────
+@router.get("/readyz", include_in_schema=False)
+async def readyz():
+    if is_model_loaded():
+        return {"status": "ready", "model": SPACY_MODEL_NAME}
+
+    content = {"status": "starting", "model": SPACY_MODEL_NAME}
+    if model_load_error():
+        content = {"status": "error", "model": SPACY_MODEL_NAME, "error": model_load_error()}
+    return JSONResponse(content, status_code=503)
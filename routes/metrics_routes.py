@@ -0,0 +1,21 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Exposes the in-process counters and histograms from utils.metrics
+#          in the Prometheus text exposition format for scraping.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+# ──────── Custom modules ────────
+from utils.metrics import REGISTRY, CONTENT_TYPE_LATEST
+
+# Create router
+router = APIRouter()
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: GET "/metrics" — Prometheus scrape endpoint
+# ──────────────────────────────────────────────────────────────────────────────
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(content=REGISTRY.render(), media_type=CONTENT_TYPE_LATEST)
@@ -6,13 +6,21 @@
 # ──────────────────────────────────────────────────────────────────────────────
 
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, Response, StreamingResponse
 from fastapi.templating import Jinja2Templates
+from collections import OrderedDict
+from datetime import datetime
+from hashlib import sha1
+import asyncio
 import json
+import re
 
 # ──────── Custom modules ────────
 from utils.logger import logger
 from utils.config import OUTPUT_FOLDER, TEMPLATES_DIR
+from utils.entity_stats import EntityStats, load_stats, stats_from_rows
+from utils.result_set import ResultSet
+from utils.zip_stream import ZipMember, iter_zip, slice_stream
 
 # Set up template rendering
 templates = Jinja2Templates(directory=TEMPLATES_DIR)
@@ -20,6 +28,9 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 # Create router
 router = APIRouter()
 
+# Most frequent entities shown per label
+RESULTS_TOP_K = 10
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Route: GET "/results/{filename}" — Displays results summary on webpage
 # ──────────────────────────────────────────────────────────────────────────────
@@ -34,30 +45,44 @@ async def show_results(request: Request, filename: str):
             "error_message": "No results found. The data may have expired or been removed."
         }, status_code=404)
 
-    with open(json_path, "r", encoding="utf-8") as f:
-        summary_data = json.load(f)
+    # Frequency tables are computed at extraction time; only older batches fall back to the full export
+    stats = load_stats(filename)
+    results_path = OUTPUT_FOLDER / f"{filename}.results.jsonl"
+    if stats is None and results_path.exists():
+        batch_stats = EntityStats()
+        for document in ResultSet.read_jsonl(results_path):
+            batch_stats.add(document.filename, document)
+        stats = batch_stats.summary(RESULTS_TOP_K)
+    elif stats is None:
+        with open(json_path, "r", encoding="utf-8") as f:
+            summary_data = json.load(f)
+        stats = stats_from_rows(summary_data.get("results", [])).summary(
+            RESULTS_TOP_K, files_processed=summary_data.get("files_processed", 0))
 
-    # Extract and Flatten preview
-    data = summary_data.get("results", [])
-    names, emails, orgs = [], [], []
-    for row in data:
-        names.extend(row.get("Names", "").split(", "))
-        emails.extend(row.get("Emails", "").split(", "))
-        orgs.extend(row.get("Organizations", "").split(", "))
+    # Streamed uploads only write CSV/JSON exports
+    download_name = f"{filename}.xlsx"
+    if not (OUTPUT_FOLDER / download_name).exists() and (OUTPUT_FOLDER / f"{filename}.csv").exists():
+        download_name = f"{filename}.csv"
+    entities_csv = f"{filename}.entities.csv"
 
     # Return the template with all required data
     return templates.TemplateResponse("results.html", {
         "request": request,
-        "names": names[:10],
-        "emails": emails[:10],
-        "orgs": orgs[:10],
-        "filename": f"{filename}.xlsx",
-        "download_url": f"/download/{filename}.xlsx",
+        "names": stats["names"]["top"][:RESULTS_TOP_K],
+        "emails": stats["emails"]["top"][:RESULTS_TOP_K],
+        "orgs": stats["orgs"]["top"][:RESULTS_TOP_K],
+        "filename": download_name,
+        "download_url": f"/download/{download_name}",
+        "entities_url": f"/download/{entities_csv}" if (OUTPUT_FOLDER / entities_csv).exists() else None,
+        "bundle_url": f"/bundle/{filename}",
         "summary": {
-            "files": summary_data.get("files_processed", 0),
-            "names": summary_data.get("names_extracted", 0),
-            "emails": summary_data.get("emails_extracted", 0),
-            "orgs": summary_data.get("orgs_extracted", 0),
+            "files": stats["files_processed"],
+            "names": stats["names"]["extracted"],
+            "emails": stats["emails"]["extracted"],
+            "orgs": stats["orgs"]["extracted"],
+            "distinct_names": stats["names"]["distinct"],
+            "distinct_emails": stats["emails"]["distinct"],
+            "distinct_orgs": stats["orgs"]["distinct"],
         }
     })
 
@@ -79,4 +104,143 @@ async def download_file(request: Request, filename: str):
     return templates.TemplateResponse("error.html", {
         "request": request,
         "error_message": f"The file '{filename}' was not found or may have expired."
-    }, status_code=404)
\ No newline at end of file
+    }, status_code=404)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: GET "/bundle/{results_id}" — All of a batch's files as one streamed ZIP
+#
+# ?documents=true adds one JSON file per document (from <id>.results.jsonl).
+# The archive is compressed on the fly; Range requests resume a download by
+# regenerating the (deterministic) stream and skipping the bytes already sent.
+# ──────────────────────────────────────────────────────────────────────────────
+RESULTS_ID_RE = re.compile(r"[\w.-]+")
+RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)")
+BUNDLE_VERSION = 1  # part of the ETag; bump when the archive layout changes
+
+# Archive sizes by ETag: learned from completed downloads (or measured) to answer Range/HEAD requests
+_bundle_sizes = OrderedDict()
+MAX_CACHED_SIZES = 256
+
+
+def _bundle_artifacts(results_id: str) -> list:
+    return sorted(path for path in OUTPUT_FOLDER.glob(f"{results_id}.*") if path.is_file())
+
+
+def _document_members(results_path):
+    """One JSON member per document of a results file, built as the archive is written."""
+    modified = datetime.fromtimestamp(results_path.stat().st_mtime)
+    with open(results_path, "r", encoding="utf-8") as f:
+        f.readline()  # format header
+        for index, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            name = re.sub(r"[^\w.-]+", "_", record.get("filename") or "document")
+            yield ZipMember.from_bytes(f"documents/{index:05d}_{name}.json",
+                                       json.dumps(record, ensure_ascii=False, indent=2).encode("utf-8"), modified)
+
+
+def _bundle_members(artifacts: list, include_documents: bool):
+    for path in artifacts:
+        yield ZipMember.from_file(path)
+    results_path = next((path for path in artifacts if path.name.endswith(".results.jsonl")), None)
+    if include_documents and results_path is not None:
+        yield from _document_members(results_path)
+
+
+def _bundle_size(artifacts: list, include_documents: bool) -> int:
+    """Measures an archive by generating it without sending it."""
+    return sum(len(chunk) for chunk in iter_zip(_bundle_members(artifacts, include_documents)))
+
+
+def _bundle_etag(results_id: str, artifacts: list, include_documents: bool) -> str:
+    digest = sha1(f"{BUNDLE_VERSION}:{results_id}:{include_documents}".encode("utf-8"))
+    for path in artifacts:
+        stat = path.stat()
+        digest.update(f"|{path.name}:{stat.st_size}:{stat.st_mtime_ns}".encode("utf-8"))
+    return f'"{digest.hexdigest()}"'
+
+
+def _remember_size(etag: str, size: int):
+    _bundle_sizes[etag] = size
+    _bundle_sizes.move_to_end(etag)
+    while len(_bundle_sizes) > MAX_CACHED_SIZES:
+        _bundle_sizes.popitem(last=False)
+
+
+def _recording(chunks, etag: str):
+    """Passes the stream through and remembers its size once it has been sent completely."""
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        yield chunk
+    _remember_size(etag, size)
+
+
+def _parse_range(header: str, size: int):
+    """
+    (start, end) of a single-range "bytes=" header; None to ignore it and send
+    everything (multiple or malformed ranges), "invalid" if unsatisfiable.
+    """
+    match = RANGE_RE.fullmatch((header or "").replace(" ", ""))
+    if match is None or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first and last and int(first) > int(last):
+        return None  # syntactically invalid (RFC 9110): ignore the header
+    if first == "":
+        start, end = max(size - int(last), 0), size - 1  # suffix range: the last N bytes
+    else:
+        start, end = int(first), min(int(last), size - 1) if last else size - 1
+    if start > end or start >= size:
+        return "invalid"
+    return start, end
+
+
+@router.api_route("/bundle/{results_id}", methods=["GET", "HEAD"])
+async def download_bundle(request: Request, results_id: str, documents: bool = False):
+    artifacts = _bundle_artifacts(results_id) if RESULTS_ID_RE.fullmatch(results_id) else []
+    if not artifacts:
+        return templates.TemplateResponse("error.html", {
+            "request": request,
+            "error_message": f"No files found for '{results_id}'. The data may have expired or been removed."
+        }, status_code=404)
+
+    etag = _bundle_etag(results_id, artifacts, documents)
+    headers = {
+        "Accept-Ranges": "bytes",
+        "ETag": etag,
+        "Content-Disposition": f'attachment; filename="{results_id}.zip"',
+    }
+
+    # A Range only applies while the archive is unchanged (If-Range carries the ETag the client started with)
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range is not None and if_range != etag:
+        range_header = None
+
+    size = _bundle_sizes.get(etag)
+    if size is None and (request.method == "HEAD" or range_header):
+        size = await asyncio.to_thread(_bundle_size, artifacts, documents)
+        _remember_size(etag, size)
+    if size is not None:
+        headers["Content-Length"] = str(size)
+
+    if request.method == "HEAD":
+        return Response(media_type="application/zip", headers=headers)
+
+    byte_range = _parse_range(range_header, size) if range_header else None
+    if byte_range == "invalid":
+        return Response(status_code=416, headers={"Content-Range": f"bytes */{size}", "ETag": etag})
+    if byte_range is not None:
+        start, end = byte_range
+        logger.info(f"📦 Resuming bundle {results_id} at byte {start}")
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+        headers["Content-Length"] = str(end - start + 1)
+        chunks = slice_stream(iter_zip(_bundle_members(artifacts, documents)), start, end)
+        return StreamingResponse(chunks, status_code=206, media_type="application/zip", headers=headers)
+
+    logger.info(f"📦 Streaming bundle {results_id} ({len(artifacts)} files{', with documents' if documents else ''})")
+    chunks = _recording(iter_zip(_bundle_members(artifacts, documents)), etag)
+    return StreamingResponse(chunks, media_type="application/zip", headers=headers)
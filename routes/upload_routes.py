@@ -3,28 +3,42 @@
 # Purpose: Defines routes for uploading documents and extracting entity data such
 #          as names, emails, and organizations. It handles file saving, processing,
 #          Excel and CSV exports, as well as logging extractions into both CSV and
-#          the database.
+#          the database. "/upload/stream" streams per-file results as NDJSON.
 # ───────────────────────────────────────────────────────────────────────────────────
 
 from fastapi import APIRouter, Request, UploadFile, File, Depends
-from fastapi.responses import HTMLResponse, RedirectResponse
+from fastapi.responses import HTMLResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from pathlib import Path
 from datetime import datetime
 from typing import List
+import asyncio
+import csv
 import shutil
 import os
 import json
+import threading
+import time
 
 # ──────── Custom modules ────────
-from extractor.text_extractor import extract_info
-from extractor.file_reader import read_file
-from utils.export_excel import export_to_file
+from extractor.cascade import GPTBudget
+from extractor.processing import process_document, SandboxError
+from extractor import doc_store
+from utils.export_excel import export_to_file, result_row
 from utils.logger import logger
-from utils.config import OUTPUT_FOLDER, TEMPLATES_DIR
+from utils.config import (
+    OUTPUT_FOLDER, TEMPLATES_DIR, ENTITY_RESOLUTION_ENABLED, ENTITY_RESOLUTION_USE_STORED, STREAM_CONCURRENCY,
+)
+from utils.metrics import UPLOAD_BYTES, UPLOAD_FILE_BYTES, UPLOAD_FILES, DB_COMMIT_SECONDS
+from utils.profiling import profile_for_request
+from utils.entity_resolution import resolve_result_set
+from utils.result_set import ResultSet, ResultWriter
+from utils.admission import check_upload_files, client_id
+from utils.usage_rollups import add_extraction_logs
+from utils.entity_stats import EntityStats
 from db.database import ExtractionLog
-from db.session import get_db
+from db.session import get_db, SessionLocal
 
 
 # Set up template rendering
@@ -33,6 +47,15 @@ templates = Jinja2Templates(directory=TEMPLATES_DIR)
 # Create router
 router = APIRouter()
 
+SUPPORTED_TYPES = (
+    "application/pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "text/plain"
+)
+
+# Column names shared by the combined exports
+EXPORT_COLUMNS = ("Filename", "Source Type", "Names", "Emails", "Organizations")
+
 # ──────────────────────────────────────────────────────────────────────────────
 # Route: GET "/" — Displays the upload form - Homepage
 # ──────────────────────────────────────────────────────────────────────────────
@@ -49,59 +72,100 @@ async def handle_upload(
     files: List[UploadFile] = File(...),
     db: Session = Depends(get_db)
 ):
+    check_upload_files(files)
+    profile = profile_for_request(request, "POST /upload/")
+    try:
+        # The batch runs in a worker thread, off the event loop (reading and extraction may wait on
+        # the sandbox); a profiled request is traced in that thread only, not other requests' work
+        response = await asyncio.to_thread(profile.run, process_upload, request, files, db, profile)
+        artifacts = profile.finish(response.status_code)
+    finally:
+        # A failed or cancelled (client disconnected) request must still stop the profiler and free it
+        profile.abort()
+    if artifacts:
+        response.headers["X-Profile-Artifacts"] = ", ".join(f"/download/{name}" for name in artifacts)
+    return response
+
+def process_upload(request: Request, files: List[UploadFile], db: Session, profile):
+    """Saves, reads and extracts every uploaded file, then writes the combined exports (blocking)."""
     try:
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        extracted_rows = []
+        results = ResultSet()  # compact per-document entities; the result dicts are not kept
         unsupported_files = []
+        failed_files = []  # isolated extraction failures (timeout, memory, crash)
+        gpt_budget = GPTBudget()  # caps GPT escalations in cascade mode for this batch
 
-        supported_types = [
-            "application/pdf",
-            "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            "text/plain"
-        ]
         for file in files:
-            if file.content_type not in supported_types:
+            if file.content_type not in SUPPORTED_TYPES:
                 unsupported_files.append(file.filename)
+                UPLOAD_FILES.inc(outcome="unsupported")
                 continue
 
 
             saved_path = OUTPUT_FOLDER / f"uploaded_{timestamp}_{file.filename}"
-            with open(saved_path, "wb") as buffer:
+            with profile.stage("save"), open(saved_path, "wb") as buffer:
                 shutil.copyfileobj(file.file, buffer)
 
 
-            if os.path.getsize(saved_path) == 0:
+            file_size = os.path.getsize(saved_path)
+            file_format = Path(file.filename).suffix.lstrip(".").lower()
+            UPLOAD_BYTES.inc(file_size, format=file_format)
+            UPLOAD_FILE_BYTES.observe(file_size, format=file_format)
+
+            if file_size == 0:
+                UPLOAD_FILES.inc(outcome="empty")
                 continue
 
-            text = read_file(str(saved_path))
-            result = extract_info(text)
+            try:
+                text, result = process_document(str(saved_path), file.filename, db, gpt_budget, profile)
+            except SandboxError as e:
+                logger.warning(f"⚠️ {file.filename} failed in the sandbox ({e.kind}): {e}")
+                failed_files.append({"filename": file.filename, "error": str(e)})
+                UPLOAD_FILES.inc(outcome="failed")
+                continue
 
-            extracted_rows.append({
-                "Filename": file.filename,
-                "Source Type": Path(file.filename).suffix,
-                "Names": ", ".join(result.get("person", [])),
-                "Emails": ", ".join(result.get("email", [])),
-                "Organizations": ", ".join(result.get("organization", []))
+            results.add(file.filename, result)
+            UPLOAD_FILES.inc(outcome="processed")
+            profile.add_document(file.filename, file_size, len(text), {
+                "person": len(result.get("person", [])),
+                "email": len(result.get("email", [])),
+                "organization": len(result.get("organization", [])),
             })
 
-            db.add(ExtractionLog(
-                filename=file.filename,
-                name_count=len(result.get("person", [])),
-                email_count=len(result.get("email", [])),
-                org_count=len(result.get("organization", [])),
-                user_ip=request.client.host
+        # Merge spelling variants of the same person/organization across the batch
+        if ENTITY_RESOLUTION_ENABLED and results:
+            with profile.stage("entity_resolution"):
+                resolve_result_set(results, db=db if ENTITY_RESOLUTION_USE_STORED else None)
+
+        logs = []
+        stats = EntityStats()
+        for document in results:
+            stats.add(document.filename, document)
+
+            logs.append(ExtractionLog(
+                filename=document.filename,
+                name_count=len(document.person),
+                email_count=len(document.email),
+                org_count=len(document.organization),
+                user_ip=client_id(request.scope)  # same identity as the rate limiter (X-Forwarded-For aware)
             ))
+        # The usage rollups are updated in the same transaction as the log rows
+        add_extraction_logs(db, logs)
 
-        db.commit()
+        with profile.stage("db_commit"), DB_COMMIT_SECONDS.time(operation="extraction_log"):
+            db.commit()
 
-        if not extracted_rows:
+        if not results:
             # Show error on the form
+            error_message = "No valid or extractable files uploaded."
+            if failed_files:
+                error_message += " Failed: " + ", ".join(f"{f['filename']} ({f['error']})" for f in failed_files)
             return templates.TemplateResponse("upload_form.html", {
                 "request": request,
-                "error_message": "No valid or extractable files uploaded."
+                "error_message": error_message
             }, status_code=400)
 
-        if unsupported_files and not extracted_rows:
+        if unsupported_files and not results:
             error_message = f"The following file(s) are unsupported: {', '.join(unsupported_files)}"
             return templates.TemplateResponse("error.html", {
                 "request": request,
@@ -111,18 +175,30 @@ async def handle_upload(
 
 
         output_base = OUTPUT_FOLDER / f"entities_combined_{timestamp}"
-        export_to_file(extracted_rows, str(output_base.with_suffix(".xlsx")), format="xlsx")
-        export_to_file(extracted_rows, str(output_base.with_suffix(".csv")), format="csv")
+        with profile.stage("export"):
+            results.write_jsonl(output_base.with_suffix(".results.jsonl"))
+
+            # Spreadsheet-style rows (comma-joined entities) only exist while the exports are written
+            extracted_rows = results.rows()
+            export_to_file(extracted_rows, str(output_base.with_suffix(".xlsx")), format="xlsx")
+            export_to_file(extracted_rows, str(output_base.with_suffix(".csv")), format="csv")
 
-        with open(output_base.with_suffix('.json'), 'w', encoding='utf-8') as f:
+        with profile.stage("export"), open(output_base.with_suffix('.json'), 'w', encoding='utf-8') as f:
             json.dump({
                 "files_processed": len(files),
-                "names_extracted": sum(len(row["Names"].split(", ")) for row in extracted_rows),
-                "emails_extracted": sum(len(row["Emails"].split(", ")) for row in extracted_rows),
-                "orgs_extracted": sum(len(row["Organizations"].split(", ")) for row in extracted_rows),
+                "names_extracted": stats.totals("person")["extracted"],
+                "emails_extracted": stats.totals("email")["extracted"],
+                "orgs_extracted": stats.totals("organization")["extracted"],
+                "failed_files": failed_files,
                 "results": extracted_rows
             }, f)
 
+        with profile.stage("export"):
+            stats.save(output_base.stem, files_processed=len(files))
+
+        # Lets extractor/reprocess.py rebuild these exports from the stored annotations
+        doc_store.save_batch(output_base.stem, results.manifest())
+
         return RedirectResponse(url=f"/results/{output_base.stem}?status=success", status_code=303)
 
     except Exception as e:
@@ -130,4 +206,163 @@ async def handle_upload(
         return templates.TemplateResponse("upload_form.html", {
             "request": request,
             "error_message": str(e)
-        }, status_code=500)
\ No newline at end of file
+        }, status_code=500)
+# ──────────────────────────────────────────────────────────────────────────────
+# Route: POST "/upload/stream" — Streams each file's entities as NDJSON
+#
+# One JSON object per line, in completion order:
+#   {"type": "result", "index": 3, "filename": "...", "person": [...], ...}
+#   {"type": "error",  "index": 5, "filename": "...", "error": "..."}
+#   {"type": "summary", "files": 12, "processed": 11, ..., "results_url": "..."}
+# The CSV and JSON exports are written row by row as results arrive.
+# ──────────────────────────────────────────────────────────────────────────────
+@router.post("/upload/stream")
+async def handle_upload_stream(request: Request, files: List[UploadFile] = File(...)):
+    check_upload_files(files)
+    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    user_ip = client_id(request.scope)
+
+    # Files are saved before streaming starts; the uploads are closed once this handler returns
+    saved, rejected = [], []
+    for index, file in enumerate(files):
+        if file.content_type not in SUPPORTED_TYPES:
+            UPLOAD_FILES.inc(outcome="unsupported")
+            rejected.append({"type": "error", "index": index, "filename": file.filename,
+                             "error": f"Unsupported file type: {file.content_type}"})
+            continue
+        saved_path = OUTPUT_FOLDER / f"uploaded_{timestamp}_{index}_{Path(file.filename).name}"
+        with open(saved_path, "wb") as buffer:
+            shutil.copyfileobj(file.file, buffer)
+        saved.append((index, file.filename, saved_path))
+
+    output_base = OUTPUT_FOLDER / f"entities_stream_{timestamp}_{os.urandom(3).hex()}"
+    return StreamingResponse(
+        _stream_results(saved, rejected, len(files), output_base, user_ip),
+        media_type="application/x-ndjson",
+        headers={"X-Results-Id": output_base.stem},
+    )
+
+def _process_saved_file(filename: str, saved_path: Path, user_ip, budget, cancelled: threading.Event) -> dict:
+    """
+    Reads, extracts and logs one saved upload (runs in a worker thread with its
+    own DB session). Returns None without extracting once the stream is cancelled.
+    """
+    if cancelled.is_set():
+        UPLOAD_FILES.inc(outcome="cancelled")
+        return None
+    file_size = os.path.getsize(saved_path)
+    file_format = Path(filename).suffix.lstrip(".").lower()
+    UPLOAD_BYTES.inc(file_size, format=file_format)
+    UPLOAD_FILE_BYTES.observe(file_size, format=file_format)
+    if file_size == 0:
+        UPLOAD_FILES.inc(outcome="empty")
+        raise ValueError("The file is empty.")
+
+    db = SessionLocal()
+    try:
+        try:
+            text, result = process_document(str(saved_path), filename, db, budget)
+        except SandboxError:
+            UPLOAD_FILES.inc(outcome="failed")
+            raise
+        add_extraction_logs(db, [ExtractionLog(
+            filename=filename,
+            name_count=len(result.get("person", [])),
+            email_count=len(result.get("email", [])),
+            org_count=len(result.get("organization", [])),
+            user_ip=user_ip
+        )])
+        with DB_COMMIT_SECONDS.time(operation="extraction_log"):
+            db.commit()
+    finally:
+        db.close()
+    UPLOAD_FILES.inc(outcome="processed")
+    return result
+
+async def _stream_results(saved, rejected, file_count, output_base: Path, user_ip):
+    start = time.perf_counter()
+    budget = GPTBudget()
+    semaphore = asyncio.Semaphore(STREAM_CONCURRENCY)
+    cancelled = threading.Event()  # seen by worker threads, which task.cancel() cannot stop
+    processed = failed = 0
+    documents = []  # batch manifest for the annotation store
+    stats = EntityStats()
+
+    async def run(index, filename, saved_path):
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(_process_saved_file, filename, saved_path, user_ip, budget, cancelled)
+                return index, filename, result, None
+            except (ValueError, SandboxError) as e:
+                return index, filename, None, str(e)
+            except Exception as e:
+                logger.error(f"Stream upload error for {filename}: {str(e)}", exc_info=True)
+                return index, filename, None, str(e)
+
+    tasks = [asyncio.create_task(run(*item)) for item in saved]
+    csv_file = open(output_base.with_suffix(".csv"), "w", newline="", encoding="utf-8")
+    json_file = open(output_base.with_suffix(".json"), "w", encoding="utf-8")
+    results_file = ResultWriter(output_base.with_suffix(".results.jsonl"))
+    try:
+        writer = csv.DictWriter(csv_file, fieldnames=EXPORT_COLUMNS)
+        writer.writeheader()
+        # The JSON export has the same layout as the regular upload's, written incrementally
+        json_file.write('{"results": [')
+
+        for record in rejected:
+            yield json.dumps(record) + "\n"
+
+        for next_done in asyncio.as_completed(tasks):
+            index, filename, result, error = await next_done
+            if error is not None:
+                failed += 1
+                yield json.dumps({"type": "error", "index": index, "filename": filename, "error": error}) + "\n"
+                continue
+
+            row = result_row(filename, result)
+            documents.append({"filename": filename, "source": result.get("source"),
+                              "annotations": result.get("annotations")})
+            writer.writerow(row)
+            results_file.write(filename, result)
+            stats.add(filename, result)
+            json_file.write((", " if processed else "") + json.dumps(row))
+            processed += 1
+
+            yield json.dumps({
+                "type": "result",
+                "index": index,
+                "filename": filename,
+                "person": result.get("person", []),
+                "organization": result.get("organization", []),
+                "email": result.get("email", []),
+                "source": result.get("source"),
+            }) + "\n"
+
+        doc_store.save_batch(output_base.stem, documents)
+        stats.save(output_base.stem, files_processed=processed)
+        totals = {field: stats.totals(field)["extracted"] for field in ("person", "email", "organization")}
+        json_file.write(f'], "files_processed": {processed}, "names_extracted": {totals["person"]}, '
+                        f'"emails_extracted": {totals["email"]}, "orgs_extracted": {totals["organization"]}}}')
+        yield json.dumps({
+            "type": "summary",
+            "files": file_count,
+            "processed": processed,
+            "failed": failed,
+            "unsupported": len(rejected),
+            "names_extracted": totals["person"],
+            "emails_extracted": totals["email"],
+            "orgs_extracted": totals["organization"],
+            "elapsed_seconds": round(time.perf_counter() - start, 3),
+            "results_url": f"/results/{output_base.stem}",
+            "downloads": [f"/download/{output_base.stem}.csv", f"/download/{output_base.stem}.json",
+                          f"/download/{output_base.stem}.entities.csv", f"/bundle/{output_base.stem}"],
+        }) + "\n"
+    finally:
+        # Client went away (or an error): files not yet started are skipped. Extractions
+        # already running in a thread cannot be interrupted; they finish and are logged.
+        cancelled.set()
+        for task in tasks:
+            task.cancel()
+        csv_file.close()
+        json_file.close()
+        results_file.close()
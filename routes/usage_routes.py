@@ -0,0 +1,32 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Usage dashboard data as JSON, read only from the hourly/daily
+#          rollup tables (never from the raw extraction log).
+#
+# Usage:
+#   GET /api/usage?days=90                      documents and entities per day
+#   GET /api/usage?granularity=hour&days=2      per hour
+#   GET /api/usage?days=90&ip=203.0.113.7       one client IP
+# ──────────────────────────────────────────────────────────────────────────────
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+
+# ──────── Custom modules ────────
+from db.session import get_db
+from utils.usage_rollups import usage_summary
+
+# Create router
+router = APIRouter()
+
+
+@router.get("/api/usage")
+def usage(
+    granularity: str = Query("day", pattern="^(hour|day)$"),
+    days: int = Query(30, ge=1, le=366),
+    ip: str = Query(None, description="Only this client IP"),
+    db: Session = Depends(get_db)
+):
+    until = datetime.now()
+    return usage_summary(db, granularity, since=until - timedelta(days=days), until=until, user_ip=ip)
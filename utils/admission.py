@@ -0,0 +1,266 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Admission control for the extraction endpoints. Bounds how much work
+#          a worker process accepts so one client (or a burst) cannot starve
+#          everyone else:
+#            - max bytes per request (Content-Length, and counted while reading)
+#            - per-client token bucket rate limit
+#            - a global in-flight limit per endpoint pool with a bounded wait
+#              queue; queued requests are not read until a slot frees up
+#          Rejections are 413 / 429 JSON responses with a Retry-After header.
+#          Per-file size and file count limits are checked by the routes
+#          (check_upload_files) once the form is parsed.
+#
+# Limits apply per worker process (the pre-fork server runs several).
+# ──────────────────────────────────────────────────────────────────────────────
+
+import asyncio
+import json
+import math
+import threading
+import time
+
+from fastapi import HTTPException
+
+# ──────── Custom modules ────────
+from utils.config import (
+    ADMISSION_MAX_UPLOADS, ADMISSION_MAX_API_REQUESTS, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST, MAX_REQUEST_BYTES, MAX_FILE_BYTES, MAX_FILES_PER_REQUEST,
+    TRUST_FORWARDED_FOR, FORWARDED_FOR_HOPS,
+)
+from utils.metrics import ADMISSION_REJECTIONS, ADMISSION_QUEUE_SECONDS
+from utils.logger import logger
+
+# Buckets kept per client before idle (full) ones are dropped
+MAX_TRACKED_CLIENTS = 10_000
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, status_code: int, reason: str, message: str, retry_after: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.reason = reason
+        self.message = message
+        self.retry_after = retry_after
+
+
+class TokenBucketLimiter:
+    """Per-client token buckets: `rate_per_minute` sustained, up to `burst` at once."""
+
+    def __init__(self, rate_per_minute: float, burst: int):
+        self.rate = rate_per_minute / 60.0
+        self.burst = max(1, burst)
+        self._buckets = {}  # client → [tokens, last refill time]
+        self._lock = threading.Lock()
+
+    def try_take(self, client: str) -> float:
+        """Takes a token; returns 0 when allowed, else the seconds until one is available."""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(client)
+            if bucket is None:
+                if len(self._buckets) >= MAX_TRACKED_CLIENTS:
+                    self._prune(now)
+                bucket = self._buckets[client] = [float(self.burst), now]
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0.0
+            bucket[0] = tokens
+            return (1 - tokens) / self.rate
+
+    def _prune(self, now):
+        full = [client for client, (tokens, last) in self._buckets.items()
+                if tokens + (now - last) * self.rate >= self.burst]
+        for client in full:
+            del self._buckets[client]
+
+
+class ConcurrencyPool:
+    """At most `max_in_flight` holders; up to `max_queue` more wait (FIFO) for `queue_timeout` seconds."""
+
+    def __init__(self, name: str, max_in_flight: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._average_hold = 1.0  # moving average of seconds a slot is held, for Retry-After
+        self._semaphore = None
+        self._loop = None
+
+    def _get_semaphore(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_in_flight)
+            self._loop = loop
+            self.in_flight = self.waiting = 0
+        return self._semaphore
+
+    def retry_after(self) -> int:
+        backlog = self.waiting + 1
+        return max(1, math.ceil(self._average_hold * backlog / self.max_in_flight))
+
+    async def acquire(self):
+        semaphore = self._get_semaphore()
+        if semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise AdmissionRejected(429, "queue_full", f"The server is busy ({self.name}); try again later.",
+                                        self.retry_after())
+            self.waiting += 1
+            start = time.monotonic()
+            try:
+                await asyncio.wait_for(semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise AdmissionRejected(429, "queue_timeout", f"Timed out waiting for capacity ({self.name}).",
+                                        self.retry_after()) from None
+            finally:
+                self.waiting -= 1
+                ADMISSION_QUEUE_SECONDS.observe(time.monotonic() - start, pool=self.name)
+        else:
+            await semaphore.acquire()
+        self.in_flight += 1
+        return time.monotonic()
+
+    def release(self, acquired_at: float):
+        self.in_flight -= 1
+        self._average_hold = 0.8 * self._average_hold + 0.2 * (time.monotonic() - acquired_at)
+        self._semaphore.release()
+
+
+# Guarded path → pool; API requests are micro-batched, so they get a wider pool
+POOLS = {
+    "/upload/": ConcurrencyPool("upload", ADMISSION_MAX_UPLOADS, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT_SECONDS),
+    "/upload/stream": None,
+    "/api/extract": ConcurrencyPool("api", ADMISSION_MAX_API_REQUESTS, ADMISSION_MAX_QUEUE * 4,
+                                    ADMISSION_QUEUE_TIMEOUT_SECONDS),
+}
+POOLS["/upload/stream"] = POOLS["/upload/"]
+
+RATE_LIMITER = TokenBucketLimiter(RATE_LIMIT_PER_MINUTE, RATE_LIMIT_BURST)
+
+
+def client_id(scope) -> str:
+    """
+    The client's address. Behind trusted proxies, the X-Forwarded-For entry
+    added by the outermost one (FORWARDED_FOR_HOPS from the right): entries
+    further left come from the client and can be forged.
+    """
+    if TRUST_FORWARDED_FOR:
+        forwarded = [entry.strip()
+                     for name, value in scope.get("headers", []) if name == b"x-forwarded-for"
+                     for entry in value.decode("latin-1").split(",") if entry.strip()]
+        if forwarded:
+            return forwarded[max(len(forwarded) - FORWARDED_FOR_HOPS, 0)]
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+class _BodyTooLarge(HTTPException):
+    """
+    Raised while reading an oversized body. An HTTPException, because FastAPI
+    re-raises those from its body parsing instead of answering 400.
+    """
+
+    def __init__(self):
+        super().__init__(413, "Request body too large.")
+
+
+async def _send_rejection(send, rejection: AdmissionRejected):
+    ADMISSION_REJECTIONS.inc(reason=rejection.reason)
+    headers = [(b"content-type", b"application/json")]
+    if rejection.retry_after is not None:
+        headers.append((b"retry-after", str(rejection.retry_after).encode()))
+    body = json.dumps({"error": rejection.message}).encode()
+    headers.append((b"content-length", str(len(body)).encode()))
+    await send({"type": "http.response.start", "status": rejection.status_code, "headers": headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    """ASGI middleware applying the request size, rate and concurrency limits to POSTs on guarded paths."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        pool = POOLS.get(scope.get("path")) if scope["type"] == "http" and scope["method"] == "POST" else None
+        if pool is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            self._check_content_length(scope)
+            wait = RATE_LIMITER.try_take(client_id(scope))
+            if wait:
+                raise AdmissionRejected(429, "rate_limited", "Too many requests; slow down.", math.ceil(wait))
+            acquired_at = await pool.acquire()
+        except AdmissionRejected as rejection:
+            logger.warning(f"🚦 Rejected {scope['path']} from {client_id(scope)}: {rejection.reason}")
+            await _send_rejection(send, rejection)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if MAX_REQUEST_BYTES and received > MAX_REQUEST_BYTES:
+                    # Bodies without Content-Length (chunked) are only caught here; answer
+                    # now, since the app may turn the exception into its own error response
+                    if not response_started and not rejected:
+                        rejected = True
+                        await _send_rejection(send, _too_large_rejection())
+                    raise _BodyTooLarge()
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except _BodyTooLarge:
+            pass
+        finally:
+            pool.release(acquired_at)
+
+    @staticmethod
+    def _check_content_length(scope):
+        for name, value in scope.get("headers", []):
+            if name == b"content-length":
+                try:
+                    length = int(value)
+                except ValueError:
+                    return
+                if MAX_REQUEST_BYTES and length > MAX_REQUEST_BYTES:
+                    raise _too_large_rejection()
+                return
+
+
+def _too_large_rejection():
+    return AdmissionRejected(413, "request_too_large",
+                             f"Request body exceeds the {MAX_REQUEST_BYTES // (1024 * 1024)} MiB limit.")
+
+
+def check_upload_files(files):
+    """Enforces the per-request file count and per-file size limits (HTTP 413)."""
+    if MAX_FILES_PER_REQUEST and len(files) > MAX_FILES_PER_REQUEST:
+        ADMISSION_REJECTIONS.inc(reason="too_many_files")
+        raise HTTPException(413, f"At most {MAX_FILES_PER_REQUEST} files per request.")
+    for file in files:
+        if MAX_FILE_BYTES and (file.size or 0) > MAX_FILE_BYTES:
+            ADMISSION_REJECTIONS.inc(reason="file_too_large")
+            raise HTTPException(413, f"{file.filename} exceeds the {MAX_FILE_BYTES // (1024 * 1024)} MiB per-file limit.")
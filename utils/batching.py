@@ -0,0 +1,136 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Dynamic micro-batching for concurrent single-document requests.
+#          Callers submit one item and await their own result; items that
+#          arrive within a short window (or until the batch is full) are
+#          processed together by one blocking batch function in a worker
+#          thread. A batch waits at most `max_wait_seconds` after its oldest
+#          item arrived, so single-request latency stays bounded. When a
+#          batch fails, its items are retried one at a time so only the
+#          offending request gets the error.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from collections import deque
+import asyncio
+import time
+
+# ──────── Custom modules ────────
+from utils.logger import logger
+from utils.metrics import API_BATCH_SIZE, API_BATCH_SECONDS, API_BATCH_QUEUE_SECONDS
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submit() calls into batches for `process_batch`.
+
+    Args:
+        process_batch (callable): Blocking function taking a list of items and returning a list of results (same order).
+        max_batch_size (int): Items per batch at most.
+        max_wait_seconds (float): How long the oldest item may wait for others to join its batch.
+    """
+
+    def __init__(self, process_batch, max_batch_size=32, max_wait_seconds=0.01):
+        self.process_batch = process_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_seconds = max(0.0, max_wait_seconds)
+        self._pending = deque()  # (item, future, enqueued at)
+        self._task = None
+        self._has_items = None
+        self._full = None
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def submit(self, item):
+        """Queues one item and returns its result once its batch has been processed."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.monotonic()))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def stop(self):
+        """Cancels the batching task and fails anything still queued."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        while self._pending:
+            _, future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(RuntimeError("Batcher stopped before the request was processed."))
+
+    def _next_batch(self):
+        batch = []
+        while self._pending and len(batch) < self.max_batch_size:
+            item, future, enqueued_at = self._pending.popleft()
+            if not future.cancelled():  # the caller went away
+                batch.append((item, future, enqueued_at))
+        if not self._pending:
+            self._has_items.clear()
+        if len(self._pending) < self.max_batch_size:
+            self._full.clear()
+        return batch
+
+    async def _run(self):
+        while True:
+            await self._has_items.wait()
+
+            # Give others until the oldest item's deadline to join, unless the batch is already full
+            if len(self._pending) < self.max_batch_size:
+                remaining = self._pending[0][2] + self.max_wait_seconds - time.monotonic()
+                if remaining > 0:
+                    try:
+                        await asyncio.wait_for(self._full.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+
+            batch = self._next_batch()
+            if not batch:
+                continue
+
+            started = time.monotonic()
+            for _, _, enqueued_at in batch:
+                API_BATCH_QUEUE_SECONDS.observe(started - enqueued_at)
+            API_BATCH_SIZE.observe(len(batch))
+
+            items = [item for item, _, _ in batch]
+            try:
+                with API_BATCH_SECONDS.time():
+                    results = await asyncio.to_thread(self.process_batch, items)
+            except Exception as e:
+                if len(batch) == 1:
+                    logger.error(f"❌ Micro-batch item failed: {e}", exc_info=True)
+                    if not batch[0][1].done():
+                        batch[0][1].set_exception(e)
+                    continue
+                # One bad item must not fail everyone else's request: retry them one at a time
+                logger.warning(f"⚠️ Micro-batch of {len(batch)} failed ({e}); retrying items individually.")
+                await self._run_individually(batch)
+                continue
+
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+    async def _run_individually(self, batch):
+        for item, future, _ in batch:
+            if future.done():
+                continue
+            try:
+                result = (await asyncio.to_thread(self.process_batch, [item]))[0]
+            except Exception as e:
+                logger.error(f"❌ Micro-batch item failed: {e}", exc_info=True)
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
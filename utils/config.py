@@ -29,10 +29,104 @@ DATABASE_PATH = PROJECT_ROOT / "db" / "extraction_logs.db"
 DATABASE_URL = f"sqlite:///{DATABASE_PATH}"
 
 
+# spaCy pipeline used for local extraction
+SPACY_MODEL_NAME = os.getenv("SPACY_MODEL", "en_core_web_sm")
+
+# 🌍 Language routing: identify each document's language and run that language's spaCy pipeline
+LANGUAGE_ROUTING_ENABLED = os.getenv("LANGUAGE_ROUTING", "False").lower() == "true"
+DEFAULT_LANGUAGE = os.getenv("DEFAULT_LANGUAGE", "en")  # served by SPACY_MODEL; also the fallback
+# Pipelines for the other languages, as "<language>=<model>" pairs
+LANGUAGE_MODELS = dict(
+    pair.strip().split("=", 1)
+    for pair in os.getenv("LANGUAGE_MODELS", "es=es_core_news_sm,fr=fr_core_news_sm,de=de_core_news_sm").split(",")
+    if "=" in pair
+)
+LANGUAGE_ID_SAMPLE_CHARS = int(os.getenv("LANGUAGE_ID_SAMPLE_CHARS", "2000"))  # text prefix used to identify the language
+LANGUAGE_ID_MIN_HITS = int(os.getenv("LANGUAGE_ID_MIN_HITS", "3"))  # function words needed before leaving the default
+MODEL_CACHE_MAX_MODELS = int(os.getenv("MODEL_CACHE_MAX_MODELS", "2"))  # extra-language pipelines loaded per process
+MODEL_CACHE_MAX_MB = int(os.getenv("MODEL_CACHE_MAX_MB", "0"))  # memory cap for those pipelines (0 = count cap only)
+
+# 🔗 Cross-document entity resolution (merges "J. Smith" / "John Smith" / "JOHN SMITH" in a batch)
+ENTITY_RESOLUTION_ENABLED = os.getenv("ENTITY_RESOLUTION", "True").lower() == "true"
+# Also match against (and remember) canonical entities from previous batches
+ENTITY_RESOLUTION_USE_STORED = os.getenv("ENTITY_RESOLUTION_USE_STORED", "False").lower() == "true"
+
+# 📚 Gazetteer name lists (org_*.txt / person_*.txt) and their compiled cache
+GAZETTEER_DIR = PROJECT_ROOT / os.getenv("GAZETTEER_DIR", "gazetteers")
+GAZETTEER_CACHE_DIR = PROJECT_ROOT / "cache"
+GAZETTEER_CHECK_SECONDS = float(os.getenv("GAZETTEER_CHECK_SECONDS", "30"))  # how often list files are re-checked
+
+# ♊ Near-duplicate reuse: documents within NEAR_DUP_MAX_DISTANCE SimHash bits (of 64, max 3)
+#    of a stored one only re-extract their changed chunks
+NEAR_DUP_ENABLED = os.getenv("NEAR_DUP", "False").lower() == "true"
+NEAR_DUP_MAX_DISTANCE = min(int(os.getenv("NEAR_DUP_MAX_DISTANCE", "3")), 3)
+NEAR_DUP_MIN_CHARS = int(os.getenv("NEAR_DUP_MIN_CHARS", "500"))  # shorter texts are always extracted
+NEAR_DUP_RETENTION_SECONDS = int(os.getenv("NEAR_DUP_RETENTION_HOURS", "24")) * 3600  # stored entities are PII
+
+# 📦 JSON API micro-batching: requests arriving within the window share one nlp.pipe() call
+API_BATCH_MAX_SIZE = int(os.getenv("API_BATCH_MAX_SIZE", "32"))
+API_BATCH_MAX_WAIT_MS = float(os.getenv("API_BATCH_MAX_WAIT_MS", "10"))
+
+# 🌊 Streaming uploads: files extracted concurrently per "/upload/stream" request
+STREAM_CONCURRENCY = int(os.getenv("STREAM_CONCURRENCY", "4"))
+
+# 🚦 Admission control (per worker process)
+ADMISSION_MAX_UPLOADS = int(os.getenv("ADMISSION_MAX_UPLOADS", "4"))  # concurrent /upload/ + /upload/stream requests
+ADMISSION_MAX_API_REQUESTS = int(os.getenv("ADMISSION_MAX_API_REQUESTS", "64"))  # concurrent /api/extract requests
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "8"))  # uploads waiting for a slot (API: 4×)
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", "30"))
+RATE_LIMIT_PER_MINUTE = float(os.getenv("RATE_LIMIT_PER_MINUTE", "60"))  # per client IP; 0 disables
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "20"))
+MAX_REQUEST_BYTES = int(os.getenv("MAX_REQUEST_MB", "100")) * 1024 * 1024
+MAX_FILE_BYTES = int(os.getenv("MAX_FILE_MB", "25")) * 1024 * 1024
+MAX_FILES_PER_REQUEST = int(os.getenv("MAX_FILES_PER_REQUEST", "200"))
+# Take the client IP from X-Forwarded-For (only behind a trusted proxy, e.g. Render)
+TRUST_FORWARDED_FOR = os.getenv("TRUST_FORWARDED_FOR", "False").lower() == "true"
+FORWARDED_FOR_HOPS = max(int(os.getenv("FORWARDED_FOR_HOPS", "1")), 1)  # trusted proxies appending to X-Forwarded-For
+
+# 🧪 Isolated extraction: read + extract each document in a sandboxed worker process
+SANDBOX_ENABLED = os.getenv("ISOLATED_EXTRACTION", "False").lower() == "true"
+SANDBOX_WORKERS = int(os.getenv("SANDBOX_WORKERS", "2"))  # per web worker process
+SANDBOX_TIMEOUT_SECONDS = float(os.getenv("SANDBOX_TIMEOUT_SECONDS", "60"))  # wall-clock deadline per document
+SANDBOX_MEMORY_MB = int(os.getenv("SANDBOX_MEMORY_MB", "1024"))  # on top of the worker's loaded baseline
+SANDBOX_MAX_JOBS = int(os.getenv("SANDBOX_MAX_JOBS", "200"))  # recycle a worker after this many jobs
+SANDBOX_START_METHOD = os.getenv("SANDBOX_START_METHOD", "forkserver")
+
+# 📊 Entity frequency tables per batch: how many top entities per label the results page shows
+STATS_TOP_K = int(os.getenv("STATS_TOP_K", "25"))
+
+# 🗃️ Annotation store: keep spaCy output per document (DocBin) to skip repeat NER and re-run post-processing
+DOC_STORE_ENABLED = os.getenv("DOC_STORE", "False").lower() == "true"
+DOC_STORE_DIR = PROJECT_ROOT / os.getenv("DOC_STORE_DIR", "doc_store")
+DOC_STORE_RETENTION_SECONDS = int(os.getenv("DOC_STORE_RETENTION_HOURS", "24")) * 3600  # stored docs hold full texts
+
 # 🧹 Cleanup configuration
 CLEANUP_INTERVAL_SECONDS = 600  # every 10 min
 FILE_EXPIRATION_SECONDS = 3600  # 1 hour
 
+# 🔬 Opt-in request profiling (requests must also send "X-Profile: 1" or "?profile=1")
+REQUEST_PROFILING_ENABLED = os.getenv("REQUEST_PROFILING", "False").lower() == "true"
+
+# 🧠 GPT configuration
+GPT_MAX_RETRIES = int(os.getenv("GPT_MAX_RETRIES", "2"))  # retries after the first attempt
+
+# 🪜 Cascade mode: spaCy first, GPT only for documents that trip a trigger
+CASCADE_GPT_BUDGET = int(os.getenv("CASCADE_GPT_BUDGET", "3"))  # GPT calls per upload batch
+CASCADE_MIN_TEXT_CHARS = int(os.getenv("CASCADE_MIN_TEXT_CHARS", "200"))  # shorter texts skip the yield check
+CASCADE_MIN_ENTITIES_PER_1K_CHARS = float(os.getenv("CASCADE_MIN_ENTITIES_PER_1K_CHARS", "0.5"))
+CASCADE_MIN_EMAIL_RATIO = float(os.getenv("CASCADE_MIN_EMAIL_RATIO", "0.8"))  # emails found per "@" in the text
+CASCADE_MAX_UNCERTAINTY = float(os.getenv("CASCADE_MAX_UNCERTAINTY", "0.5"))  # share of proper nouns outside entities
+
+EXTRACTION_MODES = ("spacy", "gpt", "cascade")
+
 
 def use_gpt_extraction():
     return os.getenv("USE_GPT_EXTRACTION", "False").lower() == "true"
+
+
+def extraction_mode():
+    """EXTRACTION_MODE (spacy / gpt / cascade); falls back to USE_GPT_EXTRACTION when unset."""
+    mode = os.getenv("EXTRACTION_MODE", "").strip().lower()
+    if mode in EXTRACTION_MODES:
+        return mode
+    return "gpt" if use_gpt_extraction() else "spacy"
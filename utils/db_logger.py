@@ -8,6 +8,8 @@ from db.database import ExtractionLog
 from datetime import datetime
 from sqlalchemy.orm import Session
 from utils.logger import logger  # The existing logger
+from utils.metrics import DB_COMMIT_SECONDS
+from utils.usage_rollups import add_extraction_logs
 
 def db_log_extraction(
     db: Session,
@@ -37,8 +39,9 @@ def db_log_extraction(
             upload_time=datetime.now(),
             user_ip=user_ip
         )
-        db.add(log_entry)
-        db.commit()
+        add_extraction_logs(db, [log_entry])
+        with DB_COMMIT_SECONDS.time(operation="extraction_log"):
+            db.commit()
         logger.info(f"✅ Logged extraction to DB for file: {filename}")
     except Exception as e:
         db.rollback()
@@ -0,0 +1,391 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Cross-document entity resolution. Groups PERSON/ORG mentions from
+#          every document in a batch (and optionally previously stored
+#          entities) so "J. Smith", "John Smith" and "JOHN SMITH" come out as
+#          one canonical name. Candidate pairs come from a blocking index
+#          (character n-gram MinHash LSH plus a surname/initial key for people),
+#          so the work grows near-linearly with the number of distinct mentions
+#          instead of comparing all pairs.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from collections import defaultdict
+from datetime import datetime
+import re
+import zlib
+
+# ──────── Custom modules ────────
+from utils.logger import logger
+
+PERSON = "PERSON"
+ORG = "ORG"
+
+# Result dict key (as returned by extract_info) → resolver label
+RESULT_LABELS = {"person": PERSON, "organization": ORG}
+
+# Tokens that don't distinguish one organization from another
+ORG_STOPWORDS = {
+    "the", "inc", "incorporated", "llc", "ltd", "limited", "corp", "corporation",
+    "co", "company", "plc", "gmbh", "ag", "sa", "lp", "llp",
+}
+
+# Honorifics dropped from person names before comparison
+PERSON_TITLES = {"mr", "mrs", "ms", "miss", "dr", "prof", "sir", "jr", "sr"}
+
+_PUNCT_RE = re.compile(r"[^\w\s&]")
+_SPACE_RE = re.compile(r"\s+")
+
+# MinHash / LSH parameters: 8 bands × 4 rows catches pairs with trigram Jaccard ≳ 0.6
+NUM_BANDS = 8
+ROWS_PER_BAND = 4
+NGRAM_SIZE = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+
+
+def _tokens(text: str) -> list:
+    return _SPACE_RE.sub(" ", _PUNCT_RE.sub(" ", text.casefold())).split()
+
+
+def match_key(text: str, label: str) -> str:
+    """Normalized comparison key: case-folded, punctuation-free, without titles/legal suffixes."""
+    tokens = _tokens(text)
+    stopwords = PERSON_TITLES if label == PERSON else ORG_STOPWORDS
+    kept = [token for token in tokens if token not in stopwords]
+    return " ".join(kept or tokens)
+
+
+def _shingles(key: str) -> set:
+    padded = f" {key} "
+    if len(padded) <= NGRAM_SIZE:
+        return {padded}
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(padded) - NGRAM_SIZE + 1)}
+
+
+def _jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class _MinHasher:
+    """Computes MinHash signatures over shingle sets with NUM_BANDS × ROWS_PER_BAND permutations."""
+
+    def __init__(self, seed: int = 1):
+        import numpy as np
+
+        self.np = np
+        rng = np.random.default_rng(seed)
+        size = NUM_BANDS * ROWS_PER_BAND
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=size, dtype=np.uint64)[:, None]
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=size, dtype=np.uint64)[:, None]
+        # Folds each band's rows into one 64-bit value
+        self.fold = rng.integers(1, 1 << 62, size=ROWS_PER_BAND, dtype=np.uint64)
+
+    def band_keys(self, shingle_sets: list) -> list:
+        """Returns the LSH band keys of every shingle set, hashing them all in one vectorized pass."""
+        np = self.np
+        lengths = [len(shingles) for shingles in shingle_sets]
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & _MERSENNE_PRIME for shingles in shingle_sets for s in shingles),
+            dtype=np.uint64, count=sum(lengths)
+        )
+        offsets = np.zeros(len(lengths), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+
+        permuted = (self.a * hashes[None, :] + self.b) % _MERSENNE_PRIME
+        signatures = np.minimum.reduceat(permuted, offsets, axis=1).T.reshape(-1, NUM_BANDS, ROWS_PER_BAND)
+        bands = (signatures * self.fold).sum(axis=2).tolist()
+        return [[f"b{band}:{value:x}" for band, value in enumerate(row)] for row in bands]
+
+
+class _Mention:
+    """One distinct match key and the surface forms seen for it."""
+
+    __slots__ = ("key", "label", "tokens", "shingles", "forms", "count", "known_canonical")
+
+    def __init__(self, key, label):
+        self.key = key
+        self.label = label
+        self.tokens = key.split()
+        self.shingles = _shingles(key)
+        self.forms = defaultdict(int)
+        self.count = 0
+        self.known_canonical = None
+
+    @property
+    def is_initial_only(self):
+        """True for forms like "j smith" whose given name is just an initial."""
+        return self.label == PERSON and len(self.tokens) >= 2 and len(self.tokens[0]) == 1
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, item):
+        parent = self.parent.setdefault(item, item)
+        if parent != item:
+            parent = self.parent[item] = self.find(parent)
+        return parent
+
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            self.parent[root_b] = root_a
+
+
+class EntityResolver:
+    """
+    Resolves mentions of a single label to canonical names.
+
+    Args:
+        label (str): PERSON or ORG.
+        threshold (float): Minimum trigram Jaccard similarity for two keys to merge.
+    """
+
+    def __init__(self, label: str, threshold: float = 0.7):
+        self.label = label
+        self.threshold = threshold
+        self.mentions = {}
+        self._hasher = None
+
+    def add(self, text: str, known_canonical: str = None):
+        if not text or not text.strip():
+            return
+        key = match_key(text, self.label)
+        if not key:
+            return
+        mention = self.mentions.get(key)
+        if mention is None:
+            mention = self.mentions[key] = _Mention(key, self.label)
+        if known_canonical:
+            mention.known_canonical = known_canonical
+        else:
+            mention.forms[text.strip()] += 1
+            mention.count += 1
+
+    def block_keys(self, mentions: list) -> list:
+        """Blocking keys per mention: LSH band hashes plus a surname/initial key for people."""
+        if not mentions:
+            return []
+        if self._hasher is None:
+            self._hasher = _MinHasher()
+        all_keys = self._hasher.band_keys([mention.shingles for mention in mentions])
+        if self.label == PERSON:
+            for mention, keys in zip(mentions, all_keys):
+                if len(mention.tokens) >= 2:
+                    keys.append(f"n:{mention.tokens[-1]}|{mention.tokens[0][0]}")
+        return all_keys
+
+    def _compatible_names(self, a, b) -> bool:
+        """Same surname and one given name equal to, or the initial of, the other."""
+        if len(a.tokens) < 2 or len(b.tokens) < 2 or a.tokens[-1] != b.tokens[-1]:
+            return False
+        first_a, first_b = a.tokens[0], b.tokens[0]
+        return first_a == first_b or (
+            (len(first_a) == 1 and first_b.startswith(first_a)) or
+            (len(first_b) == 1 and first_a.startswith(first_b))
+        )
+
+    def resolve(self) -> dict:
+        """
+        Clusters the added mentions.
+
+        Returns:
+            dict: Surface form → canonical name for every added (non-known) form.
+        """
+        mentions = list(self.mentions.values())
+        buckets = defaultdict(list)
+        for mention, blocks in zip(mentions, self.block_keys(mentions)):
+            for block in blocks:
+                buckets[block].append(mention)
+
+        clusters = _UnionFind()
+        initial_first_names = defaultdict(set)  # initial-only key → compatible given names
+        initial_targets = defaultdict(set)  # initial-only key → compatible full-name keys
+        seen_pairs = set()
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            for i, a in enumerate(members):
+                for b in members[i + 1:]:
+                    pair = (a.key, b.key) if a.key < b.key else (b.key, a.key)
+                    if pair in seen_pairs:
+                        continue
+                    seen_pairs.add(pair)
+
+                    if self.label == PERSON and self._compatible_names(a, b):
+                        if a.is_initial_only != b.is_initial_only:
+                            short, full = (a, b) if a.is_initial_only else (b, a)
+                            initial_first_names[short.key].add(full.tokens[0])
+                            initial_targets[short.key].add(full.key)
+                            continue
+                        clusters.union(a.key, b.key)
+                    elif _jaccard(a.shingles, b.shingles) >= self.threshold:
+                        clusters.union(a.key, b.key)
+
+        # "J. Smith" only joins a cluster when every candidate shares one given name
+        for key, first_names in initial_first_names.items():
+            if len(first_names) == 1:
+                for target in initial_targets[key]:
+                    clusters.union(target, key)
+
+        groups = defaultdict(list)
+        for mention in mentions:
+            groups[clusters.find(mention.key)].append(mention)
+
+        mapping = {}
+        for members in groups.values():
+            canonical = self._canonical(members)
+            for mention in members:
+                for form in mention.forms:
+                    mapping[form] = canonical
+        return mapping
+
+    def _inflected(self, mention, keys) -> bool:
+        """
+        True when the mention is a possessive ("Bank of America's") or, for
+        organizations, a plural ("Banks of America") of another key in its cluster.
+        """
+        tokens = mention.tokens
+        for i, token in enumerate(tokens):
+            if token == "s":
+                base = tokens[:i] + tokens[i + 1:]
+            elif self.label == ORG and len(token) > 1 and token.endswith("s"):
+                base = tokens[:i] + [token[:-1]] + tokens[i + 1:]
+            else:
+                continue
+            if " ".join(base) in keys:
+                return True
+        return False
+
+    def _canonical(self, members) -> str:
+        """
+        Prefers a stored canonical, then full names without titles/legal suffixes
+        or plural/possessive endings, mixed case over ALL CAPS over lowercase,
+        then the most frequent form.
+        """
+        for mention in members:
+            if mention.known_canonical:
+                return mention.known_canonical
+
+        keys = {mention.key for mention in members}
+        inflected = {mention.key for mention in members if self._inflected(mention, keys)}
+
+        def score(item):
+            mention, form, count = item
+            bare = len(_tokens(form)) == len(mention.tokens)
+            casing = 0 if form.islower() else 1 if form.isupper() else 2
+            return (not mention.is_initial_only, bare, mention.key not in inflected, casing,
+                    mention.count, count, len(form))
+
+        candidates = [(m, form, count) for m in members for form, count in m.forms.items()]
+        return max(candidates, key=score)[1]
+
+
+def _resolve_label(label: str, texts, db=None) -> dict:
+    """
+    Clusters every mention of one label (an iterable of surface forms) and
+    returns {form: canonical}; empty when there is nothing to resolve.
+    """
+    resolver = EntityResolver(label)
+    for text in texts:
+        resolver.add(text)
+    if not resolver.mentions:
+        return {}
+
+    if db is not None:
+        _seed_known_entities(db, resolver)
+    mapping = resolver.resolve()
+    if db is not None:
+        _store_entities(db, resolver, mapping)
+    return mapping
+
+
+def resolve_result_set(results, db=None):
+    """
+    Canonicalizes PERSON/ORG mentions across all documents of a batch.
+
+    Args:
+        results (ResultSet): The batch's results (utils.result_set), remapped in
+            place: variants become their canonical name, duplicates within a
+            document are dropped and their mention counts added up.
+        db (Session): Optional session; when given, previously stored entities
+            seed the clusters and newly resolved entities are stored.
+
+    Returns:
+        ResultSet: The same results.
+    """
+    for field, label in RESULT_LABELS.items():
+        mapping = _resolve_label(label, results.values(field), db)
+        if not mapping:
+            continue
+        before = sum(1 for _ in results.values(field))
+        results.remap(field, mapping)
+        _log_resolution(label, mapping, before, sum(1 for _ in results.values(field)), len(results))
+    return results
+
+
+def _log_resolution(label, mapping, before, after, documents):
+    distinct = len(set(mapping.values()))
+    logger.info(f"🔗 Resolved {len(mapping)} {label} form(s) into {distinct} entit(ies); "
+                f"{before} → {after} mention(s) across {documents} document(s).")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Stored entities (optional): canonical names and their blocking keys
+# ──────────────────────────────────────────────────────────────────────────────
+def _seed_known_entities(db, resolver):
+    from db.database import KnownEntity, KnownEntityBlock
+
+    blocks = set()
+    for keys in resolver.block_keys(list(resolver.mentions.values())):
+        blocks.update(keys)
+
+    entity_ids = set()
+    blocks = list(blocks)
+    for start in range(0, len(blocks), 500):
+        rows = db.query(KnownEntityBlock.entity_id).filter(
+            KnownEntityBlock.label == resolver.label,
+            KnownEntityBlock.block_key.in_(blocks[start:start + 500])
+        ).all()
+        entity_ids.update(row.entity_id for row in rows)
+
+    ids = list(entity_ids)
+    for start in range(0, len(ids), 500):
+        for entity in db.query(KnownEntity).filter(KnownEntity.id.in_(ids[start:start + 500])):
+            resolver.add(entity.canonical, known_canonical=entity.canonical)
+
+
+def _store_entities(db, resolver, mapping):
+    """
+    Adds the batch's mention counts to the stored entities. Written as one
+    upsert per chunk, so concurrent uploads (or web workers) storing the same
+    new name don't collide on the (label, canonical) constraint. Blocking keys
+    are only written by the insert that created the entity.
+    """
+    from sqlalchemy.dialects.sqlite import insert
+    from db.database import KnownEntity, KnownEntityBlock
+
+    counts = defaultdict(int)
+    for mention in resolver.mentions.values():
+        for form, count in mention.forms.items():
+            counts[mapping[form]] += count
+
+    now = datetime.now()
+    rows = [dict(label=resolver.label, canonical=canonical, mention_count=count, first_seen=now, last_seen=now)
+            for canonical, count in counts.items()]
+    created = []
+    for start in range(0, len(rows), 500):
+        stmt = insert(KnownEntity).values(rows[start:start + 500])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["label", "canonical"],
+            set_={"mention_count": KnownEntity.mention_count + stmt.excluded.mention_count,
+                  "last_seen": stmt.excluded.last_seen},
+        ).returning(KnownEntity.id, KnownEntity.canonical, KnownEntity.first_seen)
+        # An update keeps the stored first_seen, so only rows inserted here carry this call's timestamp
+        created.extend((row.id, row.canonical) for row in db.execute(stmt) if row.first_seen == now)
+
+    mentions = [_Mention(match_key(canonical, resolver.label), resolver.label) for _, canonical in created]
+    db.add_all(KnownEntityBlock(label=resolver.label, block_key=block, entity_id=entity_id)
+               for (entity_id, _), blocks in zip(created, resolver.block_keys(mentions)) for block in blocks)
@@ -0,0 +1,110 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Per-batch entity frequency tables, computed once at extraction
+#          time. For every person, organization and email in a batch we keep
+#          its mention count, the number of documents containing it and the
+#          file it was first seen in. Two files are written next to the
+#          batch's exports:
+#            <results id>.stats.json    totals + top-k per label (read by the results page)
+#            <results id>.entities.csv  the full frequency table
+# ──────────────────────────────────────────────────────────────────────────────
+
+import csv
+import heapq
+import json
+import logging
+
+# ──────── Custom modules ────────
+from utils.config import OUTPUT_FOLDER, STATS_TOP_K
+
+logger = logging.getLogger(__name__)
+
+# Result field → label used in the stats files
+STATS_FIELDS = {"person": "names", "email": "emails", "organization": "orgs"}
+STATS_VERSION = 1
+
+
+class EntityStats:
+    """Accumulates entity frequencies over a batch's extraction results, one document at a time."""
+
+    def __init__(self):
+        self.documents = 0
+        self.files = []  # first-seen references point into this list
+        self._tables = {field: {} for field in STATS_FIELDS}  # entity → [mentions, documents, file index]
+
+    def add(self, filename: str, result: dict):
+        file_index = len(self.files)
+        self.files.append(filename)
+        self.documents += 1
+        mentions = result.get("mentions", {})
+        for field, table in self._tables.items():
+            counts = mentions.get(field, {})
+            for entity in result.get(field, []):
+                if not entity:
+                    continue
+                entry = table.get(entity)
+                if entry is None:
+                    table[entity] = entry = [0, 0, file_index]
+                entry[0] += counts.get(entity, 1)
+                entry[1] += 1
+
+    def top(self, field: str, k: int = STATS_TOP_K) -> list:
+        """The k most frequent entities: most mentions, then most documents, then alphabetical."""
+        rows = heapq.nsmallest(k, self._tables[field].items(), key=lambda item: (-item[1][0], -item[1][1], item[0]))
+        return [[entity, mentions, documents, self.files[file_index]]
+                for entity, (mentions, documents, file_index) in rows]
+
+    def totals(self, field: str) -> dict:
+        table = self._tables[field]
+        return {
+            "extracted": sum(entry[1] for entry in table.values()),  # per-document entities, as in the JSON export
+            "distinct": len(table),
+            "mentions": sum(entry[0] for entry in table.values()),
+        }
+
+    def summary(self, k: int = STATS_TOP_K, files_processed: int = None) -> dict:
+        return {
+            "version": STATS_VERSION,
+            "files_processed": self.documents if files_processed is None else files_processed,
+            "documents": self.documents,
+            "columns": ["entity", "mentions", "documents", "first_seen"],
+            **{label: {**self.totals(field), "top": self.top(field, k)} for field, label in STATS_FIELDS.items()},
+        }
+
+    def save(self, results_id: str, files_processed: int = None, k: int = STATS_TOP_K) -> dict:
+        """Writes the stats files for a batch and returns the summary."""
+        summary = self.summary(k, files_processed)
+        try:
+            with open(OUTPUT_FOLDER / f"{results_id}.stats.json", "w", encoding="utf-8") as f:
+                json.dump(summary, f, ensure_ascii=False, separators=(",", ":"))
+            with open(OUTPUT_FOLDER / f"{results_id}.entities.csv", "w", newline="", encoding="utf-8") as f:
+                writer = csv.writer(f)
+                writer.writerow(["Label", "Entity", "Mentions", "Documents", "First Seen"])
+                for field, label in STATS_FIELDS.items():
+                    for entity, mentions, documents, first_seen in self.top(field, len(self._tables[field])):
+                        writer.writerow([label, entity, mentions, documents, first_seen])
+        except OSError as e:
+            logger.warning(f"⚠️ Could not write entity stats for {results_id}: {e}")
+        return summary
+
+
+def load_stats(results_id: str) -> dict:
+    """Returns a batch's stored stats summary, or None for batches exported before stats existed."""
+    path = OUTPUT_FOLDER / f"{results_id}.stats.json"
+    if not path.exists():
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        stats = json.load(f)
+    return stats if stats.get("version") == STATS_VERSION else None
+
+
+def stats_from_rows(rows: list) -> EntityStats:
+    """Rebuilds stats from an older batch's exported rows (comma-joined strings; no mention counts)."""
+    stats = EntityStats()
+    columns = {"person": "Names", "email": "Emails", "organization": "Organizations"}
+    for row in rows:
+        stats.add(row.get("Filename", ""), {
+            field: [entity for entity in (row.get(column) or "").split(", ") if entity]
+            for field, column in columns.items()
+        })
+    return stats
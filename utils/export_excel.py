@@ -4,14 +4,28 @@
 # ──────────────────────────────────────────────────────────────────────────────
 from pathlib import Path
 
-import pandas as pd
 import os
 import logging
 
+# ──────── Custom modules ────────
+from utils.metrics import EXPORT_SECONDS
+from utils.lazy_imports import lazy_import
+
 # Logging setup
 logger = logging.getLogger(__name__)
 
 
+# One export row per document (the layout shared by the upload, stream and reprocess exports)
+def result_row(filename: str, result: dict) -> dict:
+    return {
+        "Filename": filename,
+        "Source Type": Path(filename).suffix,
+        "Names": ", ".join(result.get("person", [])),
+        "Emails": ", ".join(result.get("email", [])),
+        "Organizations": ", ".join(result.get("organization", []))
+    }
+
+
 # Exports the results to a directory
 def export_to_file(results, output_path: str, format='xlsx'):
     """
@@ -21,6 +35,11 @@ def export_to_file(results, output_path: str, format='xlsx'):
         results (list): A list of dictionaries containing extracted data.
         output_path (str): Full path to the Excel file to write.
     """
+    # pandas (and openpyxl, which pandas imports on demand) load lazily; they are only needed once results are exported
+    pd = lazy_import("pandas")
+    if format == 'xlsx':
+        lazy_import("openpyxl")
+
     # Convert list of dictionaries to DataFrame
     df = pd.DataFrame(results)
 
@@ -32,10 +51,12 @@ def export_to_file(results, output_path: str, format='xlsx'):
     try:
         if format == 'xlsx':
             # Write DataFrame to Excel
-            df.to_excel(output_path, index=False)
+            with EXPORT_SECONDS.time(format=format):
+                df.to_excel(output_path, index=False)
             logger.info(f"Exported the extracted data to Excel file at: {output_path} successfully.")
         elif format == 'csv':
-            df.to_csv(output_path, index=False)
+            with EXPORT_SECONDS.time(format=format):
+                df.to_csv(output_path, index=False)
             logger.info(f"Exported the extracted data to CSV file at: {output_path} successfully.")
         else:
             raise ValueError(f"Unsupported export format.")
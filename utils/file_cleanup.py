@@ -1,13 +1,22 @@
 # ──────────────────────────────────────────────────────────────────────────────
 # Author: Paul-Michael Smith
 # Purpose: Provides a background task that periodically deletes expired files
-#          (PDF, DOCX, TXT, JSON, XLSX) from the output directory to maintain
-#          a clean and efficient file system.
+#          (PDF, DOCX, TXT, JSON, JSONL, CSV, XLSX, PROF) from the output
+#          directory to maintain a clean and efficient file system, and expires
+#          stored near-duplicate fingerprints and spaCy annotations.
 # ──────────────────────────────────────────────────────────────────────────────
 import time
 import asyncio
 from pathlib import Path
 from utils.logger import logger
+from utils.config import NEAR_DUP_RETENTION_SECONDS, DOC_STORE_RETENTION_SECONDS
+from utils.near_duplicates import expire_fingerprints
+from extractor import doc_store
+from utils.metrics import CLEANUP_SWEEPS, CLEANUP_SWEEP_SECONDS, CLEANUP_FILES_DELETED
+
+# Uploads and every per-batch output (exports, <id>.stats.json, <id>.entities.csv,
+# <id>.results.jsonl, profiles); all of them can hold extracted personal data
+EXPIRING_SUFFIXES = {".xlsx", ".csv", ".json", ".jsonl", ".pdf", ".docx", ".txt", ".prof"}
 
 # ──────────────────────────────────────────────────────────────────────────────
 # Background task to periodically delete old output files
@@ -16,10 +25,27 @@ async def cleanup_old_files(output_folder: Path, expiration_seconds: int, cleanu
     while True:
         now = time.time()
         logger.info("🧹 Running file cleanup...")
-        for file in output_folder.glob("*"):
-            if file.is_file() and file.suffix in [".xlsx", ".json", ".pdf", ".docx", ".txt"]:
-                file_age = now - file.stat().st_mtime
-                if file_age > expiration_seconds:
-                    logger.info(f"🗑️ Deleting old file: {file.name}")
-                    file.unlink()
+        with CLEANUP_SWEEP_SECONDS.time():
+            for file in output_folder.glob("*"):
+                if file.is_file() and file.suffix in EXPIRING_SUFFIXES:
+                    file_age = now - file.stat().st_mtime
+                    if file_age > expiration_seconds:
+                        logger.info(f"🗑️ Deleting old file: {file.name}")
+                        file.unlink(missing_ok=True)
+                        CLEANUP_FILES_DELETED.inc()
+            # Near-duplicate fingerprints hold extracted entities; expire them too
+            try:
+                expired = await asyncio.to_thread(expire_fingerprints, NEAR_DUP_RETENTION_SECONDS)
+                if expired:
+                    logger.info(f"🗑️ Deleted {expired} expired document fingerprint(s)")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not expire document fingerprints: {e}")
+            # So do stored spaCy documents (full texts) and their batch manifests
+            try:
+                expired = await asyncio.to_thread(doc_store.expire, DOC_STORE_RETENTION_SECONDS)
+                if expired:
+                    logger.info(f"🗑️ Deleted {expired} expired stored annotation file(s)")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not expire stored annotations: {e}")
+        CLEANUP_SWEEPS.inc()
         await asyncio.sleep(cleanup_interval_seconds)
\ No newline at end of file
@@ -0,0 +1,20 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Thread-safe on-demand imports for heavy libraries (spaCy, pandas,
+#          openpyxl, pdfplumber, python-docx, OpenAI). The startup warm-up
+#          thread and request threads may reach the same import at once; some of
+#          these packages have internal import cycles that fail with "partially
+#          initialized module" errors when imported concurrently, so every lazy
+#          import goes through one lock.
+# ──────────────────────────────────────────────────────────────────────────────
+
+import importlib
+import threading
+
+_import_lock = threading.RLock()
+
+
+def lazy_import(name: str):
+    """Imports (or returns the already imported) module, serialized across threads."""
+    with _import_lock:
+        return importlib.import_module(name)
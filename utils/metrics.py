@@ -0,0 +1,275 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Lightweight in-process instrumentation. Provides counters and
+#          histograms that render in the Prometheus text exposition format
+#          (served at "/metrics") without depending on an external client
+#          library or server.
+#
+# Metrics are kept per web worker process. Under the pre-fork server
+# (api/server.py) every series carries a worker="<slot>" label, and a scrape
+# answers for whichever worker took it; sum over `worker` in queries. Sandbox
+# worker processes send what they recorded back with each job result, and it
+# is added to the web worker's registry (Registry.drain() / merge()).
+# ──────────────────────────────────────────────────────────────────────────────
+
+from bisect import bisect_left
+from contextlib import contextmanager
+import os
+import threading
+import time
+
+# Default latency buckets (seconds), from sub-millisecond regex work up to slow GPT calls
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Size buckets (bytes) for uploaded documents: 1 KiB .. 64 MiB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(9))
+
+# Batch size buckets (documents per micro-batch)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+def _label_key(labelnames, labels):
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, key, *extra):
+    pairs = list(zip(labelnames, key)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing value, optionally split by labels."""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def drain(self) -> dict:
+        """Returns the recorded values and starts again from zero."""
+        with self._lock:
+            values, self._values = self._values, {}
+        return values
+
+    def merge(self, values: dict):
+        with self._lock:
+            for key, amount in values.items():
+                self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self, const_labels=()):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key, *const_labels)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative bucketed distribution with a running sum and count, per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # key → [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Context manager that observes the elapsed wall-clock time in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels):
+        series = self._series.get(_label_key(self.labelnames, labels))
+        return sum(series[:-1]) if series else 0
+
+    def drain(self) -> dict:
+        """Returns the recorded series and starts again from zero."""
+        with self._lock:
+            series, self._series = self._series, {}
+        return series
+
+    def merge(self, series: dict):
+        with self._lock:
+            for key, values in series.items():
+                current = self._series.get(key)
+                if current is None:
+                    self._series[key] = list(values)
+                else:
+                    self._series[key] = [a + b for a, b in zip(current, values)]
+
+    def render(self, const_labels=()):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            cumulative = 0
+            for bound, hits in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += hits
+                labels = _format_labels(self.labelnames, key, *const_labels, ("le", _format_value(float(bound))))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key, *const_labels)
+            yield f"{self.name}_sum{labels} {_format_value(series[-1])}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Holds every metric and renders them in registration order."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def drain(self) -> dict:
+        """Every metric's recorded values, which are reset (sent from sandbox workers to the web worker)."""
+        drained = {}
+        for metric in self._metrics:
+            values = metric.drain()
+            if values:
+                drained[metric.name] = values
+        return drained
+
+    def merge(self, drained: dict):
+        """Adds values drained from another process's registry."""
+        for metric in self._metrics:
+            if metric.name in drained:
+                metric.merge(drained[metric.name])
+
+    def render(self) -> str:
+        # Set by api/server.py in each forked web worker
+        slot = os.getenv("PREFORK_WORKER_SLOT")
+        const_labels = (("worker", slot),) if slot is not None else ()
+
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render(const_labels))
+        return "\n".join(lines) + "\n"
+
+
+# Usage: from utils import metrics; metrics.NER_SECONDS.observe(...)
+REGISTRY = Registry()
+
+# Prometheus text exposition content type
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# ──────── HTTP ────────
+HTTP_REQUESTS = REGISTRY.counter(
+    "http_requests_total", "HTTP requests handled, by route template, method and status code.",
+    ("route", "method", "status"))
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_duration_seconds", "Time to produce the HTTP response, by route template.",
+    ("route", "method"))
+
+# ──────── Upload ────────
+UPLOAD_BYTES = REGISTRY.counter(
+    "upload_bytes_total", "Bytes received in uploaded documents, by file extension.", ("format",))
+UPLOAD_FILE_BYTES = REGISTRY.histogram(
+    "upload_file_size_bytes", "Size distribution of uploaded documents.", ("format",), SIZE_BUCKETS)
+UPLOAD_FILES = REGISTRY.counter(
+    "upload_files_total", "Uploaded documents by outcome (processed, unsupported, empty, failed, cancelled).", ("outcome",))
+
+# ──────── Extraction stages ────────
+FILE_READ_SECONDS = REGISTRY.histogram(
+    "file_read_duration_seconds", "Time spent extracting text from a document, by format.", ("format",))
+NER_SECONDS = REGISTRY.histogram(
+    "ner_duration_seconds", "Time spent running the spaCy pipeline on a document.")
+LANGUAGE_DOCUMENTS = REGISTRY.counter(
+    "language_documents_total", "Documents routed to local extraction, by identified language.", ("language",))
+MODEL_CACHE_EVENTS = REGISTRY.counter(
+    "model_cache_events_total", "Language model cache events (hit, load, load_failed, evict).", ("event",))
+GAZETTEER_SECONDS = REGISTRY.histogram(
+    "gazetteer_match_duration_seconds", "Time spent matching and merging gazetteer names into a document.")
+GPT_CALL_SECONDS = REGISTRY.histogram(
+    "gpt_call_duration_seconds", "Latency of individual GPT completion calls, by outcome.", ("outcome",))
+GPT_RETRIES = REGISTRY.counter(
+    "gpt_call_retries_total", "GPT completion calls retried after a transient error.")
+CASCADE_DOCUMENTS = REGISTRY.counter(
+    "cascade_documents_total", "Cascade-mode documents by outcome (local, escalated, budget_exhausted).", ("outcome",))
+CASCADE_TRIGGERS = REGISTRY.counter(
+    "cascade_triggers_total", "Escalation triggers tripped by cascade-mode documents.", ("reason",))
+NEAR_DUP_DOCUMENTS = REGISTRY.counter(
+    "near_duplicate_documents_total", "Fingerprinted documents by outcome (new, near_duplicate, duplicate).", ("outcome",))
+NEAR_DUP_CHUNKS = REGISTRY.counter(
+    "near_duplicate_chunks_total", "Document chunks extracted or reused from a near-duplicate.", ("outcome",))
+EXPORT_SECONDS = REGISTRY.histogram(
+    "export_duration_seconds", "Time spent writing result exports, by format.", ("format",))
+DB_COMMIT_SECONDS = REGISTRY.histogram(
+    "db_commit_duration_seconds", "Time spent committing database transactions, by operation.", ("operation",))
+
+# ──────── Sandbox workers ────────
+SANDBOX_JOBS = REGISTRY.counter(
+    "sandbox_jobs_total", "Sandboxed read/extract jobs by outcome (ok, error, timeout, memory, crashed).", ("outcome",))
+SANDBOX_RESTARTS = REGISTRY.counter(
+    "sandbox_worker_restarts_total", "Sandbox worker processes replaced, by reason.", ("reason",))
+
+# ──────── JSON API micro-batching ────────
+API_BATCH_SIZE = REGISTRY.histogram(
+    "api_batch_size", "Documents per micro-batch run through the spaCy pipeline.", buckets=BATCH_BUCKETS)
+API_BATCH_SECONDS = REGISTRY.histogram(
+    "api_batch_duration_seconds", "Time spent extracting one micro-batch.")
+API_BATCH_QUEUE_SECONDS = REGISTRY.histogram(
+    "api_batch_queue_seconds", "Time a request waited before its micro-batch started.")
+
+# ──────── Admission control ────────
+ADMISSION_REJECTIONS = REGISTRY.counter(
+    "admission_rejections_total", "Requests rejected by admission control, by reason.", ("reason",))
+ADMISSION_QUEUE_SECONDS = REGISTRY.histogram(
+    "admission_queue_seconds", "Time requests waited for an in-flight slot, by pool.", ("pool",))
+
+# ──────── Cleanup ────────
+CLEANUP_SWEEPS = REGISTRY.counter(
+    "cleanup_sweeps_total", "Completed sweeps of the output folder cleanup task.")
+CLEANUP_SWEEP_SECONDS = REGISTRY.histogram(
+    "cleanup_sweep_duration_seconds", "Time spent on one sweep of the output folder.")
+CLEANUP_FILES_DELETED = REGISTRY.counter(
+    "cleanup_files_deleted_total", "Expired files deleted from the output folder.")
@@ -0,0 +1,282 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Near-duplicate detection to skip redundant extraction. Each
+#          processed document is stored with a 64-bit SimHash of its text and
+#          the extraction result of every chunk. When a new document's SimHash is
+#          within NEAR_DUP_MAX_DISTANCE bits of a stored one, only the chunks
+#          whose text changed are extracted again; the rest reuse the stored
+#          entities. Exact re-uploads skip extraction entirely. Entities that
+#          no single chunk contains (split across a chunk boundary, or
+#          normalized by GPT) are kept per document and carried over only
+#          while they still occur in the text. Stored fingerprints contain
+#          extracted PII and expire after NEAR_DUP_RETENTION_SECONDS.
+#
+# Lookup: the SimHash is split into four 16-bit bands stored in indexed
+#         columns. Two hashes within 3 bits of each other share at least one
+#         band, so candidates come from four indexed equality lookups.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime, timedelta
+from hashlib import blake2b, sha1
+import json
+import re
+import zlib
+
+from sqlalchemy import or_
+
+# ──────── Custom modules ────────
+from extractor.doc_store import content_hash
+from utils.config import (
+    NEAR_DUP_MAX_DISTANCE, NEAR_DUP_MIN_CHARS, SPACY_MODEL_NAME, LANGUAGE_ROUTING_ENABLED, extraction_mode,
+)
+from utils.metrics import NEAR_DUP_DOCUMENTS, NEAR_DUP_CHUNKS
+from utils.logger import logger
+
+ENTITY_FIELDS = ("person", "organization", "email")
+
+SHINGLE_WORDS = 3
+NUM_BANDS = 4
+BAND_BITS = 16
+MAX_CANDIDATES = 50
+FINGERPRINT_VERSION = 3  # part of the pipeline key; rows stored in another format are never matched
+
+# Chunk boundaries are content-defined (blank lines or line-hash anchors), so an
+# edit only changes the chunks around it instead of shifting every later one.
+MIN_CHUNK_CHARS = 300
+MAX_CHUNK_CHARS = 4000
+ANCHOR_MODULUS = 8
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over lower-cased word 3-shingles."""
+    import numpy as np
+
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        words = words or [""]
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)]
+
+    hashes = np.fromiter(
+        (int.from_bytes(blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype="<u8", count=len(shingles)
+    )
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0, dtype=np.int64) * 2 > len(shingles)
+    return int(np.packbits(majority, bitorder="little").view("<u8")[0])
+
+
+def hamming(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+def _to_signed(value: int) -> int:
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _bands(value: int) -> list:
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (band * BAND_BITS)) & mask for band in range(NUM_BANDS)]
+
+
+def split_chunks(text: str) -> list:
+    """Splits text into chunks that concatenate back to the original text."""
+    chunks, current, size = [], [], 0
+    for line in text.splitlines(keepends=True):
+        current.append(line)
+        size += len(line)
+        stripped = line.strip()
+        anchor = not stripped or zlib.crc32(stripped.encode("utf-8")) % ANCHOR_MODULUS == 0
+        if size >= MAX_CHUNK_CHARS or (size >= MIN_CHUNK_CHARS and anchor):
+            chunks.append("".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def chunk_hash(chunk: str) -> str:
+    return sha1(_normalize(chunk).encode("utf-8")).hexdigest()[:20]
+
+
+def _split_mentions(total: int, occurrences: list) -> list:
+    """Splits a document's mention count over its chunks in proportion to where the entity occurs."""
+    weight = sum(occurrences)
+    shares = [total * count // weight for count in occurrences]
+    # Hand the remainder to the chunks with the most occurrences; every chunk keeps at least one
+    for index in sorted(range(len(occurrences)), key=lambda i: -occurrences[i])[:total - sum(shares)]:
+        shares[index] += 1
+    return [max(share, 1) for share in shares]
+
+
+def _attribute(result: dict, chunks: list):
+    """
+    Assigns each extracted entity, with its mention count, to the chunk(s) whose
+    text contains it ({field: [[entity, mentions], ...]} per chunk). Returns
+    (per-chunk entities, entities found in no single chunk); the latter span
+    a chunk boundary or were normalized by the extractor (GPT).
+    """
+    normalized = [_normalize(chunk) for chunk in chunks]
+    mentions = result.get("mentions") or {}
+    per_chunk = [{field: [] for field in ENTITY_FIELDS} for _ in chunks]
+    unplaced = {field: [] for field in ENTITY_FIELDS}
+    for field in ENTITY_FIELDS:
+        for entity in result.get(field, []):
+            total = (mentions.get(field) or {}).get(entity, 1)
+            needle = _normalize(entity)
+            found = [(index, text.count(needle)) for index, text in enumerate(normalized) if needle and needle in text]
+            if not found:
+                unplaced[field].append([entity, total])
+                continue
+            for (index, _), share in zip(found, _split_mentions(total, [count for _, count in found])):
+                per_chunk[index][field].append([entity, share])
+    return per_chunk, unplaced
+
+
+def current_pipeline() -> str:
+    # Language-routed results come from several models; keep them apart from single-model ones
+    routing = "+languages" if LANGUAGE_ROUTING_ENABLED else ""
+    return f"v{FINGERPRINT_VERSION}:{extraction_mode()}:{SPACY_MODEL_NAME}{routing}"
+
+
+def find_near_duplicate(db, fingerprint: int, pipeline: str):
+    """Returns (stored fingerprint row, Hamming distance) of the closest match, or (None, None)."""
+    from db.database import DocumentFingerprint
+
+    bands = _bands(fingerprint)
+    candidates = db.query(DocumentFingerprint).filter(
+        DocumentFingerprint.pipeline == pipeline,
+        or_(*(getattr(DocumentFingerprint, f"band{band}") == value for band, value in enumerate(bands)))
+    ).order_by(DocumentFingerprint.id.desc()).limit(MAX_CANDIDATES).all()
+
+    best, best_distance = None, None
+    for row in candidates:
+        distance = hamming(row.simhash, fingerprint)
+        if distance <= NEAR_DUP_MAX_DISTANCE and (best is None or distance < best_distance):
+            best, best_distance = row, distance
+    return best, best_distance
+
+
+def extract_with_reuse(db, filename: str, text: str, extract) -> dict:
+    """
+    Extracts `text` with `extract(text) -> result`, reusing the stored chunk
+    results of a near-duplicate document where possible. The new fingerprint
+    is added to `db` and flushed, so later documents of the same batch can
+    match it (committed with the caller's transaction).
+    """
+    if len(text) < NEAR_DUP_MIN_CHARS:
+        return extract(text)
+
+    from db.database import DocumentFingerprint
+
+    pipeline = current_pipeline()
+    fingerprint = simhash(text)
+    chunks = split_chunks(text)
+    hashes = [chunk_hash(chunk) for chunk in chunks]
+
+    match, distance = find_near_duplicate(db, _to_signed(fingerprint), pipeline)
+    record = json.loads(match.chunks) if match is not None else {}
+    stored = dict((h, r) for h, r in record.get("chunks", []))
+    changed = [index for index, h in enumerate(hashes) if h not in stored]
+
+    if match is not None and not changed:
+        # Same chunks as a stored document: nothing to extract or store
+        NEAR_DUP_DOCUMENTS.inc(outcome="duplicate")
+        NEAR_DUP_CHUNKS.inc(len(chunks), outcome="reused")
+        logger.info(f"♊ {filename}: duplicate of document #{match.id}; extraction skipped.")
+        result = _combine([stored[h] for h in hashes], record.get("unplaced", {}), source=match.source,
+                          near_duplicate_of=match.id)
+        result["language"] = record.get("language")
+        # Stored annotations are only valid for the exact same text
+        if _same_text(record.get("annotations"), text):
+            result["annotations"] = record["annotations"]
+        return result
+
+    # Entities of the stored document that no single chunk contained can only be
+    # carried over if they still occur in the text; otherwise extract everything
+    stored_unplaced = record.get("unplaced", {})
+    normalized_text = _normalize(text)
+    if any(_normalize(entity) not in normalized_text for pairs in stored_unplaced.values() for entity, _ in pairs):
+        changed = list(range(len(chunks)))
+
+    if match is None or len(changed) == len(chunks):
+        NEAR_DUP_DOCUMENTS.inc(outcome="new")
+        result = extract(text)
+        per_chunk, unplaced = _attribute(result, chunks)
+    else:
+        NEAR_DUP_DOCUMENTS.inc(outcome="near_duplicate")
+        changed_chunks = [chunks[index] for index in changed]
+        partial = extract("\n\n".join(changed_chunks))
+        fresh_chunks, unplaced = _attribute(partial, changed_chunks)
+        fresh = dict(zip(changed, fresh_chunks))
+        per_chunk = [fresh[index] if index in fresh else stored[h] for index, h in enumerate(hashes)]
+        # An entity in both (e.g. still split across a boundary) is counted once
+        unplaced = {field: list({entity: [entity, mentions] for entity, mentions in
+                                 sorted(stored_unplaced.get(field, []) + unplaced[field], key=lambda pair: pair[1])
+                                 }.values())
+                    for field in ENTITY_FIELDS}
+        result = _combine(per_chunk, unplaced, source=partial.get("source"), near_duplicate_of=match.id)
+        result["language"] = partial.get("language") or record.get("language")
+        logger.info(f"♊ {filename}: near-duplicate of document #{match.id} (distance {distance}); "
+                    f"re-extracted {len(changed)} of {len(chunks)} chunk(s).")
+
+    NEAR_DUP_CHUNKS.inc(len(changed), outcome="extracted")
+    NEAR_DUP_CHUNKS.inc(len(chunks) - len(changed), outcome="reused")
+
+    bands = _bands(fingerprint)
+    db.add(DocumentFingerprint(
+        filename=filename,
+        pipeline=pipeline,
+        source=result.get("source"),
+        text_length=len(text),
+        simhash=_to_signed(fingerprint),
+        band0=bands[0], band1=bands[1], band2=bands[2], band3=bands[3],
+        chunks=json.dumps({
+            "chunks": [[h, r] for h, r in zip(hashes, per_chunk)],
+            "unplaced": unplaced,
+            "language": result.get("language"),
+            "annotations": result.get("annotations"),
+        }, ensure_ascii=False),
+    ))
+    db.flush()
+    return result
+
+
+def _same_text(annotations: str, text: str) -> bool:
+    return bool(annotations) and annotations.endswith("/" + content_hash(text))
+
+
+def _combine(per_chunk: list, unplaced: dict, source, near_duplicate_of) -> dict:
+    """Merges per-chunk entities (already post-processed) into one result, summing their mention counts."""
+    mentions = {field: {} for field in ENTITY_FIELDS}
+    for chunk in per_chunk + [unplaced]:
+        for field in ENTITY_FIELDS:
+            counts = mentions[field]
+            for entity, count in chunk.get(field, []):
+                counts[entity] = counts.get(entity, 0) + count
+    result = {field: list(counts) for field, counts in mentions.items()}
+    result["mentions"] = mentions
+    result["source"] = source
+    result["near_duplicate_of"] = near_duplicate_of
+    return result
+
+
+def expire_fingerprints(max_age_seconds: float) -> int:
+    """Deletes fingerprints (and their stored entities) older than `max_age_seconds`; returns the count."""
+    from db.database import SessionLocal, DocumentFingerprint
+
+    cutoff = datetime.now() - timedelta(seconds=max_age_seconds)
+    db = SessionLocal()
+    try:
+        deleted = db.query(DocumentFingerprint).filter(DocumentFingerprint.created_at < cutoff).delete()
+        db.commit()
+        return deleted
+    finally:
+        db.close()
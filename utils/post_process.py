@@ -4,34 +4,10 @@
 # ──────────────────────────────────────────────────────────────────────────────
 
 import re
-import os
 import logging
-from pathlib import Path
-import sys
-
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Create the logs directory if it doesn't exist
-# Ensure correct path is always passed
-PROJECT_ROOT = Path(__file__).resolve().parent.parent
-log_dir = PROJECT_ROOT / os.getenv("LOG_DIR", "logs")
-os.makedirs(log_dir, exist_ok=True)
-
-# Setup logging configuration
-log_file_path = os.path.join(log_dir, "post_process.log")
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(log_file_path, encoding="utf-8"),
-        logging.StreamHandler(),
-    ]
-)
+
+# Module logger only; logging is configured once by utils.logger
 logger = logging.getLogger(__name__)
-logger.info("✅ Post-processing logger setup complete.")
 
 
 # Example list of some valid acronyms (can expand this later)
@@ -41,76 +17,175 @@ VALID_ACRONYMS = {
 }
 
 # Common filler or noise words to exclude from entities
+# (matched against the lower-cased entity, as before the engine: the mixed-case entries never match)
 NOISE_WORDS = {"and", "or", "of", "the", "in", "on", "to", "with", "a", "an", "BA", "AS", "•", "GPA", "Scale", " - "}
 
+# ──────── Compiled rules (built once at import) ────────
+_TRAILING_PUNCT = ".,;:"
+_HAS_LETTER_RE = re.compile(r"[A-Za-z]")
+_DIGIT_RE = re.compile(r"\d")
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,7}")
+
+MIN_LENGTH = 3
+MAX_LENGTH = 100
+MAX_PERSON_TOKENS = 5
+
+# Result dict key (as returned by extract_info) → entity label
+RESULT_LABELS = {"person": "PERSON", "organization": "ORG", "email": "EMAIL"}
+
 
 def is_valid_acronym(word):
     """Check if a word is a valid acronym based on the known list or pattern."""
-    return word in VALID_ACRONYMS or (word.issupper() and 2 < len(word) <= 5)
+    return word in VALID_ACRONYMS or (word.isupper() and 2 < len(word) <= 5)
 
 def normalize_entity(entity):
     """Clean up entity string by removing noise and formatting issues."""
-    entity = entity.strip()
-    entity = re.sub(r"[\.,;:]+$", "", entity) # trailing punctuation
-    entity = re.sub(r"\s+", " ", entity) # extra spaces
+    entity = entity.strip().rstrip(_TRAILING_PUNCT) # trailing punctuation
+    return " ".join(entity.split()) # extra spaces
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Pipeline steps. Each takes an entity string and returns the (possibly
+# rewritten) entity, or None to drop it.
+# ──────────────────────────────────────────────────────────────────────────────
+def _step_normalize(entity):
+    return normalize_entity(entity) or None
+
+def _step_has_letters(entity):
+    # Remove if it's mostly special characters or digits
+    return entity if _HAS_LETTER_RE.search(entity) else None
+
+def _step_noise_word(entity):
+    # Remove if it's one short word or a known noise word
+    return None if " " not in entity and entity.lower() in NOISE_WORDS else entity
+
+def _step_length(entity):
+    # Basic filter: remove suspiciously short or long items
+    return entity if MIN_LENGTH <= len(entity) <= MAX_LENGTH else None
+
+def _step_person_shape(entity):
+    # People's names don't contain digits or "@" and are only a few words long
+    if _DIGIT_RE.search(entity) or "@" in entity or entity.count(" ") >= MAX_PERSON_TOKENS:
+        return None
     return entity
 
-def clean_entities(entities, entity_type="ORG"):
-    """
-    Applies cleaning functions to entities.
-    Clean and filter extracted entity list.
-    """
-    cleaned = set()
-    for ent in entities:
-        norm = normalize_entity(ent)
-        # Remove if it's mostly special characters or digits
-        if not re.search(r'[A-Za-z]', norm) or re.match(r'^[\W\d\s]+$', norm):
-            continue
-
-        # Remove if it's one short word or a known noise word
-        if len(norm.split()) == 1 and norm.lower() in NOISE_WORDS:
-            continue
-
-        # Basic filter: remove suspiciously short or long items
-        if len(norm) < 3 or len(norm) > 100:
-            continue
-
-        cleaned.add(norm)
-    return list(cleaned)
-
-    # for org in entities:
-    #     if not isinstance(org, str):
-    #         continue # skip if it's not a string
-    #
-    #     org = org.strip(",.-:\n")
-    #
-    #     # Keep acronyms like NSA, avoid full sentences
-    #     if org.isupper() and 2 <= len(org) <= 6:
-    #         cleaned.add(org)
-    #         continue
-    #
-    #     # Skp overly long orgs or malformed strings
-    #     if len(org.split()) > 10:
-    #         continue
-    #
-    #     cleaned.add(org)
-    # return list(cleaned)
-
-    # for ent in entities:
-    #     norm = normalize_entity(ent)
-    #     if entity_type == "ORG":
-    #         if len(norm) < 2:
-    #             print(entity_type)
-    #             continue
-    #         if norm.isupper() and not is_valid_acronym(norm):
-    #             print(entity_type)
-    #             continue
-    #     cleaned.append(norm)
-    # return list(cleaned)
+def _step_org_acronym(entity):
+    # A single all-caps word is only an organization if it looks like an acronym.
+    # Opt-in (not in the default ORG pipeline): it also drops names like NVIDIA or UNICEF
+    if " " not in entity and entity.isupper() and not is_valid_acronym(entity):
+        return None
+    return entity
+
+def _step_email_normalize(entity):
+    entity = entity.strip().rstrip(_TRAILING_PUNCT).lower()
+    return entity if _EMAIL_RE.fullmatch(entity) else None
 
 
+STEPS = {
+    "normalize": _step_normalize,
+    "has_letters": _step_has_letters,
+    "noise_word": _step_noise_word,
+    "length": _step_length,
+    "person_shape": _step_person_shape,
+    "org_acronym": _step_org_acronym,
+    "email_normalize": _step_email_normalize,
+}
 
+# Default per-label pipelines (run in order)
+DEFAULT_PIPELINES = {
+    "PERSON": ("normalize", "has_letters", "noise_word", "length", "person_shape"),
+    "ORG": ("normalize", "has_letters", "noise_word", "length"),
+    "EMAIL": ("email_normalize",),
+}
+GENERIC_PIPELINE = ("normalize", "has_letters", "noise_word", "length")
 
 
+class PostProcessor:
+    """
+    Runs per-label cleanup pipelines over whole entity lists in a single pass,
+    de-duplicating while preserving first-seen order. Each distinct raw string
+    goes through the pipeline once per call; repeats reuse the first outcome.
 
+    Args:
+        pipelines (dict): Optional label → sequence of step names overriding DEFAULT_PIPELINES.
+    """
 
+    def __init__(self, pipelines=None):
+        configured = dict(DEFAULT_PIPELINES)
+        configured.update(pipelines or {})
+        unknown = {name for steps in configured.values() for name in steps} - STEPS.keys()
+        if unknown:
+            raise ValueError(f"Unknown post-processing step(s): {', '.join(sorted(unknown))}")
+        self._pipelines = {label: tuple(STEPS[name] for name in steps) for label, steps in configured.items()}
+        self._generic = tuple(STEPS[name] for name in GENERIC_PIPELINE)
+
+    def process(self, entities, label="ORG"):
+        """Cleans, filters and de-duplicates a list of entity strings for one label."""
+        steps = self._pipelines.get(label, self._generic)
+        seen_raw = set()  # A repeated raw string has the same outcome, so it's only processed once
+        seen = set()
+        cleaned = []
+        for raw in entities:
+            if not isinstance(raw, str) or raw in seen_raw:
+                continue
+            seen_raw.add(raw)
+            entity = raw
+            for step in steps:
+                entity = step(entity)
+                if entity is None:
+                    break
+            if entity is not None and entity not in seen:
+                seen.add(entity)
+                cleaned.append(entity)
+        return cleaned
+
+    def count_mentions(self, entities, label="ORG") -> dict:
+        """
+        Same cleaning as process(), but returns {cleaned entity: raw mentions}
+        in first-seen order (so list(...) of it equals process()'s output).
+        """
+        steps = self._pipelines.get(label, self._generic)
+        outcomes = {}  # raw string → cleaned entity (or None), so repeats skip the pipeline
+        counts = {}
+        for raw in entities:
+            if not isinstance(raw, str):
+                continue
+            if raw in outcomes:
+                entity = outcomes[raw]
+            else:
+                entity = raw
+                for step in steps:
+                    entity = step(entity)
+                    if entity is None:
+                        break
+                outcomes[raw] = entity
+            if entity is not None:
+                counts[entity] = counts.get(entity, 0) + 1
+        return counts
+
+    def process_result(self, result: dict) -> dict:
+        """
+        Applies the label pipelines to the person/organization/email lists of an
+        extraction result, and records how often each entity was mentioned
+        (result["mentions"], used by the batch entity statistics).
+        """
+        mentions = {}
+        for field, label in RESULT_LABELS.items():
+            if field in result:
+                counts = self.count_mentions(result[field] or [], label)
+                result[field] = list(counts)
+                mentions[field] = counts
+        result["mentions"] = mentions
+        return result
+
+
+# Shared default engine
+DEFAULT_POST_PROCESSOR = PostProcessor()
+
+
+def clean_entities(entities, entity_type="ORG"):
+    """
+    Applies cleaning functions to entities.
+    Clean and filter extracted entity list.
+    """
+    return DEFAULT_POST_PROCESSOR.process(entities, entity_type)
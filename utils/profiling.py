@@ -0,0 +1,187 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Opt-in per-request profiling. When REQUEST_PROFILING is enabled and a
+#          request asks for it (header "X-Profile: 1" or query "?profile=1"),
+#          the request's work is run under cProfile and the profile, a readable
+#          summary and per-stage timings / document size stats are saved to
+#          OUTPUT_FOLDER, where they can be fetched through "/download/...".
+#
+# cProfile traces one thread. The route hands the request's work to
+# RequestProfile.run() in a worker thread, so requests served by the event loop
+# meanwhile are not recorded. Work in sandbox worker processes is not traced;
+# its wall-clock time still shows in the stage timings.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import cProfile
+import io
+import json
+import pstats
+import threading
+import time
+
+# ──────── Custom modules ────────
+from utils.config import OUTPUT_FOLDER, REQUEST_PROFILING_ENABLED, SANDBOX_ENABLED
+from utils.logger import logger
+
+PROFILE_HEADER = "x-profile"
+PROFILE_QUERY_PARAM = "profile"
+TRUTHY = {"1", "true", "yes", "on"}
+
+# Tracing slows a request down considerably, so only one request is profiled at a time
+_profiler_lock = threading.Lock()
+
+
+class RequestProfile:
+    """Collects a cProfile trace plus stage timings and document stats for one request."""
+
+    enabled = True
+
+    def __init__(self, label: str):
+        self.label = label
+        self.profiler = cProfile.Profile()
+        self.stages = {}
+        self.documents = []
+        self.started_at = datetime.now()
+        self._start = None
+        self._stopped = False
+        self._running = False
+        self._state_lock = threading.Lock()
+
+    def start(self):
+        self._start = time.perf_counter()
+        return self
+
+    def run(self, function, *args):
+        """Calls `function(*args)` with the profiler enabled in the calling thread."""
+        with self._state_lock:
+            self._running = True
+        self.profiler.enable()
+        try:
+            return function(*args)
+        finally:
+            self.profiler.disable()
+            with self._state_lock:
+                self._running = False
+                aborted = self._stopped
+            if aborted:
+                _profiler_lock.release()  # abort() came while the work was still running
+
+    @contextmanager
+    def stage(self, name: str):
+        """Adds the wall-clock time of the block to the named stage."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def add_document(self, filename: str, size_bytes: int, text_chars: int, entity_counts: dict):
+        self.documents.append({
+            "filename": filename,
+            "size_bytes": size_bytes,
+            "text_chars": text_chars,
+            "entities": entity_counts,
+        })
+
+    def finish(self, status_code: int = None) -> list:
+        """
+        Stops profiling and writes the artifacts.
+
+        Returns:
+            list: Filenames (relative to OUTPUT_FOLDER) of the written artifacts.
+        """
+        if self._stopped:
+            return []
+        self._stop()
+        total = time.perf_counter() - self._start
+
+        base = f"profile_{self.started_at.strftime('%Y-%m-%d_%H-%M-%S_%f')}"
+        OUTPUT_FOLDER.mkdir(exist_ok=True)
+        prof_path = OUTPUT_FOLDER / f"{base}.prof"
+        text_path = OUTPUT_FOLDER / f"{base}.txt"
+        json_path = OUTPUT_FOLDER / f"{base}.json"
+
+        try:
+            self.profiler.dump_stats(prof_path)
+
+            summary = io.StringIO()
+            pstats.Stats(self.profiler, stream=summary).sort_stats("cumulative").print_stats(60)
+            text_path.write_text(summary.getvalue(), encoding="utf-8")
+
+            with open(json_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "label": self.label,
+                    "started_at": self.started_at.isoformat(timespec="milliseconds"),
+                    "status_code": status_code,
+                    "total_seconds": round(total, 6),
+                    "stages_seconds": {name: round(value, 6) for name, value in self.stages.items()},
+                    "documents": self.documents,
+                    "sandboxed": SANDBOX_ENABLED,  # reading/extraction ran in worker processes, outside the trace
+                    "profile_files": {"pstats": prof_path.name, "summary": text_path.name},
+                }, f, indent=2)
+        except OSError as e:
+            logger.error(f"❌ Failed to write profile artifacts for {self.label}: {e}")
+            return []
+
+        logger.info(f"🔬 Saved request profile for {self.label}: {json_path.name} ({total:.3f}s)")
+        return [json_path.name, text_path.name, prof_path.name]
+
+    def _stop(self):
+        with self._state_lock:
+            self._stopped = True
+            running = self._running
+        if not running:
+            _profiler_lock.release()
+
+    def abort(self):
+        """Stops profiling without writing artifacts (request failed or was cancelled); no-op once finished."""
+        if not self._stopped:
+            self._stop()
+            logger.warning(f"⚠️ Discarded the request profile for {self.label}: the request did not complete.")
+
+
+class _NullProfile:
+    """Stand-in used when profiling is off; every hook is a no-op."""
+
+    enabled = False
+    _context = nullcontext()
+
+    def stage(self, name: str):
+        return self._context
+
+    def run(self, function, *args):
+        return function(*args)
+
+    def add_document(self, *args, **kwargs):
+        pass
+
+    def finish(self, status_code: int = None) -> list:
+        return []
+
+    def abort(self):
+        pass
+
+
+NULL_PROFILE = _NullProfile()
+
+
+def profile_for_request(request, label: str):
+    """
+    Returns a started RequestProfile when profiling is enabled and requested,
+    otherwise the shared no-op NULL_PROFILE.
+    """
+    if not REQUEST_PROFILING_ENABLED:
+        return NULL_PROFILE
+
+    wanted = (request.headers.get(PROFILE_HEADER, "").lower() in TRUTHY
+              or request.query_params.get(PROFILE_QUERY_PARAM, "").lower() in TRUTHY)
+    if not wanted:
+        return NULL_PROFILE
+
+    if not _profiler_lock.acquire(blocking=False):
+        logger.warning(f"⚠️ Profiling requested for {label} but another request is being profiled; skipping.")
+        return NULL_PROFILE
+
+    return RequestProfile(label).start()
@@ -0,0 +1,210 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Compact, structured storage for a batch's extraction results.
+#          Instead of a dict (and comma-joined strings) per document, a
+#          ResultSet keeps column arrays: one interned copy of every distinct
+#          entity string, and per entity occurrence its string id, label and
+#          mention count, with per-document offsets into those arrays. Entity
+#          lists stay lists from extract_info() through resolution, stats,
+#          exports and the results page, so names containing commas survive.
+#
+# On disk (<results id>.results.jsonl, versioned):
+#   {"format": "entity-results", "version": 1, "fields": ["person", "organization", "email"]}
+#   {"filename": "a.pdf", "source": "spacy", "language": "en", "annotations": null,
+#    "entities": {"person": [["Jane Doe", 2]], "organization": [["Acme, Inc", 1]], "email": []}}
+# ──────────────────────────────────────────────────────────────────────────────
+
+from array import array
+import json
+import sys
+
+# ──────── Custom modules ────────
+from utils.export_excel import result_row
+
+FIELDS = ("person", "organization", "email")
+FORMAT = "entity-results"
+FORMAT_VERSION = 1
+
+
+class DocumentResult:
+    """One document of a ResultSet. Reads like an extract_info() result dict (result.get("person"))."""
+
+    __slots__ = ("filename", "source", "language", "annotations", "person", "organization", "email", "mentions")
+
+    def __init__(self, filename, source, language, annotations, entities: dict):
+        self.filename = filename
+        self.source = source
+        self.language = language
+        self.annotations = annotations
+        self.person = [entity for entity, _ in entities["person"]]
+        self.organization = [entity for entity, _ in entities["organization"]]
+        self.email = [entity for entity, _ in entities["email"]]
+        self.mentions = {field: dict(pairs) for field, pairs in entities.items()}
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if key in self.__slots__ else default
+
+
+def _record(filename, source, language, annotations, entities: dict) -> str:
+    return json.dumps({
+        "filename": filename,
+        "source": source,
+        "language": language,
+        "annotations": annotations,
+        "entities": entities,
+    }, ensure_ascii=False)
+
+
+def _header() -> str:
+    return json.dumps({"format": FORMAT, "version": FORMAT_VERSION, "fields": list(FIELDS)})
+
+
+def _entity_pairs(result) -> dict:
+    """{field: [[entity, mentions], ...]} from an extract_info() result."""
+    mentions = result.get("mentions") or {}
+    return {
+        field: [[entity, (mentions.get(field) or {}).get(entity, 1)] for entity in (result.get(field) or []) if entity]
+        for field in FIELDS
+    }
+
+
+class ResultSet:
+    """
+    Column-oriented results of one batch.
+
+    Documents are added in order with add(); iterating yields DocumentResult
+    views built on demand, so a large batch costs a few bytes per entity
+    occurrence plus one copy of each distinct string.
+    """
+
+    def __init__(self):
+        self._strings = []  # interned entity strings
+        self._ids = {}  # entity string → index in _strings
+        self.filenames = []
+        self._sources = []
+        self._languages = []
+        self._annotations = []
+        self._starts = array("I", [0])  # document i's entities are [_starts[i], _starts[i + 1])
+        self._labels = array("B")  # index into FIELDS
+        self._entities = array("I")  # index into _strings
+        self._mentions = array("I")
+
+    def _intern(self, text: str) -> int:
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self._strings)
+            self._strings.append(text)
+        return string_id
+
+    def add(self, filename: str, result):
+        """Appends one document's extract_info() result (the dict itself is not kept)."""
+        self._append(filename, result.get("source"), result.get("language"), result.get("annotations"),
+                     _entity_pairs(result))
+
+    def _append(self, filename, source, language, annotations, entities: dict):
+        for label, field in enumerate(FIELDS):
+            for entity, mentions in entities.get(field, []):
+                self._labels.append(label)
+                self._entities.append(self._intern(entity))
+                self._mentions.append(mentions)
+        self._starts.append(len(self._entities))
+        self.filenames.append(filename)
+        # Sources and languages repeat across documents; share one string object each
+        self._sources.append(sys.intern(source) if source else None)
+        self._languages.append(sys.intern(language) if language else None)
+        self._annotations.append(annotations)
+
+    def __len__(self) -> int:
+        return len(self.filenames)
+
+    def _entity_pairs(self, index: int) -> dict:
+        entities = {field: [] for field in FIELDS}
+        for position in range(self._starts[index], self._starts[index + 1]):
+            entities[FIELDS[self._labels[position]]].append(
+                [self._strings[self._entities[position]], self._mentions[position]])
+        return entities
+
+    def document(self, index: int) -> DocumentResult:
+        return DocumentResult(self.filenames[index], self._sources[index], self._languages[index],
+                              self._annotations[index], self._entity_pairs(index))
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.document(index)
+
+    def values(self, field: str):
+        """Every occurrence of a field's entities across the batch (one per document containing it)."""
+        label = FIELDS.index(field)
+        for position, entity_label in enumerate(self._labels):
+            if entity_label == label:
+                yield self._strings[self._entities[position]]
+
+    def remap(self, field: str, mapping: dict):
+        """
+        Replaces a field's entities by mapping[entity] (e.g. canonical names),
+        merging entities that end up equal within a document.
+        """
+        label = FIELDS.index(field)
+        labels, entities, mentions, starts = array("B"), array("I"), array("I"), array("I", [0])
+        for index in range(len(self)):
+            merged = {}  # string id → position in the new arrays, for this document's remapped field
+            for position in range(self._starts[index], self._starts[index + 1]):
+                string_id = self._entities[position]
+                if self._labels[position] == label:
+                    text = self._strings[string_id]
+                    string_id = self._intern(mapping.get(text, text))
+                    if string_id in merged:
+                        mentions[merged[string_id]] += self._mentions[position]
+                        continue
+                    merged[string_id] = len(entities)
+                labels.append(self._labels[position])
+                entities.append(string_id)
+                mentions.append(self._mentions[position])
+            starts.append(len(entities))
+        self._labels, self._entities, self._mentions, self._starts = labels, entities, mentions, starts
+
+    def rows(self) -> list:
+        """Export rows (see utils.export_excel.result_row)."""
+        return [result_row(document.filename, document) for document in self]
+
+    def manifest(self) -> list:
+        """Documents for the annotation store's batch manifest."""
+        return [{"filename": filename, "source": source, "annotations": annotations}
+                for filename, source, annotations in zip(self.filenames, self._sources, self._annotations)]
+
+    def write_jsonl(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(_header() + "\n")
+            for index in range(len(self)):
+                f.write(_record(self.filenames[index], self._sources[index], self._languages[index],
+                                self._annotations[index], self._entity_pairs(index)) + "\n")
+
+    @classmethod
+    def read_jsonl(cls, path) -> "ResultSet":
+        """Loads a results file; raises ValueError for other formats or newer versions."""
+        results = cls()
+        with open(path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("format") != FORMAT or header.get("version", 0) > FORMAT_VERSION:
+                raise ValueError(f"Unsupported results file {path}: {header}")
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    results._append(record["filename"], record.get("source"), record.get("language"),
+                                    record.get("annotations"), record.get("entities", {}))
+        return results
+
+
+class ResultWriter:
+    """Writes a results file one document at a time (for streamed batches)."""
+
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8")
+        self._file.write(_header() + "\n")
+
+    def write(self, filename: str, result):
+        self._file.write(_record(filename, result.get("source"), result.get("language"),
+                                 result.get("annotations"), _entity_pairs(result)) + "\n")
+
+    def close(self):
+        self._file.close()
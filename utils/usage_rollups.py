@@ -0,0 +1,201 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Incrementally maintained usage rollups. Every ExtractionLog insert
+#          also adds its document and entity counts to the hourly and daily
+#          UsageRollup rows of its client IP, in the same transaction, so
+#          usage questions ("documents per day per IP over 90 days") read a
+#          few hundred rollup rows no matter how large the log grows.
+#
+# Usage (rebuild the rollups from the full log, e.g. after restoring a backup):
+#   python -m utils.usage_rollups --rebuild
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime, timedelta
+import argparse
+import sys
+
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+
+# ──────── Custom modules ────────
+from db.database import AppMarker, ExtractionLog, UsageRollup
+from utils.logger import logger
+
+GRANULARITIES = ("hour", "day")
+COUNT_COLUMNS = ("documents", "names", "emails", "orgs")
+TOP_CLIENTS = 10
+BACKFILL_MARKER = "usage_rollups_backfilled"
+BACKFILL_PROGRESS = "usage_rollups_backfill"  # "<cutoff log id>:<last log id done>" while it runs
+
+
+def period_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _aggregate(entries) -> dict:
+    """(upload_time, user_ip, names, emails, orgs) tuples → {(granularity, period, ip): [documents, names, emails, orgs]}."""
+    totals = {}
+    for upload_time, user_ip, names, emails, orgs in entries:
+        for granularity in GRANULARITIES:
+            key = (granularity, period_start(upload_time, granularity), user_ip or "")
+            counts = totals.setdefault(key, [0, 0, 0, 0])
+            counts[0] += 1
+            counts[1] += names or 0
+            counts[2] += emails or 0
+            counts[3] += orgs or 0
+    return totals
+
+
+def _apply(db, totals: dict):
+    """Adds the aggregated counts to the rollup rows (upsert; one statement per batch)."""
+    if not totals:
+        return
+    rows = [
+        dict(granularity=granularity, period_start=period, user_ip=ip, **dict(zip(COUNT_COLUMNS, counts)))
+        for (granularity, period, ip), counts in totals.items()
+    ]
+    stmt = insert(UsageRollup).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["granularity", "period_start", "user_ip"],
+        set_={column: getattr(UsageRollup, column) + getattr(stmt.excluded, column) for column in COUNT_COLUMNS},
+    )
+    db.execute(stmt)
+
+
+def add_extraction_logs(db, logs: list):
+    """
+    Adds ExtractionLog rows to the session together with their rollup updates.
+    Nothing is committed; the caller's commit (or rollback) covers both.
+    """
+    now = datetime.now()
+    for log in logs:
+        if log.upload_time is None:
+            log.upload_time = now
+    db.add_all(logs)
+    _apply(db, _aggregate(
+        (log.upload_time, log.user_ip, log.name_count, log.email_count, log.org_count) for log in logs
+    ))
+
+
+def _start_backfill(db) -> AppMarker:
+    """
+    Clears the rollups and records which log rows the backfill covers: those
+    up to the current last id. Later rows get their rollups from the live path.
+    """
+    db.query(UsageRollup).delete()  # starts the write transaction, so no log row commits in between
+    cutoff = db.query(func.max(ExtractionLog.id)).scalar() or 0
+    for name in (BACKFILL_MARKER, BACKFILL_PROGRESS):
+        marker = db.get(AppMarker, name)
+        if marker is not None:
+            db.delete(marker)
+    db.flush()
+    progress = AppMarker(name=BACKFILL_PROGRESS, value=f"{cutoff}:0")
+    db.add(progress)
+    db.commit()
+    return progress
+
+
+def rebuild_rollups(db, chunk_size: int = 5000, restart: bool = True) -> int:
+    """
+    Recomputes the rollup rows from the ExtractionLog table, committing after
+    every `chunk_size` log rows so the SQLite write lock is only held briefly
+    and live uploads keep committing. Progress (cutoff and last log id) is kept
+    in an AppMarker row; with restart=False an interrupted backfill resumes.
+    Returns the log rows read.
+    """
+    progress = None if restart else db.get(AppMarker, BACKFILL_PROGRESS)
+    if progress is None:
+        progress = _start_backfill(db)
+    cutoff, last_id = (int(part) for part in progress.value.split(":"))
+
+    rows = 0
+    while True:
+        chunk = db.query(ExtractionLog.id, ExtractionLog.upload_time, ExtractionLog.user_ip,
+                         ExtractionLog.name_count, ExtractionLog.email_count, ExtractionLog.org_count) \
+            .filter(ExtractionLog.id > last_id, ExtractionLog.id <= cutoff) \
+            .order_by(ExtractionLog.id).limit(chunk_size).all()
+        if not chunk:
+            break
+        items = list(_aggregate(row[1:] for row in chunk if row.upload_time is not None).items())
+        # Insert in slices so a single statement stays under SQLite's variable limit
+        for start in range(0, len(items), 500):
+            _apply(db, dict(items[start:start + 500]))
+        last_id = chunk[-1].id
+        progress.value = f"{cutoff}:{last_id}"
+        db.commit()
+        rows += len(chunk)
+
+    db.delete(progress)
+    db.merge(AppMarker(name=BACKFILL_MARKER))
+    db.commit()
+    logger.info(f"📊 Rebuilt usage rollups from {rows} extraction log rows.")
+    return rows
+
+
+def ensure_rollups(db):
+    """
+    Backfills the rollups from the log once per database (e.g. the first start
+    after upgrading), resuming a backfill that was interrupted. Keyed on a
+    marker row rather than on the rollups being empty, since a live upload can
+    write rollup rows before the backfill runs.
+    """
+    if db.get(AppMarker, BACKFILL_MARKER) is None:
+        rebuild_rollups(db, restart=False)
+
+
+def usage_summary(db, granularity: str = "day", since: datetime = None, until: datetime = None,
+                  user_ip: str = None) -> dict:
+    """
+    Usage between `since` and `until` (default: the last 30 days) from the
+    rollups alone: totals, a per-period series and the busiest client IPs.
+    """
+    until = until or datetime.now()
+    since = since or until - timedelta(days=30)
+
+    query = db.query(UsageRollup).filter(
+        UsageRollup.granularity == granularity,
+        UsageRollup.period_start >= period_start(since, granularity),
+        UsageRollup.period_start <= until,
+    )
+    if user_ip is not None:
+        query = query.filter(UsageRollup.user_ip == user_ip)
+    scoped = query.subquery()
+    sums = [func.sum(scoped.c[column]).label(column) for column in COUNT_COLUMNS]
+
+    series = db.query(scoped.c.period_start, *sums) \
+        .group_by(scoped.c.period_start).order_by(scoped.c.period_start).all()
+    clients = db.query(scoped.c.user_ip, *sums) \
+        .group_by(scoped.c.user_ip).order_by(func.sum(scoped.c.documents).desc()).limit(TOP_CLIENTS).all()
+
+    def counts(row):
+        return {column: int(getattr(row, column) or 0) for column in COUNT_COLUMNS}
+
+    totals = {column: sum(int(getattr(row, column) or 0) for row in series) for column in COUNT_COLUMNS}
+    return {
+        "granularity": granularity,
+        "from": period_start(since, granularity).isoformat(),
+        "to": until.isoformat(timespec="seconds"),
+        "user_ip": user_ip,
+        "totals": totals,
+        "series": [{"period": row.period_start.isoformat(), **counts(row)} for row in series],
+        "top_clients": [{"user_ip": row.user_ip or None, **counts(row)} for row in clients],
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the usage rollup tables.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from the extraction log")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        sys.exit(1)
+
+    from db.session import SessionLocal
+
+    session = SessionLocal()
+    try:
+        rebuild_rollups(session)
+    finally:
+        session.close()
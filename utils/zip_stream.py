@@ -0,0 +1,114 @@
+# ──────────────────────────────────────────────────────────────────────────────
+# Author: Paul-Michael Smith
+# Purpose: Builds ZIP archives as a stream of chunks. Each member is deflated
+#          chunk by chunk and its bytes are handed out as soon as they are
+#          produced (sizes and CRCs go in data descriptors), so an archive is
+#          never assembled on disk or in memory.
+#
+# The byte stream is deterministic: members come in the given order with
+# fixed timestamps and compression settings, so the same inputs always give
+# the same bytes. That is what lets a download resume at an offset (HTTP
+# Range) by regenerating the stream and skipping what was already sent.
+# ──────────────────────────────────────────────────────────────────────────────
+
+from datetime import datetime
+import io
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+COMPRESS_LEVEL = 6
+
+
+class ZipMember:
+    """
+    One archive entry.
+
+    Args:
+        name (str): Path inside the archive.
+        modified (datetime): Timestamp stored for the entry.
+        size (int): Uncompressed size (decides whether ZIP64 headers are needed).
+        read (callable): Returns an iterable of bytes chunks with the content.
+    """
+
+    __slots__ = ("name", "modified", "size", "read")
+
+    def __init__(self, name: str, modified: datetime, size: int, read):
+        self.name = name
+        self.modified = modified
+        self.size = size
+        self.read = read
+
+    @classmethod
+    def from_file(cls, path, name: str = None):
+        stat = path.stat()
+
+        def read():
+            with open(path, "rb") as f:
+                while chunk := f.read(CHUNK_SIZE):
+                    yield chunk
+
+        return cls(name or path.name, datetime.fromtimestamp(stat.st_mtime), stat.st_size, read)
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes, modified: datetime):
+        return cls(name, modified, len(data), lambda: (data,))
+
+
+class _Sink(io.RawIOBase):
+    """Write-only, non-seekable target that collects whatever zipfile writes until drained."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._offset
+
+    def drain(self):
+        chunks, self._chunks = self._chunks, []
+        return chunks
+
+
+def iter_zip(members):
+    """Yields the bytes of a ZIP archive of `members` (an iterable of ZipMember)."""
+    sink = _Sink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as archive:
+        for member in members:
+            # ZIP timestamps start in 1980
+            info = zipfile.ZipInfo(member.name, date_time=max(member.modified, datetime(1980, 1, 1)).timetuple()[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.file_size = member.size
+            info.external_attr = 0o644 << 16
+            with archive.open(info, "w") as entry:
+                for chunk in member.read():
+                    entry.write(chunk)
+                    yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
+
+
+def slice_stream(chunks, start: int, end: int = None):
+    """Yields bytes [start, end] (inclusive) of a chunk stream."""
+    offset = 0
+    for chunk in chunks:
+        chunk_end = offset + len(chunk)
+        if chunk_end > start:
+            piece = chunk[max(start - offset, 0):]
+            if end is not None and chunk_end > end + 1:
+                piece = piece[:len(piece) - (chunk_end - end - 1)]
+                if piece:
+                    yield piece
+                return
+            if piece:
+                yield piece
+        offset = chunk_end
+        if end is not None and offset > end:
+            return